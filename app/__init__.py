@@ -12,6 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .agent import app
-
+# Import diferido: construir el agente exige GOOGLE_API_KEY, y los CLIs de
+# app.app_utils (import_contacts, flight_report) no llaman al modelo
 __all__ = ["app"]
+
+
+def __getattr__(name):
+    if name == "app":
+        from .agent import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
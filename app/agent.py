@@ -22,13 +22,32 @@ from google.adk.models import Gemini
 from google.genai import types
 
 from .config import AGENT_NAME, COMPANY
-from .tools import create_contact, update_contact, list_contacts
-from .callbacks import before_model_callback
+from .tools import (
+    bulk_create_contacts,
+    crm_async,
+    list_pending_writes,
+    propose_contact_change,
+    update_contact_by_reference,
+)
+from .tools.outbox import CRM_OUTBOX_ENABLED
+from .callbacks import before_model_callback, deadline_before_model_callback
+from .context_cache import StaticContextCache
+from .flight_recorder import FlightRecorder
+from .history import HistoryCompactor
+from .model_router import ModelRouter
+from .result_shaping import ToolResultShaper
+from .app_utils.fake_model import FakeGemini
 
 load_dotenv()
 
+# Modelo fuerte (el del agente); el liviano lo elige ModelRouter (MODEL_TIERING_ENABLED=true)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# Modelo falso en memoria (tests/desarrollo offline, sin API key)
+GEMINI_FAKE_MODEL = os.getenv("GEMINI_FAKE_MODEL", "false").lower() in ("1", "true", "yes")
+
 my_api_key = os.getenv("GOOGLE_API_KEY")
-if not my_api_key:
+if not my_api_key and not GEMINI_FAKE_MODEL:
     raise ValueError("❌ GOOGLE_API_KEY no está configurada en .env")
 
 # Commented out to allow for local testing without GCP credentials.
@@ -39,17 +58,71 @@ if not my_api_key:
 # os.environ["GOOGLE_CLOUD_LOCATION"] = "global"
 # os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "True"
 
+model = (FakeGemini if GEMINI_FAKE_MODEL else Gemini)(
+    model=GEMINI_MODEL,
+    # En producción, usar Default Credentials u otro metodo seguro para manejar API keys:
+    api_key=my_api_key,
+    retry_options=types.HttpRetryOptions(attempts=3),
+)
+
+# Historial acotado: últimos turnos completos + resumen de los anteriores
+history_compactor = HistoryCompactor()
+
+# Resultados de tools acotados (bytes por tool, errores con código corto)
+tool_result_shaper = ToolResultShaper()
+
+# Modelo por request: liviano para turnos simples, fuerte para escrituras y con escalamiento
+model_router = ModelRouter(client_factory=lambda: model.api_client, strong_model=GEMINI_MODEL)
+
+# Instrucción estática + tools en un cached content de Gemini (GEMINI_CONTEXT_CACHE=true)
+static_context_cache = StaticContextCache(client_factory=lambda: model.api_client)
+
+# Registro por turno de llamadas al LLM y tools (FLIGHT_RECORDER_ENABLED=true)
+flight_recorder = FlightRecorder()
+
 root_agent = Agent(
     name="root_agent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        # En producción, usar Default Credentials u otro metodo seguro para manejar API keys:
-        api_key=my_api_key,
-        retry_options=types.HttpRetryOptions(attempts=3),
-    ),
+    model=model,
     instruction="", # Vacío - hidratado dinámicamente before_model_callback con seller_email y timestamp
-    tools=[create_contact, update_contact, list_contacts],
-    before_model_callback=[before_model_callback],
+    # Tools async: no bloquean el event loop del webhook (las sync quedan para scripts)
+    tools=[
+        # Confirmación de create/update: el "sí" lo ejecuta el webhook sin otra llamada al LLM
+        propose_contact_change,
+        # Update en una vuelta: candidatos rankeados + diff, commit por token
+        update_contact_by_reference,
+        crm_async.create_contact,
+        crm_async.update_contact,
+        crm_async.list_contacts,
+        bulk_create_contacts,
+        # Solo con outbox: consultar escrituras aún no guardadas en el CRM
+        *([list_pending_writes] if CRM_OUTBOX_ENABLED else []),
+    ],
+    before_model_callback=[
+        before_model_callback,
+        history_compactor.before_model_callback,
+        deadline_before_model_callback,
+        # Antes del context cache: el cached content depende del modelo elegido
+        model_router.before_model_callback,
+        static_context_cache.before_model_callback,
+        # Último: mide solo la llamada al modelo ya elegido
+        flight_recorder.before_model_callback,
+    ],
+    # El flight recorder va primero: los demás pueden reemplazar la respuesta y cortar la lista
+    after_model_callback=[
+        flight_recorder.after_model_callback,
+        static_context_cache.after_model_callback,
+        model_router.after_model_callback,
+    ],
+    # El router antes que el context cache: un request liviano que falla se escala al fuerte
+    # (no se reintenta sin cache en el liviano) y su entrada en vuelo siempre se libera
+    on_model_error_callback=[
+        flight_recorder.on_model_error_callback,
+        model_router.on_model_error_callback,
+        static_context_cache.on_model_error_callback,
+    ],
+    before_tool_callback=flight_recorder.before_tool_callback,
+    after_tool_callback=[flight_recorder.after_tool_callback, tool_result_shaper.after_tool_callback],
+    on_tool_error_callback=flight_recorder.on_tool_error_callback,
 )
 
 app = App(root_agent=root_agent, name="app")
@@ -0,0 +1,377 @@
+"""
+Local stand-in for the PyroTech CRM API, for load tests and benchmarks.
+
+Implements POST /contacts (paginated search), POST /contact and
+PUT /contact/{id} with the same request/response shapes the CRM tools use,
+over a seeded dataset, with injectable latency, errors and throttling.
+
+HTTP server (point PYROTECH_API_BASE_URL at it):
+    uv run -m app.app_utils.fake_crm --contacts 100000 --sellers 50 --latency-ms 40 --p99-ms 400
+
+In-process:
+    fake = FakeCRM.seeded(contacts=100_000, sellers=50)
+    AsyncCRMClient(FAKE_BASE_URL, "token", transport=fake.async_transport())
+    with fake.serve() as base_url:
+        CRMClient(base_url, "token")
+
+Seller emails are vendedor{n}@inmobiliaria.com (n = 0..sellers-1).
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import click
+import httpx
+
+from app.tools.search_index import normalize_text, phone_digits
+
+FAKE_BASE_URL = "http://fake-crm.local/api/v1"
+API_PREFIX = "/api/v1"
+MAX_PAGE_LIMIT = 100
+
+_FIRST_NAMES = [
+    "Ana", "María", "José", "Juan", "Luis", "Carlos", "Sofía", "Valentina", "Diego", "Camila",
+    "Miguel", "Lucía", "Jorge", "Fernanda", "Andrés", "Paula", "Ricardo", "Daniela", "Javier", "Gabriela",
+]
+_LAST_NAMES = [
+    "García", "Pérez", "López", "Martínez", "González", "Rodríguez", "Hernández", "Sánchez", "Ramírez", "Torres",
+    "Flores", "Rivera", "Gómez", "Díaz", "Cruz", "Morales", "Ortiz", "Gutiérrez", "Chávez", "Ruiz",
+]
+
+
+def seller_email(n: int) -> str:
+    return f"vendedor{n}@inmobiliaria.com"
+
+
+def _ascii_slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", normalize_text(value))
+
+
+class LatencyModel:
+    """Log-normal latency given its median and p99 (milliseconds)."""
+
+    def __init__(self, median_ms: float = 0.0, p99_ms: float | None = None):
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms if p99_ms is not None else median_ms
+        # p99 de una log-normal = mediana * exp(2.326 * sigma)
+        ratio = self.p99_ms / median_ms if median_ms > 0 else 1.0
+        self.sigma = math.log(ratio) / 2.326 if ratio > 1 else 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds to wait for one request."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(rng.gauss(0, self.sigma)) / 1000
+
+
+class FakeCRM:
+    """In-memory CRM with PyroTech-like endpoints and fault injection."""
+
+    def __init__(
+        self,
+        latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        throttle_rps: float = 0.0,
+        api_token: str | None = None,
+        seed: int = 0,
+        clock=time.monotonic,
+    ):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rps = throttle_rps
+        self.api_token = api_token
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._contacts: dict[str, dict] = {}
+        self._by_seller: dict[str, list] = {}
+        # Texto normalizado por contacto: la búsqueda no renormaliza en cada request
+        self._search_keys: dict[str, tuple] = {}
+        self._idempotency: dict[str, tuple] = {}
+        self._next_id = 1
+        # Ventana de 1 s por API token para simular 429
+        self._window: dict[str, tuple] = {}
+        self.requests: dict[str, int] = {}
+        self.injected_errors = 0
+        self.throttled = 0
+
+    # -------------------------------------------------------------------------
+    # Dataset
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def seeded(cls, contacts: int = 1000, sellers: int = 10, seed: int = 0, **kwargs) -> "FakeCRM":
+        """Builds a CRM with `contacts` deterministic contacts spread over `sellers` sellers."""
+        crm = cls(seed=seed, **kwargs)
+        rng = random.Random(seed)
+        for i in range(contacts):
+            first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+            name = f"{first} {last}"
+            crm.add_contact(seller_email(i % sellers), {
+                "name": name,
+                "email": f"{_ascii_slug(first)}.{_ascii_slug(last)}{i}@example.com",
+                "phoneNumber": f"+52 55 {rng.randint(1000, 9999)} {i % 10000:04d}",
+            })
+        return crm
+
+    def _index(self, contact: dict) -> None:
+        self._search_keys[contact["_id"]] = (
+            normalize_text(contact.get("name")),
+            normalize_text(contact.get("email")),
+            phone_digits(contact.get("phoneNumber")),
+        )
+
+    def _new_id(self) -> str:
+        cid = f"{self._next_id:024x}"
+        self._next_id += 1
+        return cid
+
+    def add_contact(self, seller: str, fields: dict) -> dict:
+        """Inserts a contact directly (no faults, no validation)."""
+        with self._lock:
+            contact = {"_id": self._new_id(), **fields, "userEmail": seller}
+            self._contacts[contact["_id"]] = contact
+            self._by_seller.setdefault(seller, []).append(contact)
+            self._index(contact)
+            return contact
+
+    def contacts_of(self, seller: str) -> list:
+        with self._lock:
+            return list(self._by_seller.get(seller, []))
+
+    # -------------------------------------------------------------------------
+    # Faults
+    # -------------------------------------------------------------------------
+
+    def _fault(self, headers: dict) -> tuple | None:
+        """Returns (status, body, extra headers) for an injected failure, else None."""
+        with self._lock:
+            if self.throttle_rps > 0:
+                token = headers.get("authorization", "")
+                window_start, count = self._window.get(token, (0.0, 0))
+                now = self._clock()
+                if now - window_start >= 1:
+                    window_start, count = now, 0
+                if count >= self.throttle_rps:
+                    self.throttled += 1
+                    retry_after = max(1, math.ceil(1 - (now - window_start)))
+                    return 429, {"message": "Too many requests"}, {"Retry-After": str(retry_after)}
+                self._window[token] = (window_start, count + 1)
+            if self.error_rate > 0 and self._rng.random() < self.error_rate:
+                self.injected_errors += 1
+                return self.error_status, {"message": "Injected failure"}, {}
+        return None
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency.sample(self._rng)
+
+    # -------------------------------------------------------------------------
+    # Endpoints
+    # -------------------------------------------------------------------------
+
+    def handle(self, method: str, url: str, headers: dict, body: bytes) -> tuple:
+        """Processes one request. Returns (status, JSON body, extra headers)."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        parts = urlsplit(url)
+        path = parts.path[len(API_PREFIX):] if parts.path.startswith(API_PREFIX) else parts.path
+        endpoint = f"{method} " + re.sub(r"/[0-9a-f]{24}$", "/{id}", path)
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+        if self.api_token and headers.get("authorization") != self.api_token:
+            return 401, {"message": "Unauthorized"}, {}
+        fault = self._fault(headers)
+        if fault:
+            return fault
+
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"message": "Invalid JSON"}, {}
+        if not isinstance(payload, dict):
+            return 400, {"message": "Body must be an object"}, {}
+        seller = payload.get("userEmail") or headers.get("x-user-email", "")
+
+        if method == "POST" and path == "/contacts":
+            query = parse_qs(parts.query)
+            return self._list(seller, payload.get("searchTerm"), query)
+        if method == "POST" and path == "/contact":
+            return self._create(seller, payload, headers.get("idempotency-key"))
+        match = re.fullmatch(r"/contact/([0-9a-fA-F]{24})", path)
+        if method == "PUT" and match:
+            return self._update(seller, match.group(1), payload)
+        return 404, {"message": f"Cannot {method} {path}"}, {}
+
+    def _list(self, seller: str, search_term: str | None, query: dict) -> tuple:
+        try:
+            page = max(1, int(query.get("page", ["1"])[0]))
+            limit = min(MAX_PAGE_LIMIT, max(1, int(query.get("limit", ["10"])[0])))
+        except ValueError:
+            return 400, {"message": "Invalid page or limit"}, {}
+
+        contacts = self.contacts_of(seller)
+        if search_term:
+            term = normalize_text(search_term)
+            digits = phone_digits(search_term)
+            keys = self._search_keys
+            contacts = [
+                c for c in contacts
+                if term in keys[c["_id"]][0] or term in keys[c["_id"]][1]
+                or (len(digits) >= 4 and digits in keys[c["_id"]][2])
+            ]
+        start = (page - 1) * limit
+        return 200, {
+            "contacts": contacts[start:start + limit],
+            "totalContacts": len(contacts),
+            "page": page,
+            "limit": limit,
+        }, {}
+
+    def _create(self, seller: str, payload: dict, idempotency_key: str | None) -> tuple:
+        if idempotency_key:
+            with self._lock:
+                previous = self._idempotency.get(idempotency_key)
+            if previous:
+                return previous
+
+        missing = [f for f in ("name", "phoneNumber", "email", "userEmail") if not payload.get(f)]
+        if missing:
+            result = (400, {"message": f"Missing fields: {', '.join(missing)}"}, {})
+        elif any(c.get("email", "").lower() == payload["email"].lower() for c in self.contacts_of(seller)):
+            result = (409, {"message": f"Contact with email {payload['email']} already exists"}, {})
+        else:
+            fields = {k: payload[k] for k in ("name", "phoneNumber", "email")}
+            result = (201, self.add_contact(seller, fields), {})
+
+        if idempotency_key:
+            with self._lock:
+                self._idempotency[idempotency_key] = result
+        return result
+
+    def _update(self, seller: str, cid: str, payload: dict) -> tuple:
+        with self._lock:
+            contact = self._contacts.get(cid.lower())
+            if contact is None or contact["userEmail"] != seller:
+                return 404, {"message": "Contact not found"}, {}
+            contact.update({k: v for k, v in payload.items() if k in ("name", "phoneNumber", "email") and v})
+            self._index(contact)
+            return 200, dict(contact), {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "contacts": len(self._contacts),
+                "sellers": len(self._by_seller),
+                "requests": dict(self.requests),
+                "injected_errors": self.injected_errors,
+                "throttled": self.throttled,
+            }
+
+    # -------------------------------------------------------------------------
+    # Adaptadores: httpx en proceso y servidor HTTP
+    # -------------------------------------------------------------------------
+
+    def _response(self, request: httpx.Request) -> httpx.Response:
+        status, body, extra = self.handle(request.method, str(request.url), dict(request.headers), request.content)
+        return httpx.Response(status, json=body, headers=extra)
+
+    def transport(self) -> httpx.MockTransport:
+        """httpx transport for sync clients (latency blocks the calling thread)."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(self._delay())
+            return self._response(request)
+        return httpx.MockTransport(handler)
+
+    def async_transport(self) -> httpx.MockTransport:
+        """httpx transport for AsyncCRMClient (latency awaits on the event loop)."""
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self._delay())
+            return self._response(request)
+        return httpx.MockTransport(handler)
+
+    def make_server(self, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+        crm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como el CRM real
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                time.sleep(crm._delay())
+                status, payload, extra = crm.handle(self.command, self.path, dict(self.headers), body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_POST = do_PUT = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+    @contextmanager
+    def serve(self, host: str = "127.0.0.1", port: int = 0):
+        """Runs the HTTP server in a background thread; yields its base URL."""
+        server = self.make_server(host, port)
+        thread = threading.Thread(target=server.serve_forever, name="fake-crm", daemon=True)
+        thread.start()
+        try:
+            yield f"http://{host}:{server.server_address[1]}{API_PREFIX}"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8787, show_default=True)
+@click.option("--contacts", default=100_000, show_default=True, help="Seeded contacts.")
+@click.option("--sellers", default=50, show_default=True, help="Sellers the contacts are spread over.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--latency-ms", default=0.0, show_default=True, help="Median latency per request.")
+@click.option("--p99-ms", default=None, type=float, help="p99 latency (log-normal tail). Defaults to the median.")
+@click.option("--error-rate", default=0.0, show_default=True, help="Fraction of requests answered with --error-status.")
+@click.option("--error-status", default=503, show_default=True)
+@click.option("--throttle-rps", default=0.0, show_default=True, help="Requests/s per API token before 429 (0 = off).")
+def main(host, port, contacts, sellers, seed, latency_ms, p99_ms, error_rate, error_status, throttle_rps) -> None:
+    """Serve a fake PyroTech CRM on HOST:PORT."""
+    started = time.monotonic()
+    fake = FakeCRM.seeded(
+        contacts=contacts, sellers=sellers, seed=seed,
+        latency=LatencyModel(latency_ms, p99_ms), error_rate=error_rate,
+        error_status=error_status, throttle_rps=throttle_rps,
+    )
+    click.echo(f"🌱 {contacts} contacts / {sellers} sellers seeded in {time.monotonic() - started:.1f}s", err=True)
+    server = fake.make_server(host, port)
+    click.echo(f"🚀 Fake CRM on http://{host}:{port}{API_PREFIX} (sellers: {seller_email(0)} ...)", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        click.echo(json.dumps(fake.stats(), ensure_ascii=False), err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Offline stand-in for the Gemini API, for tests and local runs without a key.
+
+FakeGenaiClient implements the parts of google-genai the agent uses:
+`aio.models.generate_content` and `aio.caches.create/update/delete`, with
+the same rules as the real API that matter for context caching (minimum
+token count to create a cache, TTL expiry, no system_instruction/tools
+next to `cached_content`) and usage metadata with cached-token counts.
+
+FakeGemini plugs it into ADK:
+
+    Agent(model=FakeGemini(model="gemini-2.5-flash", reply="Hola"), ...)
+
+Set GEMINI_FAKE_MODEL=true to make app/agent.py use it.
+"""
+
+import itertools
+import time
+from functools import cached_property
+from typing import Any
+
+from google.adk.models import Gemini
+from google.genai import errors, types
+
+FAKE_CACHE_MIN_TOKENS = 1024
+
+
+def estimate_tokens(*values) -> int:
+    """~4 characters per token over the JSON form of the values."""
+    chars = 0
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, list):
+            chars += sum(estimate_tokens(v) * 4 for v in value)
+        elif hasattr(value, "model_dump_json"):
+            chars += len(value.model_dump_json(exclude_none=True))
+        else:
+            chars += len(str(value))
+    return chars // 4
+
+
+def _client_error(code: int, message: str) -> errors.ClientError:
+    return errors.ClientError(code, {"error": {"code": code, "message": message, "status": "FAILED_PRECONDITION"}})
+
+
+class FakeCaches:
+    """In-memory cachedContents resource."""
+
+    def __init__(self, min_tokens: int = FAKE_CACHE_MIN_TOKENS, clock=time.time):
+        self.min_tokens = min_tokens
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self.entries: dict[str, dict] = {}
+        self.fail_create = False
+
+    @staticmethod
+    def _ttl(config) -> float:
+        return float(str(config.ttl or "3600s").rstrip("s"))
+
+    async def create(self, *, model: str, config: types.CreateCachedContentConfig) -> types.CachedContent:
+        if self.fail_create:
+            raise _client_error(503, "Context caching unavailable")
+        tokens = estimate_tokens(config.system_instruction, config.tools, config.contents)
+        if tokens < self.min_tokens:
+            raise _client_error(400, f"Cached content is too small: {tokens} < {self.min_tokens} tokens")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.entries[name] = {"model": model, "tokens": tokens, "expires_at": self._clock() + self._ttl(config)}
+        return types.CachedContent(
+            name=name, model=model, usage_metadata=types.CachedContentUsageMetadata(total_token_count=tokens)
+        )
+
+    async def update(self, *, name: str, config: types.UpdateCachedContentConfig) -> types.CachedContent:
+        entry = self.live(name)
+        entry["expires_at"] = self._clock() + self._ttl(config)
+        return types.CachedContent(name=name, model=entry["model"])
+
+    async def delete(self, *, name: str, config=None) -> None:
+        self.entries.pop(name, None)
+
+    def live(self, name: str) -> dict:
+        entry = self.entries.get(name)
+        if entry is None or entry["expires_at"] <= self._clock():
+            raise _client_error(404, f"CachedContent not found (or expired): {name}")
+        return entry
+
+
+class FakeModels:
+    """generate_content with a scripted reply and realistic usage metadata."""
+
+    def __init__(self, caches: FakeCaches, reply="OK"):
+        self._caches = caches
+        # str fijo o callable(contents, config) -> str | types.FunctionCall
+        self.reply = reply
+        self.requests: list[dict] = []
+
+    async def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        config = config or types.GenerateContentConfig()
+        cached_tokens = 0
+        if config.cached_content:
+            if config.system_instruction or config.tools or config.tool_config:
+                raise _client_error(
+                    400, "CachedContent can not be used with GenerateContent request setting system_instruction, tools or tool_config."
+                )
+            entry = self._caches.live(config.cached_content)
+            if entry["model"] != model:
+                raise _client_error(400, "Model does not match the cached content model")
+            cached_tokens = entry["tokens"]
+        self.requests.append({"model": model, "contents": list(contents or []), "config": config})
+
+        reply = self.reply(contents, config) if callable(self.reply) else self.reply
+        part = types.Part(function_call=reply) if isinstance(reply, types.FunctionCall) else types.Part(text=reply)
+        prompt_tokens = cached_tokens + estimate_tokens(config.system_instruction, config.tools, list(contents or []))
+        output_tokens = estimate_tokens(part)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[part]),
+                finish_reason=types.FinishReason.STOP,
+            )],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=cached_tokens or None,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+class _Aio:
+    def __init__(self, models: FakeModels, caches: FakeCaches):
+        self.models = models
+        self.caches = caches
+
+
+class FakeGenaiClient:
+    """Duck-typed google.genai.Client (async surface only)."""
+
+    vertexai = False
+
+    def __init__(self, reply="OK", min_cache_tokens: int = FAKE_CACHE_MIN_TOKENS, clock=time.time):
+        self.caches = FakeCaches(min_cache_tokens, clock)
+        self.models = FakeModels(self.caches, reply)
+        self.aio = _Aio(self.models, self.caches)
+
+
+class FakeGemini(Gemini):
+    """ADK Gemini model backed by FakeGenaiClient (no network, no API key)."""
+
+    # str fijo o callable(contents, config) -> str | types.FunctionCall
+    reply: Any = "OK"
+    min_cache_tokens: int = FAKE_CACHE_MIN_TOKENS
+
+    @cached_property
+    def api_client(self) -> FakeGenaiClient:
+        return FakeGenaiClient(reply=self.reply, min_cache_tokens=self.min_cache_tokens)
@@ -0,0 +1,125 @@
+"""
+Offline analyzer for the flight recorder JSONL (app/flight_recorder.py).
+
+Usage:
+    uv run -m app.app_utils.flight_report flight_records.jsonl* --seller vendedor@inmobiliaria.com
+
+Prints p50/p95/p99 per stage: total turn time, LLM time per turn and per
+call (also per model), tool time per tool, webhook stages, and per-turn
+LLM rounds and tokens.
+"""
+
+import glob
+import json
+import math
+
+import click
+
+from app.flight_recorder import FLIGHT_RECORDER_PATH
+
+# Métricas por turno que no son latencias
+COUNT_FIELDS = ("llm_rounds", "prompt_tokens", "cached_tokens", "output_tokens")
+
+
+def load_records(paths, seller_email: str | None = None, path: str | None = None) -> list[dict]:
+    """Reads the JSONL files (skipping broken lines), optionally filtered by seller and turn path."""
+    records = []
+    for file_path in paths:
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if seller_email and record.get("seller_email") != seller_email:
+                    continue
+                if path and record.get("path") != path:
+                    continue
+                records.append(record)
+    return records
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def stage_samples(records: list[dict]) -> dict[str, list]:
+    """{stage: [ms, ...]} for latencies and {field: [n, ...]} for per-turn counts."""
+    samples: dict[str, list] = {}
+
+    def add(name, value):
+        samples.setdefault(name, []).append(value)
+
+    for record in records:
+        add("total", record.get("wall_ms", 0))
+        model_calls = record.get("model_calls") or []
+        tool_calls = record.get("tool_calls") or []
+        if model_calls:
+            add("llm (per turn)", sum(c["latency_ms"] for c in model_calls))
+        for call in model_calls:
+            add("llm call", call["latency_ms"])
+            add(f"llm call: {call.get('model')}", call["latency_ms"])
+        if tool_calls:
+            add("tools (per turn)", sum(c["latency_ms"] for c in tool_calls))
+        for call in tool_calls:
+            add(f"tool: {call['name']}", call["latency_ms"])
+        for name, ms in (record.get("stages") or {}).items():
+            add(name, ms)
+        for field in COUNT_FIELDS:
+            add(field, record.get(field, 0))
+    return samples
+
+
+def summarize(samples: dict[str, list]) -> list[dict]:
+    """One row per stage with n, p50, p95, p99 and max."""
+    return [
+        {
+            "stage": name,
+            "n": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+        for name, values in samples.items()
+    ]
+
+
+def _format_table(rows: list[dict]) -> str:
+    width = max([len(r["stage"]) for r in rows] + [5])
+    lines = [f"{'stage':<{width}} {'n':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}"]
+    for r in rows:
+        lines.append(
+            f"{r['stage']:<{width}} {r['n']:>7} {r['p50']:>10.1f} {r['p95']:>10.1f} {r['p99']:>10.1f} {r['max']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+@click.command()
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option("--seller", "seller_email", default=None, help="Only turns of this seller.")
+@click.option("--path", "turn_path", default=None, help="Only turns answered by agent, fast_path or confirmation.")
+def main(paths: tuple, seller_email: str | None, turn_path: str | None) -> None:
+    """Percentiles per stage from the flight recorder files (default: FLIGHT_RECORDER_PATH and its rotations)."""
+    paths = paths or tuple(sorted(glob.glob(f"{glob.escape(FLIGHT_RECORDER_PATH)}*")))
+    records = load_records(paths, seller_email, turn_path)
+    if not records:
+        click.echo("No turns recorded.", err=True)
+        return
+
+    rows = summarize(stage_samples(records))
+    latencies = [r for r in rows if r["stage"] not in COUNT_FIELDS]
+    counts = [r for r in rows if r["stage"] in COUNT_FIELDS]
+    unfinished = sum(1 for r in records if not r.get("finished", True))
+    click.echo(f"📊 {len(records)} turns ({unfinished} finished in background) from {len(paths)} file(s)\n")
+    click.echo("Latency (ms)")
+    click.echo(_format_table(latencies))
+    click.echo("\nPer turn")
+    click.echo(_format_table(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+CLI for bulk contact imports from CSV or JSONL.
+
+Usage:
+    uv run -m app.app_utils.import_contacts contacts.csv --seller-email vendedor@inmobiliaria.com
+
+CSV needs a header row with name, phone_number (or phone/phoneNumber) and email.
+Prints one JSON line per row and a final summary.
+"""
+
+import asyncio
+import json
+
+import click
+
+from app.tools.bulk import BULK_CONCURRENCY, import_contacts, read_rows
+
+
+@click.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--seller-email", required=True, help="Seller that will own the contacts.")
+@click.option("--concurrency", default=BULK_CONCURRENCY, show_default=True, help="Max creates in flight.")
+@click.option("--dry-run", is_flag=True, help="Only validate, do not call the CRM.")
+def main(path: str, seller_email: str, concurrency: int, dry_run: bool) -> None:
+    """Validate and import the contacts in PATH."""
+    rows = read_rows(path)
+    click.echo(f"📥 {len(rows)} rows read from {path}", err=True)
+
+    report = asyncio.run(
+        import_contacts(seller_email, rows, concurrency=concurrency, dry_run=dry_run)
+    )
+
+    for row in report.pop("results"):
+        click.echo(json.dumps(row, ensure_ascii=False))
+    click.echo(
+        f"✅ created={report['created']} queued={report['queued']} failed={report['failed']} invalid={report['invalid']} "
+        f"in {report['elapsed_seconds']}s",
+        err=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,51 @@ This acts as a guardrail to ensure data isolation between sellers.
 import os
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest, LlmResponse
 from google.genai import types
 from dotenv import load_dotenv
 
-from .prompt import agent_prompt
-from .config import AGENT_NAME, COMPANY
+from .prompt import seller_prompt, static_prompt, time_prompt
+from .config import AGENT_NAME, COMPANY, STILL_WORKING_MESSAGE
+from .deadline import current_deadline
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Tiempo mínimo para que valga la pena llamar al LLM
+LLM_MIN_SECONDS = float(os.getenv("LLM_MIN_SECONDS", "2"))
+
+# Resolución de la hora en el prompt (minutos; 1440 = solo fecha, 0 = sin hora)
+PROMPT_TIME_GRANULARITY_MINUTES = int(os.getenv("PROMPT_TIME_GRANULARITY_MINUTES", "1"))
+INSTRUCTION_CACHE_SIZE = int(os.getenv("INSTRUCTION_CACHE_SIZE", "1024"))
+
+
+@lru_cache(maxsize=None)
+def render_static_instruction(agent_name: str, company: str) -> str:
+    """Seller-independent part of the system instruction (stable prefix)."""
+    return static_prompt.format(agent_name=agent_name, company=company)
+
+
+@lru_cache(maxsize=INSTRUCTION_CACHE_SIZE)
+def render_instruction(seller_email: str, company: str = COMPANY, agent_name: str = AGENT_NAME) -> str:
+    """Static block + seller block, memoized per (seller, company, agent name)."""
+    return render_static_instruction(agent_name, company) + seller_prompt.format(seller_email=seller_email)
+
+
+def current_time_label(now: datetime | None = None, granularity: int = PROMPT_TIME_GRANULARITY_MINUTES) -> str:
+    """Current time rounded down to `granularity` minutes ("" when granularity is 0)."""
+    if granularity <= 0:
+        return ""
+    now = now or datetime.now()
+    if granularity >= 1440:
+        return now.strftime("%d/%m/%Y")
+    minutes = (now.hour * 60 + now.minute) // granularity * granularity
+    return now.replace(hour=minutes // 60, minute=minutes % 60).strftime("%d/%m/%Y %H:%M")
+
 def before_model_callback(
     callback_context: CallbackContext,
     llm_request: LlmRequest
@@ -27,7 +59,7 @@ def before_model_callback(
     Executes BEFORE each LLM call.
     Purpose:
     - Reads seller_email from the session state.
-    - Hydrates the prompt with the dynamic seller_email.
+    - Sets the memoized instruction for that seller plus the current time.
     - Ensures each seller only accesses their own data.
     """
     try:
@@ -40,15 +72,11 @@ def before_model_callback(
         
         logger.info(f"🔐 [Callback] Seller email: {seller_email}")
         
-        current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
-
-        # Hidratar el prompt con el seller_email dinámico
-        final_instruction = agent_prompt.format(
-            agent_name=AGENT_NAME,
-            company=COMPANY,
-            seller_email=seller_email,
-            current_time=current_time
-        )
+        # Prefijo estático + bloque del seller (memoizado); la hora va al final
+        final_instruction = render_instruction(seller_email, COMPANY, AGENT_NAME)
+        current_time = current_time_label()
+        if current_time:
+            final_instruction += time_prompt.format(current_time=current_time)
         
         # Inyectar la instrucción en el request
         if llm_request.config:
@@ -62,4 +90,34 @@ def before_model_callback(
         
     except Exception as e:
           logger.error(f"❌ [Callback Error] {str(e)}", exc_info=True)
-          return None
\ No newline at end of file
+          return None
+
+
+def deadline_before_model_callback(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Executes BEFORE each LLM call, after before_model_callback.
+    Purpose:
+    - Bounds the Gemini HTTP timeout by the request's remaining budget.
+    - Skips the call with a "still working" reply when the budget is spent.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return None
+
+    left = deadline.remaining()
+    if left < LLM_MIN_SECONDS:
+        logger.warning(f"⏱️ [Deadline] {left:.1f}s left, skipping LLM call")
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=STILL_WORKING_MESSAGE)])
+        )
+
+    if not llm_request.config:
+        llm_request.config = types.GenerateContentConfig()
+    if not llm_request.config.http_options:
+        llm_request.config.http_options = types.HttpOptions()
+    # HttpOptions.timeout va en milisegundos
+    llm_request.config.http_options.timeout = int(left * 1000)
+    return None
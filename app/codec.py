@@ -0,0 +1,135 @@
+"""
+Pluggable JSON codec for webhook payloads and CRM bodies.
+Uses msgspec or orjson when installed (`pip install .[fast-json]`) and falls
+back to the stdlib json module. JSON_CODEC=auto|msgspec|orjson|json forces a
+backend. Every backend decodes untyped into plain dicts/lists and the shape
+checks run afterwards, so the same payload is accepted or rejected whichever
+backend is active.
+"""
+
+import json
+import logging
+import os
+from typing import Any, TypedDict
+
+logger = logging.getLogger(__name__)
+
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+
+
+# =============================================================================
+# Schemas (TypedDict: solo documentan la forma; se decodifica sin tipos)
+# =============================================================================
+
+class WebhookPayload(TypedDict, total=False):
+    phone: str
+    message: str
+    userEmail: str
+    pyrotechToken: str
+
+
+class ContactsPage(TypedDict, total=False):
+    contacts: list[dict[str, Any]]
+    docs: list[dict[str, Any]]
+    totalContacts: int
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+def _load_backend(name: str):
+    if name in ("auto", "msgspec"):
+        try:
+            import msgspec
+
+            return "msgspec", msgspec
+        except ImportError:
+            if name == "msgspec":
+                logger.warning("⚠️ JSON_CODEC=msgspec but msgspec is not installed, falling back")
+    if name in ("auto", "msgspec", "orjson"):
+        try:
+            import orjson
+
+            return "orjson", orjson
+        except ImportError:
+            if name == "orjson":
+                logger.warning("⚠️ JSON_CODEC=orjson but orjson is not installed, falling back")
+    return "json", json
+
+
+def _use_backend(name: str) -> str:
+    """Activates a backend (JSON_CODEC value). Returns the one actually loaded."""
+    global BACKEND, _lib, _encoder, _decoder
+    BACKEND, _lib = _load_backend(name)
+    if BACKEND == "msgspec":
+        _encoder = _lib.json.Encoder()
+        # Sin tipos: los decoders tipados rechazaban lo que json/orjson aceptan
+        _decoder = _lib.json.Decoder()
+    return BACKEND
+
+
+BACKEND, _lib, _encoder, _decoder = "json", json, None, None
+_use_backend(JSON_CODEC)
+
+
+def dumps(obj) -> bytes:
+    """Serializes to compact UTF-8 JSON bytes."""
+    if BACKEND == "msgspec":
+        return _encoder.encode(obj)
+    if BACKEND == "orjson":
+        return _lib.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Parses JSON from bytes or str."""
+    if BACKEND == "msgspec":
+        return _decoder.decode(data)
+    return _lib.loads(data)
+
+
+def decode_webhook_payload(data) -> WebhookPayload:
+    """Parses an incoming webhook body (must be a JSON object); scalar fields become strings."""
+    payload = loads(data)
+    if not isinstance(payload, dict):
+        raise ValueError("Webhook payload must be a JSON object.")
+    for field in WebhookPayload.__annotations__:
+        value = payload.get(field)
+        # "phone": 5215... llega como número desde algunos integradores
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            payload[field] = str(value)
+    return payload
+
+
+def decode_contacts_page(data):
+    """
+    Parses a /contacts response body (object with contacts/docs, or a bare
+    list). contacts/docs null become [] and totalContacts an int (or absent).
+    """
+    page = loads(data)
+    if isinstance(page, dict):
+        for key in ("contacts", "docs"):
+            if key in page and page[key] is None:
+                page[key] = []
+        total = page.get("totalContacts")
+        if total is not None and not isinstance(total, int):
+            try:
+                page["totalContacts"] = int(total)
+            except (TypeError, ValueError):
+                page.pop("totalContacts")
+    return page
+
+
+# =============================================================================
+# Helpers para respuestas HTTP (requests / httpx)
+# =============================================================================
+
+def decode_response(response):
+    """Parses a requests/httpx response body with the active codec."""
+    return loads(response.content)
+
+
+def decode_contacts_response(response):
+    """Parses a /contacts requests/httpx response body."""
+    return decode_contacts_page(response.content)
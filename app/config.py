@@ -10,4 +10,11 @@ ALLOWED_ACTIONS = [
     "create_contact",
     "update_contact",
     "list_contacts",
-]
\ No newline at end of file
+    "bulk_create_contacts",
+    "list_pending_writes",
+    "propose_contact_change",
+    "update_contact_by_reference",
+]
+
+# Respuesta cuando se agota el presupuesto de tiempo de un mensaje
+STILL_WORKING_MESSAGE = "Sigo trabajando en tu solicitud, te respondo en un momento 🙏"
@@ -0,0 +1,171 @@
+"""
+Confirmation step of create/update without an LLM round.
+When the session holds a pending proposal (app/tools/pending_actions.py),
+a plain "sí"/"no" executes or discards it right away with a templated
+reply. The call goes through the same async tools (and validation) the
+agent uses, and is recorded in the session as a regular function call and
+response. Any other message drops the proposal and goes to the agent, which
+can propose again with the corrected data.
+
+The proposal runs only for the session's own seller (its seller_email came
+from model-supplied tool arguments), and it is removed from the session
+before the CRM call, so a repeated "sí" cannot run the write twice.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from .fast_path import append_turn, normalize_message
+from .result_shaping import shape_error, strip_metadata
+from .tools.pending_actions import CREATE, STATE_KEY, execute_pending
+
+logger = logging.getLogger(__name__)
+
+PENDING_ACTIONS_ENABLED = os.getenv("PENDING_ACTIONS_ENABLED", "true").lower() in ("1", "true", "yes")
+PENDING_ACTION_TTL_SECONDS = float(os.getenv("PENDING_ACTION_TTL_SECONDS", "900"))
+
+YES, NO = "yes", "no"
+
+# Todas las palabras del mensaje deben estar en el conjunto, con al menos una "fuerte"
+_YES_STRONG = {"si", "confirmo", "confirmado", "confirmar", "dale", "ok", "okay", "okey", "yes", "correcto",
+               "adelante", "hazlo", "claro", "va", "sale", "acuerdo", "exacto", "sure", "yep"}
+_YES_FILLER = {"de", "por", "favor", "porfa", "please", "gracias", "perfecto", "listo", "todo", "bien", "esta", "asi"}
+_NO_STRONG = {"no", "nop", "nope", "cancela", "cancelar", "cancelalo", "olvidalo", "dejalo", "negativo"}
+_NO_FILLER = {"mejor", "gracias", "asi", "por", "ahora", "todavia", "aun", "esta", "bien", "ya"}
+
+REPLY_TEMPLATES = {
+    "created": "✅ Listo, guardé a {label} en tus contactos.",
+    "updated": "✅ Listo, actualicé a {label}.",
+    "queued": "✅ Recibido, {label} quedará guardado en el CRM en unos segundos.",
+    "not_found": "No encontré a '{label}' en tus contactos. ¿Me das su email o teléfono?",
+    "ambiguous": "Tengo varios contactos que coinciden con '{label}'. ¿Me das su email o teléfono?",
+    "error": "❌ No pude guardar el cambio: {message}",
+    "cancelled": "Entendido, no hice ningún cambio.",
+    "in_progress": "⏳ Ya estoy guardando el cambio, dame un momento.",
+}
+
+
+def classify_confirmation(message: str) -> str | None:
+    """YES/NO for a plain affirmative/negative reply, None for anything else."""
+    if (message or "").strip() in ("👍", "👌"):
+        return YES
+    words = set(normalize_message(message).split())
+    if words & _YES_STRONG and words <= _YES_STRONG | _YES_FILLER and "no" not in words:
+        return YES
+    if words & _NO_STRONG and words <= _NO_STRONG | _NO_FILLER:
+        return NO
+    return None
+
+
+def result_reply(pending: dict, result: dict) -> str:
+    """Templated answer for the result of an executed proposal."""
+    label = pending.get("label") or "el contacto"
+    status = result.get("status")
+    if status == "success":
+        return REPLY_TEMPLATES["created" if pending["action"] == CREATE else "updated"].format(label=label)
+    if status == "queued":
+        return REPLY_TEMPLATES["queued"].format(label=label)
+    if status in ("not_found", "ambiguous"):
+        return REPLY_TEMPLATES[status].format(label=label)
+    return REPLY_TEMPLATES["error"].format(message=shape_error(result).get("message", "error desconocido"))
+
+
+class ConfirmationRouter:
+    """Executes or discards the session's pending proposal on a yes/no reply."""
+
+    def __init__(self, ttl_seconds: float = PENDING_ACTION_TTL_SECONDS, enabled: bool = PENDING_ACTIONS_ENABLED, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.confirmed = 0
+        self.cancelled = 0
+        self.abandoned = 0
+        self.expired = 0
+        self.rejected = 0
+        # Sesiones con una confirmación ejecutándose ahora (un "sí" repetido no la repite)
+        self._executing: set = set()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def handle(self, session_service, app_name: str, user_id: str, session_id: str, message: str, author: str) -> str | None:
+        """
+        Answers a yes/no to a pending proposal. Returns None (after dropping
+        the proposal, if any) when the message must go to the agent.
+        """
+        if not self.enabled:
+            return None
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        pending = session.state.get(STATE_KEY) if session else None
+        if not pending:
+            return None
+
+        clear = {STATE_KEY: None}
+        answer = classify_confirmation(message)
+        if self._clock() - pending.get("created_at", 0) > self.ttl_seconds:
+            self._count("expired")
+            answer = None
+        elif answer is None:
+            self._count("abandoned")
+        seller_email = session.state.get("seller_email")
+        if answer == YES and pending.get("seller_email") != seller_email:
+            # El seller de la propuesta viene de los argumentos del modelo: nunca se usa otro que el de la sesión
+            logger.warning("⚠️ [Confirm] Pending action for another seller, dropped")
+            self._count("rejected")
+            answer = None
+        if answer is None:
+            # Otro mensaje: la propuesta se descarta y el agente decide con el historial
+            await session_service.append_event(
+                session, Event(invocation_id=Event.new_id(), author=author, actions=EventActions(state_delta=clear))
+            )
+            return None
+
+        if answer == NO:
+            self._count("cancelled")
+            reply = REPLY_TEMPLATES["cancelled"]
+            await append_turn(session_service, session, author, message, reply, state_delta=clear)
+            logger.info("⚡ [Confirm] Pending action cancelled")
+            return reply
+
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            if key in self._executing:
+                return REPLY_TEMPLATES["in_progress"]
+            self._executing.add(key)
+        try:
+            # La propuesta sale de la sesión antes de llamar al CRM
+            await session_service.append_event(
+                session, Event(invocation_id=Event.new_id(), author=author, actions=EventActions(state_delta=clear))
+            )
+            self._count("confirmed")
+            result = await execute_pending(pending, seller_email)
+        finally:
+            with self._lock:
+                self._executing.discard(key)
+        reply = result_reply(pending, result)
+        tool_name = "create_contact" if pending["action"] == CREATE else "update_contact"
+        call_id = f"confirm-{int(self._clock() * 1000)}"
+        call = types.FunctionCall(id=call_id, name=tool_name, args={"seller_email": seller_email, **pending["args"]})
+        response = types.FunctionResponse(id=call_id, name=tool_name, response=strip_metadata(result))
+        await append_turn(session_service, session, author, message, reply, tool_parts=((call, response),))
+        logger.info(f"⚡ [Confirm] {tool_name} executed without the LLM: {result.get('status')}")
+        return reply
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "confirmed": self.confirmed,
+                "cancelled": self.cancelled,
+                "abandoned": self.abandoned,
+                "expired": self.expired,
+                "rejected": self.rejected,
+            }
+
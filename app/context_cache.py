@@ -0,0 +1,272 @@
+"""
+Gemini explicit context caching for the static part of the request.
+The static system instruction (app/prompt.py static_prompt) and the tool
+declarations are the same for every seller and turn, so they are uploaded
+once as a cached-content handle shared by all sessions. Requests then carry
+`cached_content` plus a small first user turn with the seller/time block.
+
+The handle's TTL is extended shortly before it expires. If the cache cannot
+be created (too few tokens, quota, unsupported model) requests go out
+unchanged and creation is retried later; if a cached request fails, the
+error callback resends it without the cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .callbacks import render_static_instruction
+from .config import AGENT_NAME, COMPANY
+
+logger = logging.getLogger(__name__)
+
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+GEMINI_CACHE_REFRESH_MARGIN_SECONDS = int(os.getenv("GEMINI_CACHE_REFRESH_MARGIN_SECONDS", "300"))
+GEMINI_CACHE_RETRY_SECONDS = int(os.getenv("GEMINI_CACHE_RETRY_SECONDS", "600"))
+
+# Encabezado del turno inicial con el bloque dinámico (seller, hora)
+DYNAMIC_CONTEXT_HEADER = "[session context]"
+
+
+class _Handle:
+    def __init__(self, key: str, name: str, expires_at: float, tools, tool_config):
+        self.key = key
+        self.name = name
+        self.expires_at = expires_at
+        # Se guardan para poder reconstruir el request si hay que reenviarlo sin cache
+        self.tools = tools
+        self.tool_config = tool_config
+
+
+class StaticContextCache:
+    """
+    Shared cached-content handle for the static instruction + tools (one per model).
+    `client_factory()` returns the google-genai client of the agent's model
+    (FakeGemini's fake client in offline tests).
+    """
+
+    def __init__(
+        self,
+        client_factory,
+        static_instruction: str | None = None,
+        ttl_seconds: int = GEMINI_CACHE_TTL_SECONDS,
+        refresh_margin: int = GEMINI_CACHE_REFRESH_MARGIN_SECONDS,
+        retry_seconds: int = GEMINI_CACHE_RETRY_SECONDS,
+        enabled: bool = GEMINI_CONTEXT_CACHE,
+        clock=time.time,
+    ):
+        self._client_factory = client_factory
+        self.static_instruction = static_instruction or render_static_instruction(AGENT_NAME, COMPANY)
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.retry_seconds = retry_seconds
+        self.enabled = enabled
+        self._clock = clock
+        # Un handle por modelo (el router de modelos puede alternar entre tiers)
+        self._handles: dict[str, _Handle] = {}
+        self._disabled_until: dict[str, float] = {}
+        self._last_model: str | None = None
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._stats_lock = threading.Lock()
+        self.created = 0
+        self.refreshed = 0
+        self.create_errors = 0
+        self.fallbacks = 0
+        self.cached_requests = 0
+        self.uncached_requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    # -------------------------------------------------------------------------
+    # Handle
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def fingerprint(model: str, instruction: str, tools, tool_config) -> str:
+        data = {
+            "model": model,
+            "instruction": instruction,
+            "tools": [t.model_dump(mode="json", exclude_none=True) for t in tools or []],
+            "tool_config": tool_config.model_dump(mode="json", exclude_none=True) if tool_config else None,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _lock(self) -> asyncio.Lock:
+        # Un lock por event loop (tests y scripts crean loops nuevos)
+        loop_id = id(asyncio.get_running_loop())
+        lock = self._locks.get(loop_id)
+        if lock is None:
+            lock = self._locks[loop_id] = asyncio.Lock()
+        return lock
+
+    async def get_handle(self, model: str, tools, tool_config) -> _Handle | None:
+        """Returns a live handle for this model/tools, creating or refreshing it if needed."""
+        key = self.fingerprint(model, self.static_instruction, tools, tool_config)
+        async with self._lock():
+            now = self._clock()
+            self._last_model = model
+            handle = self._handles.get(model)
+            if handle and handle.key == key and handle.expires_at - now > self.refresh_margin:
+                return handle
+            if now < self._disabled_until.get(model, 0.0):
+                return None
+            client = self._client_factory()
+            if handle and handle.key == key and handle.expires_at > now:
+                try:
+                    await client.aio.caches.update(
+                        name=handle.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+                    )
+                    handle.expires_at = now + self.ttl_seconds
+                    self.refreshed += 1
+                    return handle
+                except Exception as e:
+                    logger.warning(f"⚠️ [ContextCache] Refresh failed, creating a new cache: {e}")
+            try:
+                cached = await client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=f"static-{key}",
+                        system_instruction=self.static_instruction,
+                        tools=tools or None,
+                        tool_config=tool_config,
+                        ttl=f"{self.ttl_seconds}s",
+                    ),
+                )
+            except Exception as e:
+                self.create_errors += 1
+                self._disabled_until[model] = now + self.retry_seconds
+                logger.warning(f"⚠️ [ContextCache] Unavailable, sending uncached requests: {e}")
+                return None
+            if handle and handle.key != key:
+                await self._delete(client, handle.name)
+            handle = self._handles[model] = _Handle(key, cached.name, now + self.ttl_seconds, tools, tool_config)
+            self.created += 1
+            logger.info(f"🗄️ [ContextCache] Created {cached.name} for {model}")
+            return handle
+
+    async def _delete(self, client, name: str) -> None:
+        try:
+            await client.aio.caches.delete(name=name)
+        except Exception as e:
+            logger.debug(f"[ContextCache] Could not delete {name}: {e}")
+
+    def invalidate(self, model: str | None = None) -> None:
+        if model is None:
+            self._handles.clear()
+        else:
+            self._handles.pop(model, None)
+
+    # -------------------------------------------------------------------------
+    # Callbacks
+    # -------------------------------------------------------------------------
+
+    async def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Moves the static instruction and tools into the cached-content handle."""
+        config = llm_request.config
+        instruction = config.system_instruction if config else None
+        if not self.enabled or not isinstance(instruction, str) or not instruction.startswith(self.static_instruction):
+            self._count(cached=False)
+            return None
+
+        handle = await self.get_handle(llm_request.model, config.tools, config.tool_config)
+        if handle is None:
+            self._count(cached=False)
+            return None
+
+        dynamic = instruction[len(self.static_instruction):].strip()
+        config.cached_content = handle.name
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+        if dynamic:
+            llm_request.contents.insert(
+                0, types.Content(role="user", parts=[types.Part(text=f"{DYNAMIC_CONTEXT_HEADER}\n{dynamic}")])
+            )
+        self._count(cached=True)
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Accumulates prompt/cached token counts from the usage metadata."""
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            with self._stats_lock:
+                self.prompt_tokens += usage.prompt_token_count or 0
+                self.cached_tokens += usage.cached_content_token_count or 0
+            if usage.cached_content_token_count:
+                logger.info(
+                    f"🗄️ [ContextCache] {usage.cached_content_token_count}/{usage.prompt_token_count} prompt tokens cached"
+                )
+        return None
+
+    async def on_model_error_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        """If a cached request failed, drops the handle and resends the request uncached."""
+        handle = self._handles.get(llm_request.model)
+        config = llm_request.config
+        if not config or not config.cached_content or handle is None or config.cached_content != handle.name:
+            return None
+        logger.warning(f"⚠️ [ContextCache] Cached request failed, retrying without cache: {error}")
+        self.invalidate(llm_request.model)
+        self.fallbacks += 1
+        self._restore(llm_request, handle)
+        response = await self._client_factory().aio.models.generate_content(
+            model=llm_request.model, contents=llm_request.contents, config=llm_request.config
+        )
+        llm_response = LlmResponse.create(response)
+        self.after_model_callback(callback_context, llm_response)
+        return llm_response
+
+    def _restore(self, llm_request: LlmRequest, handle: _Handle) -> None:
+        """Undoes before_model_callback: instruction and tools back in the request."""
+        config = llm_request.config
+        instruction = self.static_instruction
+        contents = llm_request.contents
+        first = contents[0] if contents else None
+        if first and first.role == "user" and first.parts and (first.parts[0].text or "").startswith(DYNAMIC_CONTEXT_HEADER):
+            dynamic = contents.pop(0).parts[0].text[len(DYNAMIC_CONTEXT_HEADER):].strip()
+            instruction += "\n" + dynamic
+        config.cached_content = None
+        config.system_instruction = instruction
+        config.tools = handle.tools
+        config.tool_config = handle.tool_config
+
+    def _count(self, cached: bool) -> None:
+        with self._stats_lock:
+            if cached:
+                self.cached_requests += 1
+            else:
+                self.uncached_requests += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            handle = self._handles.get(self._last_model)
+            return {
+                "enabled": self.enabled,
+                "cache_name": handle.name if handle else None,
+                "caches": {model: h.name for model, h in self._handles.items()},
+                "expires_in_seconds": round(handle.expires_at - self._clock()) if handle else None,
+                "created": self.created,
+                "refreshed": self.refreshed,
+                "create_errors": self.create_errors,
+                "fallbacks": self.fallbacks,
+                "cached_requests": self.cached_requests,
+                "uncached_requests": self.uncached_requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_token_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            }
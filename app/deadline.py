@@ -0,0 +1,71 @@
+"""
+Per-request deadline budget.
+The webhook opens a deadline scope when a message arrives; the LLM call,
+the CRM tools and the WhatsApp send read it from a context variable and
+only use the time that is left, instead of stacking their own timeouts.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage has no budget left to start."""
+
+
+class Deadline:
+    """Absolute deadline on the monotonic clock. Can be extended."""
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def extend(self, seconds: float) -> None:
+        """Moves the deadline to `seconds` from now (e.g. for background completion)."""
+        self.expires_at = self._clock() + seconds
+
+    def timeout(self, cap: float | None = None, reserve: float = 0.0) -> float:
+        """Timeout for the next stage: remaining budget minus `reserve`, capped at `cap`."""
+        available = self.remaining() - reserve
+        if available <= 0:
+            raise DeadlineExceeded("Request deadline exceeded.")
+        return available if cap is None else min(cap, available)
+
+
+_current: ContextVar[Deadline | None] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Sets a deadline for the current context (inherited by tasks created inside)."""
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+def remaining() -> float | None:
+    """Seconds left in the current request, or None if there is no deadline."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline else None
+
+
+def timeout_for(cap: float | None, reserve: float = 0.0) -> float | None:
+    """`cap` clamped to the remaining budget. Raises DeadlineExceeded if none is left."""
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap, reserve)
@@ -0,0 +1,170 @@
+"""
+Deterministic fast path for trivial WhatsApp turns.
+Greetings, "what's your name" and thanks are answered from templates
+(built from AGENT_NAME/COMPANY, matching the prompt's <greeting_examples>)
+without a Gemini round trip. Only messages made entirely of known phrases
+match: "hola, agrega a Ana" still goes to the agent, and so do "sí"/"ok"
+because they may be answering a "Confirm?".
+
+The user message and the templated reply are appended to the session as
+regular events, so the agent sees the exchange on the next turn.
+"""
+
+import logging
+import os
+import re
+import threading
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from .config import AGENT_NAME, COMPANY
+from .tools.search_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Mensajes más largos van siempre al agente
+FAST_PATH_MAX_CHARS = int(os.getenv("FAST_PATH_MAX_CHARS", "60"))
+
+GREETING, NAME, THANKS = "greeting", "name", "thanks"
+
+# Frases por intención (texto normalizado: minúsculas, sin acentos ni signos)
+INTENT_PHRASES = {
+    GREETING: [
+        "hola", "holi", "buenas", "buen dia", "buenos dias", "buenas tardes", "buenas noches",
+        "que tal", "como estas", "como te va", "saludos", "hey", "hi", "hello", "good morning",
+    ],
+    NAME: [
+        "como te llamas", "cual es tu nombre", "quien eres", "quien sos", "tu nombre",
+        "what is your name", "whats your name", "what s your name", "who are you",
+    ],
+    THANKS: [
+        "gracias", "muchas gracias", "mil gracias", "te agradezco", "muy amable", "perfecto gracias",
+        "thanks", "thank you", "thx",
+    ],
+}
+
+# Relleno permitido entre frases ("hola denisse", "gracias amiga")
+_FILLER = ["y", "a", "amiga", "amigo", "de nuevo", "otra vez"]
+
+# Prioridad cuando un mensaje mezcla intenciones ("hola, ¿cómo te llamas?")
+_PRIORITY = [NAME, THANKS, GREETING]
+
+REPLY_TEMPLATES = {
+    GREETING: "¡Hola! Soy {agent_name}, tu asistente de CRM de {company}. ¿En qué te puedo ayudar?",
+    NAME: "Soy {agent_name}, tu asistente de CRM de {company}. ¿En qué te puedo ayudar?",
+    THANKS: "¡Con gusto! Si necesitas algo más con tus contactos, aquí estoy.",
+}
+
+
+def normalize_message(message: str) -> str:
+    """normalize_text without dots/@ and with stretched letters collapsed."""
+    text = normalize_text(message).replace(".", " ").replace("@", " ")
+    # "holaaa" -> "hola", "graciasss" -> "gracias" (2 letras iguales se respetan: "llamas")
+    return " ".join(re.sub(r"(\w)\1{2,}", r"\1", text).split())
+
+
+async def append_turn(
+    session_service, session, author: str, message: str, reply: str, tool_parts: tuple = (), state_delta: dict | None = None
+) -> None:
+    """
+    Records a turn answered outside the Runner: the user message, optional
+    (function_call, function_response) parts, and the reply. `state_delta`
+    goes on the reply event.
+    """
+    invocation_id = Event.new_id()
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id, author="user",
+        content=types.Content(role="user", parts=[types.Part(text=message)]),
+    ))
+    for call, response in tool_parts:
+        await session_service.append_event(session, Event(
+            invocation_id=invocation_id, author=author,
+            content=types.Content(role="model", parts=[types.Part(function_call=call)]),
+        ))
+        await session_service.append_event(session, Event(
+            invocation_id=invocation_id, author=author,
+            content=types.Content(role="user", parts=[types.Part(function_response=response)]),
+        ))
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id, author=author,
+        content=types.Content(role="model", parts=[types.Part(text=reply)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    ))
+
+
+class FastPathRouter:
+    """Classifies a message into a scripted intent and answers it from a template."""
+
+    def __init__(
+        self,
+        agent_name: str = AGENT_NAME,
+        company: str = COMPANY,
+        enabled: bool = FAST_PATH_ENABLED,
+        max_chars: int = FAST_PATH_MAX_CHARS,
+    ):
+        self.agent_name = agent_name
+        self.company = company
+        self.enabled = enabled
+        self.max_chars = max_chars
+        self._phrase_intent = {phrase: intent for intent, phrases in INTENT_PHRASES.items() for phrase in phrases}
+        fillers = _FILLER + [normalize_text(agent_name)]
+        alternatives = sorted([*self._phrase_intent, *fillers], key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in alternatives) + r")\b")
+        self._lock = threading.Lock()
+        self.total = 0
+        self.answered: dict[str, int] = {intent: 0 for intent in INTENT_PHRASES}
+
+    def classify(self, message: str) -> str | None:
+        """Returns the scripted intent of the whole message, or None."""
+        if not message or len(message) > self.max_chars:
+            return None
+        text = normalize_message(message)
+        if not text:
+            return None
+        found = set()
+        # Todo el mensaje debe estar cubierto por frases conocidas
+        if self._pattern.sub(" ", text).strip():
+            return None
+        for match in self._pattern.finditer(text):
+            intent = self._phrase_intent.get(match.group(0))
+            if intent:
+                found.add(intent)
+        return next((intent for intent in _PRIORITY if intent in found), None)
+
+    def reply(self, intent: str) -> str:
+        return REPLY_TEMPLATES[intent].format(agent_name=self.agent_name, company=self.company)
+
+    async def handle(self, session_service, app_name: str, user_id: str, session_id: str, message: str, author: str) -> str | None:
+        """
+        Answers `message` if it is a scripted intent, appending both turns to
+        the session. Returns None when the message must go to the agent.
+        """
+        if not self.enabled:
+            return None
+        intent = self.classify(message)
+        with self._lock:
+            self.total += 1
+            if intent:
+                self.answered[intent] += 1
+        if not intent:
+            return None
+
+        reply = self.reply(intent)
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is not None:
+            await append_turn(session_service, session, author, message, reply)
+        logger.info(f"⚡ [FastPath] {intent}: answered without the LLM")
+        return reply
+
+    def stats(self) -> dict:
+        with self._lock:
+            fast = sum(self.answered.values())
+            return {
+                "enabled": self.enabled,
+                "messages": self.total,
+                "fast_path": fast,
+                "fast_path_rate": round(fast / self.total, 3) if self.total else 0.0,
+                "by_intent": dict(self.answered),
+            }
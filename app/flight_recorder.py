@@ -0,0 +1,311 @@
+"""
+Per-turn flight recorder.
+The webhook opens a turn scope per WhatsApp message; model and tool
+callbacks add one entry per call to the turn in the context variable:
+
+- model calls: model, latency, prompt/cached/output tokens, status;
+- tool calls: name, latency, result size in bytes, status;
+- stages timed by the webhook (WhatsApp send) and the total wall time.
+
+Each finished turn becomes one JSON line (keyed by seller_email and
+session_id) handed to a background thread that writes a rotating local
+file, so the request path never waits for the disk. Turns that hit the
+deadline are written when the background completion ends.
+
+`python -m app.app_utils.flight_report` prints p50/p95/p99 per stage.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from .codec import dumps
+
+logger = logging.getLogger(__name__)
+
+FLIGHT_RECORDER_ENABLED = os.getenv("FLIGHT_RECORDER_ENABLED", "false").lower() in ("1", "true", "yes")
+FLIGHT_RECORDER_PATH = os.getenv("FLIGHT_RECORDER_PATH", "flight_records.jsonl")
+FLIGHT_RECORDER_MAX_BYTES = int(os.getenv("FLIGHT_RECORDER_MAX_BYTES", str(10 * 1024 * 1024)))
+FLIGHT_RECORDER_BACKUPS = int(os.getenv("FLIGHT_RECORDER_BACKUPS", "5"))
+# Turnos en espera de escritura; si se llena se descartan (nunca se bloquea el request)
+FLIGHT_RECORDER_QUEUE_SIZE = int(os.getenv("FLIGHT_RECORDER_QUEUE_SIZE", "10000"))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _payload_bytes(value) -> int:
+    try:
+        return len(dumps(value))
+    except Exception:
+        return len(str(value).encode("utf-8"))
+
+
+class TurnRecord:
+    """Calls and stage timings of one turn (monotonic clock for latencies)."""
+
+    def __init__(self, seller_email: str, session_id: str, clock=time.monotonic):
+        self._clock = clock
+        self.seller_email = seller_email
+        self.session_id = session_id
+        self.timestamp = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.started = clock()
+        self.path = "agent"
+        self.finished = True
+        self.deferred = False
+        self.written = False
+        self.error: str | None = None
+        self.model_calls: list[dict] = []
+        self.tool_calls: list[dict] = []
+        self.stages: dict[str, float] = {}
+        # invocation_id -> (modelo, inicio); function_call_id -> inicio
+        self._models_inflight: dict[str, tuple] = {}
+        self._tools_inflight: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times a webhook stage (accumulates if it runs more than once)."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + _ms(self._clock() - started), 1)
+
+    def add_model_call(self, model: str, seconds: float, usage, status: str) -> None:
+        """One finished LLM call (also used by the model router for escalations)."""
+        self.model_calls.append({
+            "model": model,
+            "latency_ms": _ms(seconds),
+            "prompt_tokens": (usage.prompt_token_count or 0) if usage else 0,
+            "cached_tokens": (usage.cached_content_token_count or 0) if usage else 0,
+            "output_tokens": (usage.candidates_token_count or 0) if usage else 0,
+            "status": status,
+        })
+
+    def as_dict(self) -> dict:
+        return {
+            "ts": self.timestamp,
+            "seller_email": self.seller_email,
+            "session_id": self.session_id,
+            "path": self.path,
+            "finished": self.finished,
+            "error": self.error,
+            "wall_ms": _ms(self._clock() - self.started),
+            "llm_rounds": len(self.model_calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in self.model_calls),
+            "cached_tokens": sum(c["cached_tokens"] for c in self.model_calls),
+            "output_tokens": sum(c["output_tokens"] for c in self.model_calls),
+            "model_calls": self.model_calls,
+            "tool_calls": self.tool_calls,
+            "stages": self.stages,
+        }
+
+
+_current: ContextVar[TurnRecord | None] = ContextVar("flight_turn", default=None)
+
+
+def current_turn() -> TurnRecord | None:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Times a stage of the current turn (no-op without a turn)."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    with record.stage(name):
+        yield
+
+
+class FlightRecorder:
+    """Turn scope, model/tool callbacks and the background JSONL writer."""
+
+    def __init__(
+        self,
+        path: str = FLIGHT_RECORDER_PATH,
+        enabled: bool = FLIGHT_RECORDER_ENABLED,
+        max_bytes: int = FLIGHT_RECORDER_MAX_BYTES,
+        backups: int = FLIGHT_RECORDER_BACKUPS,
+        queue_size: int = FLIGHT_RECORDER_QUEUE_SIZE,
+        clock=time.monotonic,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._clock = clock
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._listener: QueueListener | None = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+
+    # -------------------------------------------------------------------------
+    # Turnos
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def turn(self, seller_email: str, session_id: str):
+        """
+        Records a turn for the current context (inherited by tasks created
+        inside). Written on exit unless deferred (see defer/finish).
+        """
+        if not self.enabled:
+            yield None
+            return
+        record = TurnRecord(seller_email, session_id, self._clock)
+        token = _current.set(record)
+        try:
+            yield record
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            if not record.deferred:
+                self.finish(record)
+
+    def defer(self, record: TurnRecord | None) -> None:
+        """The turn continues in background: finish() writes it later."""
+        if record is not None:
+            record.deferred = True
+            record.finished = False
+
+    def finish(self, record: TurnRecord | None) -> None:
+        """Queues the turn for writing (once)."""
+        if record is None or record.written:
+            return
+        record.written = True
+        self._write(record.as_dict())
+
+    # -------------------------------------------------------------------------
+    # Callbacks
+    # -------------------------------------------------------------------------
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Marks the start of the LLM call (goes last: the model is already chosen)."""
+        record = _current.get()
+        if record is not None:
+            record._models_inflight[callback_context.invocation_id] = (llm_request.model, self._clock())
+        return None
+
+    def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        record = _current.get()
+        if record is not None and not llm_response.partial:
+            self._model_done(record, callback_context, "error" if llm_response.error_code else "ok", llm_response)
+        return None
+
+    def on_model_error_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        record = _current.get()
+        if record is not None:
+            self._model_done(record, callback_context, type(error).__name__, None)
+        return None
+
+    def _model_done(self, record: TurnRecord, callback_context, status: str, llm_response) -> None:
+        inflight = record._models_inflight.pop(callback_context.invocation_id, None)
+        if inflight is None:
+            return
+        model, started = inflight
+        usage = llm_response.usage_metadata if llm_response is not None else None
+        record.add_model_call(model, self._clock() - started, usage, status)
+
+    def before_tool_callback(self, tool, args: dict, tool_context) -> Optional[dict]:
+        record = _current.get()
+        if record is not None:
+            record._tools_inflight[tool_context.function_call_id] = self._clock()
+        return None
+
+    def after_tool_callback(self, tool, args: dict, tool_context, tool_response) -> Optional[dict]:
+        """Records the raw result (goes before the result shaper, which may replace it)."""
+        record = _current.get()
+        if record is not None:
+            status = tool_response.get("status", "ok") if isinstance(tool_response, dict) else "ok"
+            self._tool_done(record, tool, tool_context, str(status), _payload_bytes(tool_response))
+        return None
+
+    def on_tool_error_callback(self, tool, args: dict, tool_context, error: Exception) -> Optional[dict]:
+        record = _current.get()
+        if record is not None:
+            self._tool_done(record, tool, tool_context, type(error).__name__, 0)
+        return None
+
+    def _tool_done(self, record: TurnRecord, tool, tool_context, status: str, payload_bytes: int) -> None:
+        started = record._tools_inflight.pop(tool_context.function_call_id, None)
+        if started is None:
+            return
+        record.tool_calls.append({
+            "name": tool.name,
+            "latency_ms": _ms(self._clock() - started),
+            "payload_bytes": payload_bytes,
+            "status": status,
+        })
+
+    # -------------------------------------------------------------------------
+    # Escritura en segundo plano
+    # -------------------------------------------------------------------------
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._listener is not None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._listener = QueueListener(self._queue, handler)
+            self._listener.start()
+            atexit.register(self.close)
+
+    def _write(self, data: dict) -> None:
+        self._start()
+        line = dumps(data).decode("utf-8")
+        try:
+            self._queue.put_nowait(logging.makeLogRecord({"msg": line, "args": None}))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.recorded += 1
+
+    def close(self) -> None:
+        """Flushes the pending lines and stops the writer thread."""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "path": self.path,
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize(),
+            }
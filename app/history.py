@@ -0,0 +1,232 @@
+"""
+Conversation history compaction before each LLM call.
+WhatsApp sessions use the phone number as a permanent session_id, so the
+event history grows without limit and every call would resend all of it.
+The request sent to Gemini keeps the last HISTORY_KEEP_TURNS turns verbatim;
+older turns are folded into one rolling summary (user/assistant text plus a
+one-line note per tool call), and tool results older than
+HISTORY_TOOL_KEEP_TURNS turns are reduced to their status and counts.
+If the result is still above HISTORY_TOKEN_BUDGET, fewer turns are kept.
+
+Only the request is rewritten; the session events stay complete. Ordinal
+references ("the second one") keep working after a listing is dropped
+because the listing is also stored in the session state (session_contacts).
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "true").lower() in ("1", "true", "yes")
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_TOOL_KEEP_TURNS = int(os.getenv("HISTORY_TOOL_KEEP_TURNS", "2"))
+# Tokens estimados del historial (sin la instrucción de sistema)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+HISTORY_TOOL_PAYLOAD_MAX_CHARS = int(os.getenv("HISTORY_TOOL_PAYLOAD_MAX_CHARS", "600"))
+
+SUMMARY_HEADER = "[earlier conversation summary]"
+# Largo máximo de cada mensaje dentro del resumen
+_LINE_MAX_CHARS = 200
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def estimate_tokens(contents: list) -> int:
+    """~4 characters per token over text, function call args and responses."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            if part.function_call:
+                chars += len(part.function_call.name or "") + _json_size(part.function_call.args or {})
+            if part.function_response:
+                chars += len(part.function_response.name or "") + _json_size(part.function_response.response or {})
+    return chars // 4
+
+
+def _is_user_message(content: types.Content) -> bool:
+    """A turn starts with a user content carrying text (not a function response)."""
+    parts = content.parts or []
+    return (
+        content.role == "user"
+        and any(p.text for p in parts)
+        and not any(p.function_response for p in parts)
+    )
+
+
+def split_turns(contents: list) -> list[list]:
+    """Groups contents into turns: user message + the model/tool events that follow."""
+    turns = []
+    for content in contents:
+        if not turns or _is_user_message(content):
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def _shorten(text: str, limit: int = _LINE_MAX_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _result_note(response: dict) -> str:
+    """status + counts of a tool result, e.g. "success, contacts=25"."""
+    if not isinstance(response, dict):
+        return "done"
+    notes = [str(response["status"])] if "status" in response else []
+    notes += [f"{key}={len(value)}" for key, value in response.items() if isinstance(value, list)]
+    if response.get("status") not in (None, "success") and response.get("message"):
+        notes.append(_shorten(str(response["message"]), 80))
+    return ", ".join(notes) or "done"
+
+
+def summarize_turn(turn: list) -> list[str]:
+    """One line per message and per tool call of an old turn."""
+    lines = []
+    for content in turn:
+        for part in content.parts or []:
+            if part.function_call:
+                args = ", ".join(f"{k}={_shorten(str(v), 40)}" for k, v in (part.function_call.args or {}).items())
+                lines.append(f"  · {part.function_call.name}({args})")
+            elif part.function_response:
+                lines.append(f"    → {part.function_response.name}: {_result_note(part.function_response.response)}")
+            elif part.text and not part.thought:
+                speaker = "User" if content.role == "user" else "Assistant"
+                lines.append(f"- {speaker}: {_shorten(part.text)}")
+    return lines
+
+
+def stub_tool_payload(response: dict) -> dict:
+    """Replaces a stale tool result by its status, message and list sizes."""
+    if not isinstance(response, dict):
+        return {"omitted": "stale tool result"}
+    stub = {key: response[key] for key in ("status", "message") if key in response}
+    stub.update({f"{key}_count": len(value) for key, value in response.items() if isinstance(value, list)})
+    stub["omitted"] = "stale tool result"
+    return stub
+
+
+def _strip_payloads(turn: list, max_chars: int) -> tuple[list, int]:
+    """Copy of the turn with large function responses replaced by stubs."""
+    stripped, dropped = [], 0
+    for content in turn:
+        parts, changed = [], False
+        for part in content.parts or []:
+            response = part.function_response
+            if response and _json_size(response.response or {}) > max_chars:
+                parts.append(types.Part(function_response=types.FunctionResponse(
+                    id=response.id, name=response.name, response=stub_tool_payload(response.response)
+                )))
+                changed = True
+                dropped += 1
+            else:
+                parts.append(part)
+        stripped.append(types.Content(role=content.role, parts=parts) if changed else content)
+    return stripped, dropped
+
+
+class HistoryCompactor:
+    """before_model_callback that bounds the history sent in each request."""
+
+    def __init__(
+        self,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        tool_keep_turns: int = HISTORY_TOOL_KEEP_TURNS,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        summary_max_chars: int = HISTORY_SUMMARY_MAX_CHARS,
+        tool_payload_max_chars: int = HISTORY_TOOL_PAYLOAD_MAX_CHARS,
+        enabled: bool = HISTORY_COMPACTION_ENABLED,
+    ):
+        self.keep_turns = max(1, keep_turns)
+        self.tool_keep_turns = max(1, tool_keep_turns)
+        self.token_budget = token_budget
+        self.summary_max_chars = summary_max_chars
+        self.tool_payload_max_chars = tool_payload_max_chars
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.compacted = 0
+        self.over_budget = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def summary(self, turns: list) -> types.Content | None:
+        """Rolling summary of the given turns; the oldest lines go first when it is too long."""
+        lines = [line for turn in turns for line in summarize_turn(turn)]
+        if not lines:
+            return None
+        text = "\n".join(lines)
+        if len(text) > self.summary_max_chars:
+            text = "…\n" + text[-self.summary_max_chars:].split("\n", 1)[-1]
+        return types.Content(role="user", parts=[types.Part(text=f"{SUMMARY_HEADER}\n{text}")])
+
+    def compact(self, contents: list) -> list:
+        """Returns the contents to send: summary + recent turns within the token budget."""
+        turns = split_turns(contents)
+        keep = min(self.keep_turns, len(turns))
+        while True:
+            older, recent = turns[:-keep], turns[-keep:]
+            compacted = []
+            summary = self.summary(older)
+            if summary:
+                compacted.append(summary)
+            # Los resultados de tools de los últimos turnos quedan completos
+            stale = max(0, len(recent) - self.tool_keep_turns)
+            for i, turn in enumerate(recent):
+                if i < stale:
+                    turn, _ = _strip_payloads(turn, self.tool_payload_max_chars)
+                compacted.extend(turn)
+            tokens = estimate_tokens(compacted)
+            if tokens <= self.token_budget or keep == 1:
+                break
+            keep -= 1
+        if tokens > self.token_budget:
+            with self._lock:
+                self.over_budget += 1
+            logger.warning(f"⚠️ [History] Current turn alone is ~{tokens} tokens (budget {self.token_budget})")
+        return compacted
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Replaces llm_request.contents with the compacted history."""
+        if not self.enabled or not llm_request.contents:
+            return None
+        before = estimate_tokens(llm_request.contents)
+        compacted = self.compact(llm_request.contents)
+        after = estimate_tokens(compacted)
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            if after < before:
+                self.compacted += 1
+        if after < before:
+            logger.info(f"🗜️ [History] {len(llm_request.contents)} → {len(compacted)} contents, ~{before} → ~{after} tokens")
+            llm_request.contents = compacted
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self.requests,
+                "compacted": self.compacted,
+                "over_budget": self.over_budget,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_ratio": round(1 - self.tokens_after / self.tokens_before, 3) if self.tokens_before else 0.0,
+            }
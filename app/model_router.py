@@ -0,0 +1,277 @@
+"""
+Per-request model tiering.
+With MODEL_TIERING_ENABLED=true each LLM request is routed to the light
+model (GEMINI_LIGHT_MODEL) or to the agent's model by a few rules:
+
+- strong: a write is in progress (pending proposal or update candidates),
+  the user message asks for a write or carries contact data (email/phone),
+  a write tool result has to be phrased, the request is long (turns or
+  estimated tokens actually sent, after history compaction), or the
+  session recently needed an escalation;
+- light: everything else (greetings that reached the agent, listings and
+  phrasing read-only tool results).
+
+A light response with a malformed function call (or a call to an unknown
+tool), or a failed light request, is re-sent once to the strong model and
+the session stays on the strong model for MODEL_ESCALATION_STICKY_REQUESTS
+requests. Latency and tokens are recorded per tier, and the escalated call
+is added to the flight recorder turn as its own model call.
+
+The router's error callback must run before the context cache's: a failed
+light request is escalated instead of retried uncached on the light model.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .flight_recorder import current_turn
+from .history import estimate_tokens, split_turns
+from .tools.contact_update import CANDIDATES_KEY
+from .tools.pending_actions import STATE_KEY as PENDING_KEY
+
+logger = logging.getLogger(__name__)
+
+MODEL_TIERING_ENABLED = os.getenv("MODEL_TIERING_ENABLED", "false").lower() in ("1", "true", "yes")
+GEMINI_LIGHT_MODEL = os.getenv("GEMINI_LIGHT_MODEL", "gemini-2.5-flash-lite")
+# Requests con más turnos o tokens estimados que esto (ya compactados) van al modelo fuerte
+MODEL_LIGHT_MAX_TURNS = int(os.getenv("MODEL_LIGHT_MAX_TURNS", "12"))
+MODEL_LIGHT_MAX_TOKENS = int(os.getenv("MODEL_LIGHT_MAX_TOKENS", "8000"))
+# Tools de solo lectura cuyo resultado puede redactar el modelo liviano
+MODEL_LIGHT_TOOLS = frozenset(
+    t.strip() for t in os.getenv("MODEL_LIGHT_TOOLS", "list_contacts,list_pending_writes").split(",") if t.strip()
+)
+MODEL_ESCALATION_STICKY_REQUESTS = int(os.getenv("MODEL_ESCALATION_STICKY_REQUESTS", "4"))
+
+# Requests sin after/on-error (cancelados por el deadline, o respondidos por otro callback)
+MODEL_INFLIGHT_MAX_AGE_SECONDS = 600
+
+LIGHT, STRONG = "light", "strong"
+ESCALATION_KEY = "model_escalations_left"
+
+# Verbos de escritura (texto en minúsculas, con o sin acentos)
+_WRITE_INTENT = re.compile(
+    r"\b(crea|crear|creame|agrega|agregar|agregame|añade|anade|añadir|anadir|registra|registrar|guarda|guardar|"
+    r"nuevo|nueva|actualiza|actualizar|cambia|cambiar|modifica|modificar|corrige|corregir|edita|editar|"
+    r"importa|importar|carga|cargar|add|create|update|change|edit|import)\b",
+    re.I,
+)
+_CONTACT_DATA = re.compile(r"@|\d[\d\s().-]{6,}\d")
+
+
+def _last_user_text(contents: list) -> str:
+    for content in reversed(contents or []):
+        if content.role == "user":
+            return " ".join(p.text for p in content.parts or [] if p.text)
+    return ""
+
+
+def _function_responses(content) -> list:
+    return [p.function_response for p in (content.parts or []) if p.function_response] if content else []
+
+
+def choose_tier(llm_request: LlmRequest, state, max_turns: int = MODEL_LIGHT_MAX_TURNS,
+                light_tools: frozenset = MODEL_LIGHT_TOOLS, max_tokens: int = MODEL_LIGHT_MAX_TOKENS) -> tuple[str, str]:
+    """Returns (tier, reason) for one LLM request."""
+    if (state.get(ESCALATION_KEY) or 0) > 0:
+        return STRONG, "escalated"
+    if state.get(PENDING_KEY) or state.get(CANDIDATES_KEY):
+        return STRONG, "write_in_progress"
+
+    last = llm_request.contents[-1] if llm_request.contents else None
+    responses = _function_responses(last)
+    if responses:
+        if all(r.name in light_tools for r in responses):
+            return LIGHT, "read_result"
+        return STRONG, "write_result"
+
+    text = _last_user_text(llm_request.contents)
+    if _WRITE_INTENT.search(text) or _CONTACT_DATA.search(text):
+        return STRONG, "write_intent"
+    # Lo que se envía (historial compactado), no toda la sesión permanente de WhatsApp
+    contents = llm_request.contents or []
+    if len(split_turns(contents)) > max_turns or estimate_tokens(contents) > max_tokens:
+        return STRONG, "long_history"
+    return LIGHT, "simple_turn"
+
+
+def is_malformed(llm_response: LlmResponse, tool_names: set) -> bool:
+    """MALFORMED_FUNCTION_CALL or a call to a tool the agent does not have."""
+    malformed = types.FinishReason.MALFORMED_FUNCTION_CALL
+    if llm_response.finish_reason == malformed or llm_response.error_code in (malformed, malformed.value):
+        return True
+    parts = llm_response.content.parts if llm_response.content else None
+    return any(p.function_call and p.function_call.name not in tool_names for p in parts or [])
+
+
+class _TierStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+
+    def as_dict(self) -> dict:
+        done = self.requests or 1
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.latency_ms / done, 1),
+            "max_latency_ms": round(self.max_latency_ms, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+class ModelRouter:
+    """before/after/on-error model callbacks that pick the model tier per request."""
+
+    def __init__(
+        self,
+        client_factory,
+        strong_model: str,
+        light_model: str = GEMINI_LIGHT_MODEL,
+        enabled: bool = MODEL_TIERING_ENABLED,
+        max_turns: int = MODEL_LIGHT_MAX_TURNS,
+        max_tokens: int = MODEL_LIGHT_MAX_TOKENS,
+        light_tools: frozenset = MODEL_LIGHT_TOOLS,
+        sticky_requests: int = MODEL_ESCALATION_STICKY_REQUESTS,
+        clock=time.monotonic,
+    ):
+        self._client_factory = client_factory
+        self.models = {STRONG: strong_model, LIGHT: light_model}
+        self.enabled = enabled
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.light_tools = light_tools
+        self.sticky_requests = sticky_requests
+        self._clock = clock
+        self._lock = threading.Lock()
+        # invocation_id -> (tier, inicio, copia del request si es liviano)
+        self._inflight: dict[str, tuple] = {}
+        self._tiers = {LIGHT: _TierStats(), STRONG: _TierStats()}
+        self.reasons: dict[str, int] = {}
+        self.escalations = 0
+
+    # -------------------------------------------------------------------------
+    # Callbacks
+    # -------------------------------------------------------------------------
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Chooses the tier and sets llm_request.model (before the context cache callback)."""
+        if not self.enabled:
+            return None
+        state = callback_context.state
+        tier, reason = choose_tier(llm_request, state, self.max_turns, self.light_tools, self.max_tokens)
+        if reason == "escalated":
+            state[ESCALATION_KEY] = state.get(ESCALATION_KEY, 1) - 1
+        llm_request.model = self.models[tier]
+        # Copia sin cache (el callback del context cache corre después) para poder escalar
+        retry = None
+        if tier == LIGHT:
+            retry = (
+                [c.model_copy(deep=True) for c in llm_request.contents],
+                llm_request.config.model_copy(deep=True) if llm_request.config else None,
+                set(llm_request.tools_dict),
+            )
+        now = self._clock()
+        with self._lock:
+            for invocation_id in [k for k, v in self._inflight.items() if now - v[1] > MODEL_INFLIGHT_MAX_AGE_SECONDS]:
+                del self._inflight[invocation_id]
+            self._inflight[callback_context.invocation_id] = (tier, now, retry)
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        logger.info(f"🧭 [ModelRouter] {tier} ({reason}) → {llm_request.model}")
+        return None
+
+    async def after_model_callback(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """Records latency/tokens; re-sends a malformed light response to the strong model."""
+        if not self.enabled or llm_response.partial:
+            return None
+        with self._lock:
+            tier, started, retry = self._inflight.pop(callback_context.invocation_id, (None, None, None))
+        if tier is None:
+            return None
+        self._record(tier, started, llm_response)
+        if tier == LIGHT and retry and is_malformed(llm_response, retry[2]):
+            logger.warning("⚠️ [ModelRouter] Malformed function call from the light model, escalating")
+            return await self._escalate(callback_context, retry)
+        return None
+
+    async def on_model_error_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        """A failed light request is retried once on the strong model."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            tier, started, retry = self._inflight.pop(callback_context.invocation_id, (None, None, None))
+            if tier:
+                self._tiers[tier].errors += 1
+        if tier != LIGHT or not retry:
+            return None
+        logger.warning(f"⚠️ [ModelRouter] Light model failed, escalating: {error}")
+        return await self._escalate(callback_context, retry)
+
+    async def _escalate(self, callback_context: CallbackContext, retry: tuple) -> LlmResponse:
+        contents, config, _ = retry
+        callback_context.state[ESCALATION_KEY] = self.sticky_requests
+        with self._lock:
+            self.escalations += 1
+        started = self._clock()
+        turn = current_turn()
+        try:
+            response = await self._client_factory().aio.models.generate_content(
+                model=self.models[STRONG], contents=contents, config=config
+            )
+        except Exception as e:
+            if turn is not None:
+                turn.add_model_call(self.models[STRONG], self._clock() - started, None, type(e).__name__)
+            raise
+        llm_response = LlmResponse.create(response)
+        self._record(STRONG, started, llm_response)
+        if turn is not None:
+            # El flight recorder ya cerró la llamada liviana: la escalada va como llamada propia
+            turn.add_model_call(self.models[STRONG], self._clock() - started, llm_response.usage_metadata, "ok")
+        return llm_response
+
+    # -------------------------------------------------------------------------
+    # Métricas
+    # -------------------------------------------------------------------------
+
+    def _record(self, tier: str, started: float, llm_response: LlmResponse) -> None:
+        latency_ms = (self._clock() - started) * 1000
+        usage = llm_response.usage_metadata
+        with self._lock:
+            stats = self._tiers[tier]
+            stats.requests += 1
+            stats.latency_ms += latency_ms
+            stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+            if usage is not None:
+                stats.prompt_tokens += usage.prompt_token_count or 0
+                stats.cached_tokens += usage.cached_content_token_count or 0
+                stats.output_tokens += usage.candidates_token_count or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "models": dict(self.models),
+                "tiers": {tier: s.as_dict() for tier, s in self._tiers.items()},
+                "reasons": dict(self.reasons),
+                "escalations": self.escalations,
+            }
@@ -0,0 +1,222 @@
+"""
+Shaping of tool results before they reach the model (after_tool_callback).
+Whatever a tool returns is stored in the session and re-sent to Gemini on
+later turns, so every result goes through this layer:
+
+- CRM metadata keys (TOOL_RESULT_STRIP_FIELDS) are removed at any depth.
+- Error messages become {"status": "error", "code": ..., "message": ...}
+  with a short code and the CRM's own message instead of the raw body
+  ("Error API: {...}").
+- Results above the tool's byte budget keep the first TOOL_RESULT_MAX_ROWS
+  items of each list plus `<key>_total`, then long strings are cut.
+
+Budgets are per tool: TOOL_RESULT_BUDGETS="list_contacts=6000,bulk_create_contacts=3000"
+overrides TOOL_RESULT_MAX_BYTES.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from google.adk.tools import BaseTool, ToolContext
+
+from .codec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+TOOL_RESULT_SHAPING_ENABLED = os.getenv("TOOL_RESULT_SHAPING_ENABLED", "true").lower() in ("1", "true", "yes")
+TOOL_RESULT_MAX_BYTES = int(os.getenv("TOOL_RESULT_MAX_BYTES", "4000"))
+TOOL_RESULT_BUDGETS = {
+    name.strip(): int(size)
+    for name, _, size in (
+        item.partition("=") for item in os.getenv("TOOL_RESULT_BUDGETS", "").split(",") if "=" in item
+    )
+}
+TOOL_RESULT_MAX_ROWS = int(os.getenv("TOOL_RESULT_MAX_ROWS", "10"))
+TOOL_RESULT_STRIP_FIELDS = frozenset(
+    f.strip() for f in os.getenv("TOOL_RESULT_STRIP_FIELDS", "__v,userEmail,createdAt,updatedAt").split(",") if f.strip()
+)
+TOOL_ERROR_MAX_CHARS = int(os.getenv("TOOL_ERROR_MAX_CHARS", "160"))
+
+API_ERROR_PREFIX = "Error API: "
+# Listas que describen la forma del resultado y no se recortan
+_KEEP_LISTS = {"columns"}
+
+# (código, patrón) en orden; el primero que coincide gana
+_ERROR_CODES = [
+    ("invalid_input", re.compile(r"^invalid |cannot be empty|too many contacts|no contacts to import", re.I)),
+    ("duplicate_contact", re.compile(r"duplicate|already exists|ya existe|E11000|\b409\b", re.I)),
+    ("crm_unavailable", re.compile(r"temporarily unavailable|circuit", re.I)),
+    ("crm_rate_limited", re.compile(r"rate limit|too many requests|\b429\b", re.I)),
+    ("timeout", re.compile(r"deadline exceeded|timed? ?out", re.I)),
+    ("crm_unreachable", re.compile(r"connection|name resolution|unreachable", re.I)),
+    ("unauthorized", re.compile(r"unauthori[sz]ed|forbidden|\b40[13]\b", re.I)),
+]
+
+
+def _size(value) -> int:
+    return len(dumps(value))
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _api_error_message(body: str) -> str:
+    """The CRM's own message out of an "Error API: <body>" string."""
+    try:
+        data = loads(body)
+    except Exception:
+        return body
+    if isinstance(data, dict):
+        for key in ("message", "error", "detail", "msg"):
+            value = data.get(key)
+            if isinstance(value, str) and value:
+                return value
+            if isinstance(value, list) and value:
+                return "; ".join(str(v) for v in value)
+    return body
+
+
+def error_code(message: str) -> str:
+    """Short machine-readable code for a tool error message."""
+    for code, pattern in _ERROR_CODES:
+        if pattern.search(message or ""):
+            return code
+    return "crm_rejected" if str(message).startswith(API_ERROR_PREFIX) else "internal_error"
+
+
+def shape_error(result: dict, max_chars: int = TOOL_ERROR_MAX_CHARS) -> dict:
+    """{"status": "error", "message": <verbose>} -> status + code + short message."""
+    message = str(result.get("message") or "")
+    code = result.get("code") or error_code(message)
+    if message.startswith(API_ERROR_PREFIX):
+        message = _api_error_message(message[len(API_ERROR_PREFIX):])
+    shaped = {k: v for k, v in result.items() if k not in ("message", "code")}
+    shaped["code"] = code
+    if message:
+        shaped["message"] = _shorten(message, max_chars)
+    return shaped
+
+
+def strip_metadata(value, fields: frozenset = TOOL_RESULT_STRIP_FIELDS):
+    """Copy of `value` without the metadata keys, at any depth; error rows get a code."""
+    if isinstance(value, dict):
+        stripped = {k: strip_metadata(v, fields) for k, v in value.items() if k not in fields}
+        if stripped.get("status") == "error" and isinstance(stripped.get("message"), str):
+            return shape_error(stripped)
+        if stripped.get("status") == "not_found" and "code" not in stripped:
+            stripped["code"] = "not_found"
+        return stripped
+    if isinstance(value, list):
+        return [strip_metadata(v, fields) for v in value]
+    return value
+
+
+def _truncate_lists(result: dict, max_rows: int) -> dict:
+    truncated = {}
+    for key, value in result.items():
+        if isinstance(value, list) and len(value) > max_rows and key not in _KEEP_LISTS:
+            truncated[key] = value[:max_rows]
+            truncated[f"{key}_total"] = len(value)
+            truncated["truncated"] = True
+        else:
+            truncated[key] = value
+    return truncated
+
+
+def _truncate_strings(value, max_chars: int):
+    if isinstance(value, str):
+        return _shorten(value, max_chars)
+    if isinstance(value, dict):
+        return {k: _truncate_strings(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate_strings(v, max_chars) for v in value]
+    return value
+
+
+def fit_budget(result: dict, max_bytes: int, max_rows: int = TOOL_RESULT_MAX_ROWS) -> dict:
+    """Summarizes a result above `max_bytes`: counts + first rows, then shorter strings."""
+    if _size(result) <= max_bytes:
+        return result
+    rows = max_rows
+    while True:
+        shaped = _truncate_lists(result, rows)
+        if _size(shaped) <= max_bytes or rows <= 1:
+            break
+        rows //= 2
+    for max_chars in (80, 40):
+        if _size(shaped) <= max_bytes:
+            break
+        shaped = _truncate_strings(shaped, max_chars)
+    if _size(shaped) > max_bytes:
+        # Último recurso: solo los escalares y el tamaño de cada lista
+        shaped = {k: v for k, v in shaped.items() if not isinstance(v, (dict, list))}
+        shaped.update({f"{k}_total": len(v) for k, v in result.items() if isinstance(v, list)})
+        shaped["truncated"] = True
+    return shaped
+
+
+class ToolResultShaper:
+    """after_tool_callback with per-tool size budgets and error codes."""
+
+    def __init__(
+        self,
+        max_bytes: int = TOOL_RESULT_MAX_BYTES,
+        budgets: dict | None = None,
+        max_rows: int = TOOL_RESULT_MAX_ROWS,
+        strip_fields: frozenset = TOOL_RESULT_STRIP_FIELDS,
+        enabled: bool = TOOL_RESULT_SHAPING_ENABLED,
+    ):
+        self.max_bytes = max_bytes
+        self.budgets = TOOL_RESULT_BUDGETS if budgets is None else budgets
+        self.max_rows = max_rows
+        self.strip_fields = strip_fields
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict] = {}
+
+    def budget_for(self, tool_name: str) -> int:
+        return self.budgets.get(tool_name, self.max_bytes)
+
+    def shape(self, tool_name: str, result: Any) -> Any:
+        """Returns the result the model will see."""
+        if not isinstance(result, dict):
+            return result
+        shaped = strip_metadata(result, self.strip_fields)
+        return fit_budget(shaped, self.budget_for(tool_name), self.max_rows)
+
+    def after_tool_callback(
+        self, tool: BaseTool, args: dict, tool_context: ToolContext, tool_response: Any
+    ) -> Optional[dict]:
+        """Replaces the tool response with its shaped version."""
+        if not self.enabled or not isinstance(tool_response, dict):
+            return None
+        try:
+            shaped = self.shape(tool.name, tool_response)
+        except Exception as e:
+            logger.error(f"❌ [ToolResult] Could not shape {tool.name} result: {e}", exc_info=True)
+            return None
+        before, after = _size(tool_response), _size(shaped)
+        self._record(tool.name, before, after, shaped.get("status") == "error")
+        if after < before:
+            logger.info(f"✂️ [ToolResult] {tool.name}: {before} → {after} bytes")
+        return shaped
+
+    def _record(self, tool_name: str, before: int, after: int, error: bool) -> None:
+        with self._lock:
+            stats = self._tools.setdefault(
+                tool_name, {"calls": 0, "shaped": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0}
+            )
+            stats["calls"] += 1
+            stats["shaped"] += after < before
+            stats["errors"] += error
+            stats["bytes_in"] += before
+            stats["bytes_out"] += after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "tools": {name: dict(s) for name, s in self._tools.items()}}
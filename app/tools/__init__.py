@@ -1,7 +1,16 @@
-from .crm import create_contact, update_contact, list_contacts
+from .crm import create_contact, update_contact, list_contacts, list_pending_writes
+from . import crm_async
+from .bulk import bulk_create_contacts
+from .pending_actions import propose_contact_change
+from .contact_update import update_contact_by_reference
 
 __all__ = [
     "create_contact",
     "update_contact",
-    "list_contacts"
-]
\ No newline at end of file
+    "list_contacts",
+    "list_pending_writes",
+    "crm_async",
+    "bulk_create_contacts",
+    "propose_contact_change",
+    "update_contact_by_reference",
+]
@@ -0,0 +1,201 @@
+"""
+Bulk contact import.
+Validates every row up front with the same rules as create_contact, then
+pushes the creates concurrently (bounded by a semaphore) through the shared
+CRM client, in the "bulk" rate lane, and reports a result per row.
+
+From the agent tool, an import that does not fit in the request deadline at
+the bulk lane's pace runs as a background task (with its own deadline of
+CRM_BULK_BACKGROUND_SECONDS) and the tool answers right away with the
+queued count.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+
+from pydantic import BaseModel
+
+from ..deadline import deadline_scope, remaining
+from . import crm_async
+from .crm import _validate_create
+from .rate_limit import BULK, CRM_RATE_BULK_PER_SEC, rate_lane
+
+logger = logging.getLogger(__name__)
+
+BULK_CONCURRENCY = int(os.getenv("CRM_BULK_CONCURRENCY", "8"))
+BULK_MAX_ROWS = int(os.getenv("CRM_BULK_MAX_ROWS", "1000"))
+BULK_BACKGROUND_SECONDS = float(os.getenv("CRM_BULK_BACKGROUND_SECONDS", "1800"))
+
+# Referencias a importaciones en segundo plano (evita que el GC las cancele)
+_background_imports: set = set()
+
+# Alias de columnas aceptados en CSV/JSONL
+_FIELD_ALIASES = {
+    "name": ("name", "nombre"),
+    "phone_number": ("phone_number", "phoneNumber", "phone", "telefono", "teléfono"),
+    "email": ("email", "correo", "mail"),
+}
+
+
+class BulkContact(BaseModel):
+    """Contact row accepted by bulk_create_contacts (gives the model a typed schema)."""
+
+    name: str
+    phone_number: str
+    email: str
+
+
+def normalize_row(row) -> dict:
+    """Maps a raw CSV/JSONL row to {name, phone_number, email}."""
+    if isinstance(row, BaseModel):
+        row = row.model_dump()
+    if not isinstance(row, dict):
+        row = {}
+    normalized = {}
+    for field, aliases in _FIELD_ALIASES.items():
+        value = next((row[a] for a in aliases if row.get(a) not in (None, "")), "")
+        normalized[field] = str(value).strip()
+    return normalized
+
+
+def read_rows(path: str) -> list:
+    """Reads contacts from a .csv (with header) or .jsonl file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def validate_rows(seller_email: str, rows: list) -> tuple:
+    """
+    Splits rows into (valid, invalid) before any network call.
+    valid: [(row_number, contact)] · invalid: [per-row error result]
+    Duplicate emails inside the same batch are rejected.
+    """
+    valid, invalid = [], []
+    seen_emails = {}
+    for number, raw in enumerate(rows, start=1):
+        contact = normalize_row(raw)
+        error = _validate_create(seller_email, contact["name"], contact["phone_number"], contact["email"])
+        if not error and contact["email"].lower() in seen_emails:
+            error = {"status": "error", "message": f"Duplicate email in batch (row {seen_emails[contact['email'].lower()]})"}
+        if error:
+            invalid.append({"row": number, "status": "invalid", "message": error["message"], "name": contact["name"]})
+            continue
+        seen_emails[contact["email"].lower()] = number
+        valid.append((number, contact))
+    return valid, invalid
+
+
+async def import_contacts(
+    seller_email: str,
+    rows: list,
+    concurrency: int = BULK_CONCURRENCY,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Validates all rows, then creates the valid ones. Returns a per-row report.
+    The pace is set by the shared rate limiter's bulk lane (CRM_RATE_BULK_PER_SEC).
+    """
+    started = time.monotonic()
+    valid, invalid = validate_rows(seller_email, rows)
+    results = list(invalid)
+
+    if not dry_run and valid:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def push(number: int, contact: dict) -> dict:
+            async with semaphore:
+                result = await crm_async.create_contact(seller_email, **contact)
+            row = {"row": number, "status": result["status"], "name": contact["name"]}
+            if result["status"] == "success":
+                created = result.get("contact")
+                if isinstance(created, dict):
+                    row["id"] = created.get("_id") or created.get("id")
+            elif result["status"] == "queued":
+                # Con outbox la fila ya quedó aceptada; se entrega en segundo plano
+                row["write_id"] = result.get("write_id")
+            else:
+                row["message"] = result.get("message")
+            return row
+
+        # Bucket propio por seller: la importación no consume el presupuesto del chat
+        with rate_lane(BULK):
+            results.extend(await asyncio.gather(*(push(n, c) for n, c in valid)))
+    else:
+        results.extend({"row": n, "status": "valid", "name": c["name"]} for n, c in valid)
+
+    results.sort(key=lambda r: r["row"])
+    created = sum(1 for r in results if r["status"] == "success")
+    queued = sum(1 for r in results if r["status"] == "queued")
+    return {
+        "status": "success" if created or queued or dry_run else "error",
+        "total": len(rows),
+        "valid": len(valid),
+        "invalid": len(invalid),
+        "created": created,
+        "queued": queued,
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "dry_run": dry_run,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "results": results,
+    }
+
+
+def _fits_in_request(creates: int) -> bool:
+    """Whether the creates fit in the request deadline at the bulk lane's pace."""
+    left = remaining()
+    # Con outbox cada fila solo se encola; sin deadline (CLI) no hay apuro
+    if left is None or crm_async._outbox or CRM_RATE_BULK_PER_SEC <= 0:
+        return True
+    # La mitad del presupuesto: el agente todavía tiene que redactar y enviar la respuesta
+    return creates / CRM_RATE_BULK_PER_SEC <= left / 2
+
+
+async def _import_in_background(seller_email: str, rows: list) -> None:
+    try:
+        with deadline_scope(BULK_BACKGROUND_SECONDS):
+            report = await import_contacts(seller_email, rows)
+        logger.info(
+            f"📥 Background import for {seller_email}: created={report['created']} "
+            f"queued={report['queued']} failed={report['failed']} invalid={report['invalid']}"
+        )
+    except Exception as e:
+        logger.error(f"❌ Background import for {seller_email} failed: {e}", exc_info=True)
+
+
+async def bulk_create_contacts(seller_email: str, contacts: list[BulkContact]) -> dict:
+    """Creates many contacts at once. Each contact needs name, phone_number and email."""
+    try:
+        if not contacts:
+            return {"status": "error", "message": "No contacts to import."}
+        if len(contacts) > BULK_MAX_ROWS:
+            return {"status": "error", "message": f"Too many contacts ({len(contacts)}). Max {BULK_MAX_ROWS} per import."}
+
+        valid, invalid = validate_rows(seller_email, contacts)
+        if valid and not _fits_in_request(len(valid)):
+            task = asyncio.create_task(_import_in_background(seller_email, contacts))
+            _background_imports.add(task)
+            task.add_done_callback(_background_imports.discard)
+            return {
+                "status": "queued",
+                "message": f"Importing {len(valid)} contacts in the background; they will show up in the CRM over the next minutes.",
+                "total": len(contacts),
+                "valid": len(valid),
+                "invalid": len(invalid),
+                "created": 0,
+                "queued": len(valid),
+                "failed": 0,
+                "results": invalid,
+            }
+
+        report = await import_contacts(seller_email, contacts)
+        # Al modelo solo le devolvemos el resumen y las filas con problemas
+        report["results"] = [r for r in report["results"] if r["status"] not in ("success", "queued")]
+        return report
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
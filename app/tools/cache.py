@@ -0,0 +1,127 @@
+"""
+In-process cache for CRM contact reads.
+Entries are keyed by (seller_email, search_term, page, limit), expire after a
+TTL and are evicted LRU-first when the cache is full. Writes for a seller
+(create/update) invalidate all of that seller's entries and bump the
+seller's generation: a read that started before the write passes the
+generation it saw to set() and is not cached.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CRM_CACHE_TTL = float(os.getenv("CRM_CACHE_TTL", "60"))  # segundos; 0 = desactivado
+CRM_CACHE_MAX_ENTRIES = int(os.getenv("CRM_CACHE_MAX_ENTRIES", "1024"))
+
+
+class ContactCache:
+    """Thread-safe TTL + LRU cache with per-seller invalidation and counters."""
+
+    def __init__(self, ttl: float = CRM_CACHE_TTL, max_entries: int = CRM_CACHE_MAX_ENTRIES, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._by_seller: dict[str, set] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(seller_email: str, search_term: str | None, page: int, limit: int) -> tuple:
+        return (seller_email, (search_term or "").strip(), int(page), int(limit))
+
+    def get(self, key: tuple):
+        """Returns the cached value or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, seller_email: str) -> int:
+        """Read before fetching; pass it to set() so a write in between wins."""
+        with self._lock:
+            return self._generations.get(seller_email, 0)
+
+    def is_current(self, seller_email: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(seller_email, 0) == generation
+
+    def set(self, key: tuple, value, generation: int | None = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and self._generations.get(key[0], 0) != generation:
+                # Lectura iniciada antes de una escritura del seller: no se guarda
+                self.stale_sets += 1
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._by_seller.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_seller(self, seller_email: str) -> int:
+        """Drops every entry of a seller. Returns how many were removed."""
+        with self._lock:
+            self._generations[seller_email] = self._generations.get(seller_email, 0) + 1
+            keys = self._by_seller.pop(seller_email, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_seller.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        # Llamar con el lock tomado
+        self._entries.pop(key, None)
+        seller_keys = self._by_seller.get(key[0])
+        if seller_keys is not None:
+            seller_keys.discard(key)
+            if not seller_keys:
+                del self._by_seller[key[0]]
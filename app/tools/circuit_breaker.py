@@ -0,0 +1,218 @@
+"""
+Circuit breaker and retry policy for the PyroTech CRM client.
+
+Each endpoint ("POST /contacts", "PUT /contact/{id}", ...) has its own
+breaker over a rolling window of recent calls. When the error rate or the
+slow-call rate crosses its threshold the circuit opens and calls fail fast
+for `open_seconds`; then a few probe calls decide whether to close it again.
+Idempotent reads are retried with jittered exponential backoff, limited by a
+retry budget so retries cannot multiply load during an incident.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+CRM_CB_WINDOW = int(os.getenv("CRM_CB_WINDOW", "20"))
+CRM_CB_MIN_CALLS = int(os.getenv("CRM_CB_MIN_CALLS", "5"))
+CRM_CB_ERROR_RATE = float(os.getenv("CRM_CB_ERROR_RATE", "0.5"))
+CRM_CB_SLOW_CALL_SECONDS = float(os.getenv("CRM_CB_SLOW_CALL_SECONDS", "5"))
+CRM_CB_SLOW_CALL_RATE = float(os.getenv("CRM_CB_SLOW_CALL_RATE", "0.8"))
+CRM_CB_OPEN_SECONDS = float(os.getenv("CRM_CB_OPEN_SECONDS", "30"))
+CRM_CB_HALF_OPEN_PROBES = int(os.getenv("CRM_CB_HALF_OPEN_PROBES", "1"))
+
+CRM_RETRY_ATTEMPTS = int(os.getenv("CRM_RETRY_ATTEMPTS", "3"))
+CRM_RETRY_BASE_SECONDS = float(os.getenv("CRM_RETRY_BASE_SECONDS", "0.2"))
+CRM_RETRY_MAX_SECONDS = float(os.getenv("CRM_RETRY_MAX_SECONDS", "2"))
+CRM_RETRY_BUDGET_RATIO = float(os.getenv("CRM_RETRY_BUDGET_RATIO", "0.2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the CRM while an endpoint's circuit is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(f"CRM temporarily unavailable ({endpoint}); retry in {retry_in:.0f}s.")
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """Groups paths by endpoint: ids and query strings are dropped."""
+    path = path.split("?", 1)[0]
+    path = re.sub(r"/[0-9a-fA-F]{24}\b", "/{id}", path)
+    return f"{method.upper()} {path}"
+
+
+def is_failure_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Rolling-window breaker for one endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = CRM_CB_WINDOW,
+        min_calls: int = CRM_CB_MIN_CALLS,
+        error_rate: float = CRM_CB_ERROR_RATE,
+        slow_call_seconds: float = CRM_CB_SLOW_CALL_SECONDS,
+        slow_call_rate: float = CRM_CB_SLOW_CALL_RATE,
+        open_seconds: float = CRM_CB_OPEN_SECONDS,
+        half_open_probes: int = CRM_CB_HALF_OPEN_PROBES,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._calls: deque = deque(maxlen=window)  # (failed, slow)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.opens = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError if the call must fail fast."""
+        with self._lock:
+            if self.state == OPEN:
+                elapsed = self._clock() - self._opened_at
+                if elapsed < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - elapsed)
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0)
+                self._probes_in_flight += 1
+
+    def record(self, failed: bool, latency: float) -> None:
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.successes += 1
+
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            total = len(self._calls)
+            failed_rate = sum(1 for f, _ in self._calls if f) / total
+            slow_rate = sum(1 for _, s in self._calls if s) / total
+            if failed_rate >= self.error_rate or slow_rate >= self.slow_call_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.opens += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "window_calls": len(self._calls),
+                "successes": self.successes,
+                "failures": self.failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakerRegistry:
+    """One breaker per endpoint, created on first use with shared settings."""
+
+    def __init__(self, **breaker_kwargs):
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, method: str, path: str) -> CircuitBreaker:
+        key = endpoint_key(method, path)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(key, **self._breaker_kwargs)
+            return breaker
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.stats() for b in breakers}
+
+
+class RetryPolicy:
+    """Jittered exponential backoff with a retry budget (retries <= ratio * requests)."""
+
+    def __init__(
+        self,
+        attempts: int = CRM_RETRY_ATTEMPTS,
+        base_seconds: float = CRM_RETRY_BASE_SECONDS,
+        max_seconds: float = CRM_RETRY_MAX_SECONDS,
+        budget_ratio: float = CRM_RETRY_BUDGET_RATIO,
+        min_budget: int = 10,
+    ):
+        self.attempts = max(1, attempts)
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: random in [0, min(max, base * 2^attempt)]."""
+        return random.uniform(0, min(self.max_seconds, self.base_seconds * (2 ** attempt)))
+
+    def acquire_retry(self) -> bool:
+        """Consumes budget for one retry. False when the budget is spent."""
+        with self._lock:
+            allowed = max(self.min_budget, self.requests * self.budget_ratio)
+            if self.retries >= allowed:
+                self.budget_exhausted += 1
+                return False
+            self.retries += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "requests": self.requests,
+                "retries": self.retries,
+                "budget_exhausted": self.budget_exhausted,
+            }
@@ -0,0 +1,172 @@
+"""
+Resolve-and-update in one tool call.
+update_contact_by_reference takes whatever the seller used to name the
+contact ("Pedro", "el segundo", an email or phone) plus the new values and
+returns, in one round trip, the ranked candidates with the diff each update
+would apply. Candidates get short tokens ("c1", "c2") kept in the session;
+after the seller picks and confirms, the same tool commits by token.
+
+With a single unambiguous candidate the proposal is also stored as the
+session's pending action, so a plain "sí" is executed by the webhook
+without another LLM round (see app/confirmations.py).
+"""
+
+import logging
+import os
+import time
+
+from google.adk.tools.tool_context import ToolContext
+
+from . import crm_async
+from .crm import _index, _validate_update
+from .pending_actions import STATE_KEY as PENDING_KEY, UPDATE, new_pending, store_pending
+from .projection import project_contact
+from .search_index import CRM_INDEX_MIN_SCORE, best_match, contact_id, contact_phone, is_exact_key, rank_contacts
+from .session_contacts import STATE_KEY as RECENT_CONTACTS_KEY, parse_ordinal, resolve_from_session
+
+logger = logging.getLogger(__name__)
+
+CRM_UPDATE_MAX_CANDIDATES = int(os.getenv("CRM_UPDATE_MAX_CANDIDATES", "3"))
+CRM_UPDATE_CANDIDATES_TTL_SECONDS = float(os.getenv("CRM_UPDATE_CANDIDATES_TTL_SECONDS", "900"))
+
+CANDIDATES_KEY = "update_candidates"
+# Score de lo que solo la búsqueda del CRM encontró: se muestra, nunca es un match claro
+CRM_ONLY_SCORE = 0.5
+
+
+def _current_values(contact: dict) -> dict:
+    return {"name": contact.get("name"), "email": contact.get("email"), "phone_number": contact_phone(contact) or None}
+
+
+def contact_diff(contact: dict, fields: dict) -> dict:
+    """{field: {"from": old, "to": new}} for the fields that would change."""
+    current = _current_values(contact)
+    return {
+        field: {"from": current.get(field), "to": value}
+        for field, value in fields.items() if value and value != current.get(field)
+    }
+
+
+def _session_candidates(state, identifier: str) -> list:
+    """An ordinal ("el segundo") or a match in the last listing shown to the seller."""
+    cid = resolve_from_session(state, identifier)
+    if not cid:
+        return []
+    recent = {c["_id"]: c for c in state.get(RECENT_CONTACTS_KEY) or []}
+    return [(1.0, recent[cid])] if cid in recent else []
+
+
+async def rank_candidates(seller_email: str, identifier: str, state=None, limit: int = CRM_UPDATE_MAX_CANDIDATES) -> list:
+    """
+    Ranked [(score, contact)] for an identifier: the session listing, or the
+    local index merged with the CRM search (skipped only for an email/phone
+    the index matches exactly: the index is partial and names repeat).
+    """
+    ranked = _session_candidates(state, identifier) if state is not None else []
+    if ranked or parse_ordinal(identifier) is not None:
+        return ranked[:limit]
+
+    ranked = [item for item in _index.search(seller_email, identifier) if item[0] >= CRM_INDEX_MIN_SCORE]
+    if not (is_exact_key(identifier) and best_match(identifier, [c for _, c in ranked])):
+        contacts = await crm_async._search_candidates(seller_email, identifier)
+        scored = rank_contacts(identifier, contacts)
+        seen = {contact_id(c) for _, c in scored}
+        # Lo que el CRM encontró con su propia búsqueda cuenta aunque el score local sea bajo
+        scored += [(CRM_ONLY_SCORE, c) for c in contacts if isinstance(c, dict) and contact_id(c) not in seen]
+        known = {contact_id(c) for _, c in ranked}
+        ranked += [item for item in scored if contact_id(item[1]) not in known]
+        ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked[:limit]
+
+
+def _is_unambiguous(identifier: str, ranked: list) -> bool:
+    if len(ranked) == 1:
+        score = ranked[0][0]
+        return score > CRM_ONLY_SCORE and score >= CRM_INDEX_MIN_SCORE
+    return best_match(identifier, [c for _, c in ranked]) is ranked[0][1]
+
+
+async def _commit(seller_email: str, candidate_token: str, tool_context: ToolContext | None) -> dict:
+    state = tool_context.state if tool_context else {}
+    stored = state.get(CANDIDATES_KEY) or {}
+    candidate = (stored.get("candidates") or {}).get(candidate_token)
+    if not candidate or time.time() - stored.get("created_at", 0) > CRM_UPDATE_CANDIDATES_TTL_SECONDS:
+        return {"status": "error", "message": f"Unknown or expired candidate token '{candidate_token}'. Search again."}
+    if stored.get("seller_email") != seller_email:
+        return {"status": "error", "message": "Candidate token belongs to another seller."}
+
+    fields = stored["fields"]
+    result = await crm_async.update_contact(
+        seller_email, candidate["_id"], fields.get("name"), fields.get("email"), fields.get("phone_number")
+    )
+    if tool_context and result.get("status") in ("success", "queued"):
+        tool_context.state[CANDIDATES_KEY] = None
+        tool_context.state[PENDING_KEY] = None
+    return result
+
+
+async def update_contact_by_reference(
+    seller_email: str,
+    identifier: str = None,
+    name: str = None,
+    email: str = None,
+    phone_number: str = None,
+    candidate_token: str = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """
+    Finds the contact to update and shows the change. Call with identifier
+    (name, email, phone or "the second one") and the new values: returns
+    ranked candidates with a token and a diff. After the user confirms a
+    candidate, call again with only candidate_token to save the change.
+    """
+    try:
+        if candidate_token:
+            return await _commit(seller_email, candidate_token.strip(), tool_context)
+
+        if not identifier:
+            return {"status": "error", "message": "identifier is required to find the contact."}
+        fields = {"name": name.strip() if name else None, "email": email, "phone_number": phone_number}
+        fields = {k: v for k, v in fields.items() if v}
+        if not fields:
+            return {"status": "error", "message": "Nothing to update: give name, phone_number or email."}
+        error = _validate_update(email, phone_number)
+        if error:
+            return error
+
+        state = tool_context.state if tool_context else None
+        ranked = await rank_candidates(seller_email, identifier, state)
+        if not ranked:
+            return {"status": "not_found", "message": "Contact not found '" + str(identifier) + "' to update."}
+
+        candidates, stored = [], {}
+        for number, (score, contact) in enumerate(ranked, start=1):
+            token = f"c{number}"
+            stored[token] = {"_id": contact_id(contact), "name": contact.get("name")}
+            candidates.append({
+                "token": token,
+                "score": round(score, 2),
+                "contact": project_contact(contact),
+                "diff": contact_diff(contact, fields),
+            })
+        if tool_context:
+            tool_context.state[CANDIDATES_KEY] = {
+                "seller_email": seller_email, "fields": fields, "candidates": stored, "created_at": time.time(),
+            }
+
+        if _is_unambiguous(identifier, ranked):
+            contact = ranked[0][1]
+            pending = new_pending(
+                UPDATE, seller_email, {"identifier": contact_id(contact), **fields},
+                contact.get("name") or identifier, before=_current_values(contact),
+            )
+            # Un solo candidato claro: el "sí" lo ejecuta el webhook sin otra llamada al LLM
+            return store_pending(tool_context, pending, candidates=candidates)
+
+        return {
+            "status": "candidates",
+            "message": "Several contacts match. Show them with their diff and ask which one to update.",
+            "candidates": candidates,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
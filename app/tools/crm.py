@@ -1,10 +1,22 @@
 
 import logging
-import requests
 import os
 import re
+import requests
 from dotenv import load_dotenv
 
+from ..codec import decode_contacts_response, decode_response
+from ..deadline import DeadlineExceeded
+from .cache import ContactCache
+from .circuit_breaker import CircuitBreakerRegistry, CircuitOpenError, RetryPolicy, is_failure_status
+from .crm_client import CRMClient
+from .mirror import CRM_MIRROR_ENABLED, ContactMirror
+from .outbox import CRM_OUTBOX_ENABLED, Outbox, OutboxWorker, RetryableWriteError
+from .projection import encode_contacts, project_contact
+from .rate_limit import RateLimiter, RateLimitExceeded
+from .search_index import CRM_INDEX_MIN_SCORE, SearchIndex, best_match, contact_id, is_exact_key, rank_contacts
+from .singleflight import SingleFlight
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -12,6 +24,30 @@ logger = logging.getLogger(__name__)
 API_BASE_URL = os.getenv("PYROTECH_API_BASE_URL", "https://api.pyrotech.io/api/v1")
 PYROTECH_API_TOKEN = os.getenv("PYROTECH_API_TOKEN")
 
+# Circuit breakers por endpoint y presupuesto de reintentos, compartidos con crm_async
+_breakers = CircuitBreakerRegistry()
+_retry_policy = RetryPolicy()
+
+# Token buckets por API token y por seller, compartidos con crm_async
+_rate_limiter = RateLimiter()
+
+# Cliente compartido: pool de conexiones keep-alive para todas las tools
+_client = CRMClient(
+    API_BASE_URL, PYROTECH_API_TOKEN, breakers=_breakers, retry_policy=_retry_policy, rate_limiter=_rate_limiter
+)
+
+# Cache de lecturas (/contacts) compartido con crm_async; se invalida al escribir
+_cache = ContactCache()
+
+# Índice local por seller para resolver nombre/email/teléfono -> _id sin red
+_index = SearchIndex()
+
+# Lecturas idénticas concurrentes comparten una sola request al CRM
+_flight = SingleFlight()
+
+# Outbox durable (opcional): las escrituras confirmadas se envían en segundo plano
+_outbox = Outbox() if CRM_OUTBOX_ENABLED else None
+
 
 # Funciones de validación
 def is_valid_email(email: str) -> bool:
@@ -39,73 +75,303 @@ def is_valid_mongo_id(id_str: str) -> bool:
 # Función interna para construir headers
 def _get_headers(seller_email: str) -> dict:
     """Constructs headers for requests to the PyroTech CRM API."""
+    return _client.headers_for(seller_email)
+
+
+def get_pool_stats() -> dict:
+    """Returns connection pool stats of the shared CRM client."""
+    return _client.pool_stats()
+
+
+def get_circuit_stats() -> dict:
+    """Returns circuit breaker state per endpoint and retry counters."""
+    return {"breakers": _breakers.stats(), "retry": _retry_policy.stats()}
+
+
+def get_rate_limit_stats() -> dict:
+    """Returns rate limiter wait/reject metrics."""
+    return _rate_limiter.stats()
+
+
+def get_cache_stats() -> dict:
+    """Returns hit/miss/eviction counters of the contact read cache."""
+    return _cache.stats()
+
+
+def get_index_stats() -> dict:
+    """Returns size and hit/miss counters of the local search index."""
+    return _index.stats()
+
+
+def get_singleflight_stats() -> dict:
+    """Returns how many identical concurrent reads were collapsed."""
+    return _flight.stats()
+
+
+def get_mirror_stats() -> dict:
+    """Returns size, sync counters and consistency age of the contact mirror."""
+    return _mirror.stats() if _mirror else {"enabled": False}
+
+
+def get_outbox_stats() -> dict:
+    """Returns pending/done/failed counts of the write outbox."""
+    return _outbox.stats() if _outbox else {"enabled": False}
+
+
+# Helpers compartidos entre las tools sync (este módulo) y async (crm_async)
+def _extract_contacts(data) -> list:
+    """Extracts the contact list from a /contacts response body."""
+    if isinstance(data, dict):
+        return data.get('contacts') or data.get('docs') or []
+    return data or []
+
+
+def _validate_create(seller_email: str, name: str, phone_number: str, email: str) -> dict | None:
+    """Returns an error dict if the create data is invalid, otherwise None."""
+    if not name or not name.strip():
+        return {"status": "error", "message": "Name cannot be empty."}
+    if not is_valid_email(email):
+        return {"status": "error", "message": f"Invalid email: {email}"}
+    if not is_valid_email(seller_email):
+        return {"status": "error", "message": f"Invalid seller email: {seller_email}"}
+    if not is_valid_phone(phone_number):
+        return {"status": "error", "message": f"Invalid phone number: {phone_number}"}
+    return None
+
+
+def _validate_update(email: str = None, phone_number: str = None) -> dict | None:
+    """Returns an error dict if the update fields are invalid, otherwise None."""
+    if email and not is_valid_email(email):
+        return {"status": "error", "message": f"Invalid email: {email}"}
+    if phone_number and not is_valid_phone(phone_number):
+        return {"status": "error", "message": f"Invalid phone number: {phone_number}"}
+    return None
+
+
+def _build_create_body(seller_email: str, name: str, phone_number: str, email: str) -> dict:
     return {
-        "Authorization": PYROTECH_API_TOKEN,
-        "Content-Type": "application/json",
-        "x-user-email": seller_email
+        "name": name.strip(),
+        "phoneNumber": phone_number,
+        "userEmail": seller_email,
+        "email": email
     }
 
-def _search_contact_internal(seller_email, term):
-    """Search for a contact internally to retrieve their ID."""
-    try:
-        url = API_BASE_URL + "/contacts?page=1&limit=20"
-        headers = _get_headers(seller_email)
-        body = {
-            "userEmail": seller_email,
-            "searchTerm": str(term).strip()
+
+def _build_update_body(seller_email: str, name: str = None, email: str = None, phone_number: str = None) -> dict:
+    body = {"userEmail": seller_email}
+    if name: body["name"] = name.strip()
+    if email: body["email"] = email
+    if phone_number: body["phoneNumber"] = phone_number
+    return body
+
+
+# Candidatos devueltos cuando un identificador coincide con varios contactos
+AMBIGUOUS_MAX_CANDIDATES = 5
+
+QUEUED_CREATE_MESSAGE = "Contact accepted; it will be saved to the CRM in the background."
+QUEUED_UPDATE_MESSAGE = "Update accepted; it will be saved to the CRM in the background."
+
+
+def _new_contact_key(email: str) -> str:
+    """Outbox ordering key for a contact that has no CRM id yet."""
+    return "new:" + email.strip().lower()
+
+
+def _list_result(data, page: int, limit: int) -> dict:
+    """Shapes a /contacts response body into the list_contacts tool result (projected fields only)."""
+    contacts_list = _extract_contacts(data)
+    total = data.get('totalContacts', len(contacts_list)) if isinstance(data, dict) else len(contacts_list)
+    return {
+        "status": "success",
+        **encode_contacts(contacts_list),
+        "total": total,
+        "page": page,
+        "limit": limit
+    }
+
+
+def _record_created(seller_email: str, created) -> None:
+    """Applies a successful create to the local read paths (cache, index, mirror)."""
+    _cache.invalidate_seller(seller_email)
+    if isinstance(created, dict):
+        _index.add(seller_email, created)
+        if _mirror:
+            _mirror.upsert(seller_email, created)
+
+
+def _record_updated(seller_email: str, contact_id: str, body: dict) -> None:
+    """Applies a successful update to the local read paths (cache, index, mirror)."""
+    fields = {k: v for k, v in body.items() if k != "userEmail"}
+    _cache.invalidate_seller(seller_email)
+    _index.merge(seller_email, contact_id, fields)
+    if _mirror:
+        _mirror.merge(seller_email, contact_id, fields)
+
+
+def _update_result(seller_email: str, contact_id: str, body: dict, response) -> dict:
+    """Tool result of a PUT /contact; the local read paths only change if the CRM accepted it."""
+    if response.status_code >= 400:
+        return {"status": "error", "message": "Error API: " + str(response.text)}
+    _record_updated(seller_email, contact_id, body)
+    return {
+        "status": "success",
+        "message": "Contact updated successfully.",
+        "contact": project_contact(decode_response(response))
+    }
+
+
+def _write_target(seller_email: str, term, contacts: list) -> tuple:
+    """
+    (match, candidates) for a write among the CRM search results plus the
+    indexed contacts: match only when it is unambiguous, never the first hit.
+    """
+    term = str(term).strip()
+    contacts = [c for c in contacts or [] if isinstance(c, dict)]
+    seen = {contact_id(c) for c in contacts}
+    contacts += [c for _, c in _index.search(seller_email, term) if contact_id(c) not in seen]
+    candidates = [c for score, c in rank_contacts(term, contacts) if score >= CRM_INDEX_MIN_SCORE]
+    return best_match(term, contacts), candidates[:AMBIGUOUS_MAX_CANDIDATES]
+
+
+def _unresolved_result(identifier: str, candidates: list) -> dict:
+    """not_found, or the matching contacts when the identifier is ambiguous."""
+    if candidates:
+        return {
+            "status": "ambiguous",
+            "message": f"Several contacts match '{identifier}'. Ask the user which one (email or phone) and retry with it.",
+            "candidates": [project_contact(c) for c in candidates],
         }
-        
-        response = requests.post(url, headers=headers, json=body, timeout=10)
-        data = response.json()
-        
-        if isinstance(data, dict):
-            contacts = data.get('contacts') or data.get('docs') or []
-        else:
-            contacts = data
-        
-        if contacts and isinstance(contacts, list) and len(contacts) > 0:
-            return contacts[0]
-        
+    return {"status": "not_found", "message": "Contact not found '" + str(identifier) + "' to update."}
+
+
+def _mirror_contacts(seller_email: str, filters: dict | None):
+    """Every contact of a seller, through the /contacts pagination (used by the mirror)."""
+    from .pagination import iter_contacts  # import diferido: pagination importa este módulo
+    return iter_contacts(seller_email, filters=filters)
+
+
+def _read_mirror(seller_email: str, search_term: str | None, page: int, limit: int) -> tuple | None:
+    """(data, age) served by the mirror, or None to go to the CRM."""
+    if not _mirror:
         return None
+    served = _mirror.list(seller_email, search_term, page, limit)
+    if served:
+        _index.add_many(seller_email, _extract_contacts(served[0]))
+    return served
+
+
+def _observe_listing(seller_email: str, search_term: str | None, data) -> None:
+    """Starts mirroring the seller if an unfiltered CRM listing shows a large book."""
+    if _mirror and not search_term and isinstance(data, dict):
+        _mirror.observe(seller_email, data.get("totalContacts") or 0)
+
+
+def _deliver_write(entry: dict) -> None:
+    """Sends one journaled write to the CRM. Used by the outbox worker."""
+    seller_email = entry["seller_email"]
+    try:
+        response = _client.request(
+            entry["method"], entry["path"], seller_email,
+            json=entry["body"], headers={"Idempotency-Key": entry["idempotency_key"]},
+        )
+    except (requests.RequestException, CircuitOpenError, RateLimitExceeded) as e:
+        raise RetryableWriteError(str(e)) from e
+
+    if is_failure_status(response.status_code) or response.status_code == 408:
+        raise RetryableWriteError(f"HTTP {response.status_code}")
+    if response.status_code >= 400:
+        raise ValueError("Error API: " + str(response.text))
+
+    if entry["method"] == "POST":
+        _record_created(seller_email, decode_response(response))
+    else:
+        _record_updated(seller_email, entry["contact_key"], entry["body"])
+
+
+_outbox_worker = OutboxWorker(_outbox, _deliver_write) if _outbox else None
+if _outbox_worker:
+    # Lo que quedó pendiente en el journal (caída, reinicio) no espera a una escritura nueva
+    _outbox_worker.resume()
+
+# Espejo local (opcional) de carteras grandes, sincronizado por delta en segundo plano
+_mirror = ContactMirror(_mirror_contacts) if CRM_MIRROR_ENABLED else None
+
+
+def _queue_write(seller_email: str, method: str, path: str, body: dict, contact_key: str, message: str) -> dict:
+    """Journals a confirmed write in the outbox and acknowledges it right away."""
+    entry = _outbox.enqueue(seller_email, method, path, body, contact_key)
+    _outbox_worker.ensure_started()
+    _outbox_worker.notify()
+    return {
+        "status": "queued",
+        "message": message,
+        "write_id": entry["id"],
+        "contact": {k: v for k, v in body.items() if k != "userEmail"},
+    }
+
+
+def _fetch_contacts_page(seller_email: str, search_term: str = None, page: int = 1, limit: int = 5):
+    """POSTs /contacts through the read cache and single-flight. Returns the parsed body."""
+    key = _cache.make_key(seller_email, search_term, page, limit)
+    data = _cache.get(key)
+    if data is not None:
+        return data
+    generation = _cache.generation(seller_email)
+
+    def fetch():
+        body = {"userEmail": seller_email}
+        if search_term:
+            body["searchTerm"] = search_term
+
+        response = _client.post(f"/contacts?page={page}&limit={limit}", seller_email, json=body, idempotent=True)
+        data = decode_contacts_response(response)
+        # Una escritura del seller durante la lectura invalida este resultado
+        if response.status_code < 400 and _cache.is_current(seller_email, generation):
+            _cache.set(key, data, generation)
+            _index.add_many(seller_email, _extract_contacts(data))
+        return data
+
+    # Con la generación en la key, quien llega después de una escritura no se une a una lectura previa
+    return _flight.do((*key, generation), fetch)
+
+
+def _search_contact_internal(seller_email, term) -> tuple:
+    """Searches the CRM for the contact to write. Returns (unambiguous match or None, candidates)."""
+    try:
+        data = _fetch_contacts_page(seller_email, str(term).strip(), page=1, limit=20)
+        contacts = _extract_contacts(data)
+        return _write_target(seller_email, term, contacts if isinstance(contacts, list) else [])
+    except (CircuitOpenError, DeadlineExceeded, RateLimitExceeded):
+        # CRM caído o sin tiempo: que update_contact informe el error, no un "not found"
+        raise
     except Exception as e:
         logger.error(f"❌ Search contact error: {str(e)}", exc_info=True)
-        return None
+        return None, []
 
 
 
 def create_contact(seller_email: str, name: str, phone_number: str, email: str) -> dict:
     """Creates a new contact. Name, Phone AND Email are required."""
     try:
-        if not name or not name.strip():
-            return {"status": "error", "message": "Name cannot be empty."}
-        
-        if not is_valid_email(email):
-            return {"status": "error", "message": f"Invalid email: {email}"}
-        
-        if not is_valid_email(seller_email):
-            return {"status": "error", "message": f"Invalid seller email: {seller_email}"}
-        
-        if not is_valid_phone(phone_number):
-            return {"status": "error", "message": f"Invalid phone number: {phone_number}"}
+        error = _validate_create(seller_email, name, phone_number, email)
+        if error:
+            return error
         
-        url = API_BASE_URL + "/contact"
-        headers = _get_headers(seller_email)
-        body = {
-            "name": name.strip(),
-            "phoneNumber": phone_number,
-            "userEmail": seller_email,
-            "email": email 
-        }
-        
-        response = requests.post(url, headers=headers, json=body, timeout=10)
+        body = _build_create_body(seller_email, name, phone_number, email)
+        if _outbox:
+            return _queue_write(seller_email, "POST", "/contact", body, _new_contact_key(email), QUEUED_CREATE_MESSAGE)
+
+        response = _client.post("/contact", seller_email, json=body)
         
         if response.status_code >= 400:
             return {"status": "error", "message": "Error API: " + str(response.text)}
 
+        created = decode_response(response)
+        _record_created(seller_email, created)
         return {
             "status": "success",
             "message": "Contact created successfully.",
-            "contact": response.json()
+            "contact": project_contact(created)
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -114,44 +380,35 @@ def create_contact(seller_email: str, name: str, phone_number: str, email: str)
 def update_contact(seller_email: str, identifier: str, name: str = None, email: str = None, phone_number: str = None) -> dict:
     """Updates a contact."""
     try:
-        if email and not is_valid_email(email):
-            return {"status": "error", "message": f"Invalid email: {email}"}
-        
-        if phone_number and not is_valid_phone(phone_number):
-            return {"status": "error", "message": f"Invalid phone number: {phone_number}"}
+        error = _validate_update(email, phone_number)
+        if error:
+            return error
         
         # Si es un ID de MongoDB válido, usarlo directo
         if is_valid_mongo_id(identifier):
             real_db_id = identifier
         else:
-            # Buscar el contacto por nombre/email/teléfono
-            real_contact = _search_contact_internal(seller_email, identifier)
-            
-            if not real_contact:
-                return {
-                    "status": "not_found",
-                    "message": "Contact not found '" + str(identifier) + "' to update."
-                }
-            
-            real_db_id = real_contact.get('_id') or real_contact.get('id')
-        
+            # Índice local solo para email/teléfono: un nombre puede repetirse en contactos no vistos
+            real_db_id = _index.resolve(seller_email, identifier) if is_exact_key(identifier) else None
+
+            if not real_db_id:
+                # Buscar el contacto por nombre/email/teléfono
+                real_contact, candidates = _search_contact_internal(seller_email, identifier)
+
+                if not real_contact:
+                    return _unresolved_result(identifier, candidates)
+
+                real_db_id = real_contact.get('_id') or real_contact.get('id')
+
         if not real_db_id:
             return {"status": "error", "message": "Critical error: Contact is missing an ID."}
 
-        url = API_BASE_URL + f"/contact/{real_db_id}"
-        headers = _get_headers(seller_email)
-        body = {"userEmail": seller_email}
-        if name: body["name"] = name.strip()
-        if email: body["email"] = email
-        if phone_number: body["phoneNumber"] = phone_number
-        
-        response = requests.put(url, headers=headers, json=body, timeout=10)
-        
-        return {
-            "status": "success",
-            "message": "Contact updated successfully.",
-            "contact": response.json()
-        }
+        body = _build_update_body(seller_email, name, email, phone_number)
+        if _outbox:
+            return _queue_write(seller_email, "PUT", f"/contact/{real_db_id}", body, real_db_id, QUEUED_UPDATE_MESSAGE)
+
+        response = _client.put(f"/contact/{real_db_id}", seller_email, json=body)
+        return _update_result(seller_email, real_db_id, body, response)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -159,27 +416,34 @@ def update_contact(seller_email: str, identifier: str, name: str = None, email:
 def list_contacts(seller_email: str, search_term: str = None, page: int = 1, limit: int = 5) -> dict:
     """Lists contacts."""
     try:
-        url = API_BASE_URL + f"/contacts?page={page}&limit={limit}"
-        headers = _get_headers(seller_email)
+        served = _read_mirror(seller_email, search_term, page, limit)
+        if served:
+            data, age = served
+            return {**_list_result(data, page, limit), "consistency_age_seconds": round(age, 1)}
 
-        body = {"userEmail": seller_email}
-        if search_term:
-            body["searchTerm"] = search_term
-        
-        response = requests.post(url, headers=headers, json=body, timeout=10)
-        data = response.json()
-        
-        if isinstance(data, dict):
-            contacts_list = data.get('contacts') or data.get('docs') or []
-        else:
-            contacts_list = data
-        
-        return {
-            "status": "success",
-            "contacts": contacts_list,
-            "total": data.get('totalContacts', len(contacts_list)),
-            "page": page,
-            "limit": limit
-        }
+        data = _fetch_contacts_page(seller_email, search_term, page, limit)
+        _observe_listing(seller_email, search_term, data)
+        return _list_result(data, page, limit)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def list_pending_writes(seller_email: str) -> dict:
+    """Lists contact creates/updates that are queued or failed and not yet saved in the CRM."""
+    if not _outbox:
+        return {"status": "success", "writes": [], "total": 0, "message": "Outbox disabled: writes go straight to the CRM."}
+    try:
+        writes = [
+            {
+                "write_id": entry["id"],
+                "action": "create" if entry["method"] == "POST" else "update",
+                "contact": {k: v for k, v in entry["body"].items() if k != "userEmail"},
+                "status": entry["status"],
+                "attempts": entry["attempts"],
+                "last_error": entry["last_error"],
+            }
+            for entry in _outbox.list(seller_email)
+        ]
+        return {"status": "success", "writes": writes, "total": len(writes)}
     except Exception as e:
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,197 @@
+"""
+Async CRM tools registered on root_agent.
+Same names, signatures and results as the sync tools in crm.py, but the I/O
+runs on the event loop (httpx) so a slow CRM response does not block other
+conversations served by the same webhook worker.
+"""
+
+import logging
+
+from google.adk.tools.tool_context import ToolContext
+
+from ..codec import decode_contacts_response, decode_response
+from ..deadline import DeadlineExceeded
+from .crm import (
+    API_BASE_URL,
+    PYROTECH_API_TOKEN,
+    QUEUED_CREATE_MESSAGE,
+    QUEUED_UPDATE_MESSAGE,
+    _build_create_body,
+    _breakers,
+    _build_update_body,
+    _cache,
+    _extract_contacts,
+    _index,
+    _list_result,
+    _new_contact_key,
+    _observe_listing,
+    _outbox,
+    _queue_write,
+    _rate_limiter,
+    _read_mirror,
+    _record_created,
+    _retry_policy,
+    _unresolved_result,
+    _update_result,
+    _validate_create,
+    _validate_update,
+    _write_target,
+    is_valid_mongo_id,
+)
+from .circuit_breaker import CircuitOpenError
+from .crm_client import AsyncCRMClient
+from .projection import project_contact
+from .rate_limit import RateLimitExceeded
+from .search_index import is_exact_key
+from .session_contacts import remember_contacts, resolve_from_session
+from .singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+_client = AsyncCRMClient(
+    API_BASE_URL, PYROTECH_API_TOKEN, breakers=_breakers, retry_policy=_retry_policy, rate_limiter=_rate_limiter
+)
+
+# Lecturas idénticas concurrentes comparten una sola request al CRM
+_flight = AsyncSingleFlight()
+
+
+def get_pool_stats() -> dict:
+    """Returns stats of the shared async CRM client."""
+    return _client.pool_stats()
+
+
+def get_singleflight_stats() -> dict:
+    """Returns how many identical concurrent reads were collapsed."""
+    return _flight.stats()
+
+
+async def _fetch_contacts_page(seller_email: str, search_term: str = None, page: int = 1, limit: int = 5):
+    """POSTs /contacts through the read cache and single-flight. Returns the parsed body."""
+    key = _cache.make_key(seller_email, search_term, page, limit)
+    data = _cache.get(key)
+    if data is not None:
+        return data
+    generation = _cache.generation(seller_email)
+
+    async def fetch():
+        body = {"userEmail": seller_email}
+        if search_term:
+            body["searchTerm"] = search_term
+
+        response = await _client.post(f"/contacts?page={page}&limit={limit}", seller_email, json=body, idempotent=True)
+        data = decode_contacts_response(response)
+        # Una escritura del seller durante la lectura invalida este resultado
+        if response.status_code < 400 and _cache.is_current(seller_email, generation):
+            _cache.set(key, data, generation)
+            _index.add_many(seller_email, _extract_contacts(data))
+        return data
+
+    # Con la generación en la key, quien llega después de una escritura no se une a una lectura previa
+    return await _flight.do((*key, generation), fetch)
+
+
+async def _search_candidates(seller_email: str, term) -> list:
+    """Contacts the CRM search returns for `term` (first page of 20), unranked."""
+    data = await _fetch_contacts_page(seller_email, str(term).strip(), page=1, limit=20)
+    contacts = _extract_contacts(data)
+    return contacts if isinstance(contacts, list) else []
+
+
+async def _search_contact_internal(seller_email, term) -> tuple:
+    """Searches the CRM for the contact to write. Returns (unambiguous match or None, candidates)."""
+    try:
+        return _write_target(seller_email, term, await _search_candidates(seller_email, term))
+    except (CircuitOpenError, DeadlineExceeded, RateLimitExceeded):
+        # CRM caído o sin tiempo: que update_contact informe el error, no un "not found"
+        raise
+    except Exception as e:
+        logger.error(f"❌ Search contact error: {str(e)}", exc_info=True)
+        return None, []
+
+
+async def create_contact(seller_email: str, name: str, phone_number: str, email: str) -> dict:
+    """Creates a new contact. Name, Phone AND Email are required."""
+    try:
+        error = _validate_create(seller_email, name, phone_number, email)
+        if error:
+            return error
+
+        body = _build_create_body(seller_email, name, phone_number, email)
+        if _outbox:
+            return _queue_write(seller_email, "POST", "/contact", body, _new_contact_key(email), QUEUED_CREATE_MESSAGE)
+
+        response = await _client.post("/contact", seller_email, json=body)
+
+        if response.status_code >= 400:
+            return {"status": "error", "message": "Error API: " + str(response.text)}
+
+        created = decode_response(response)
+        _record_created(seller_email, created)
+        return {
+            "status": "success",
+            "message": "Contact created successfully.",
+            "contact": project_contact(created)
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def update_contact(seller_email: str, identifier: str, name: str = None, email: str = None, phone_number: str = None, tool_context: ToolContext = None) -> dict:
+    """Updates a contact."""
+    try:
+        error = _validate_update(email, phone_number)
+        if error:
+            return error
+
+        # Si es un ID de MongoDB válido, usarlo directo
+        if is_valid_mongo_id(identifier):
+            real_db_id = identifier
+        else:
+            # Últimos contactos listados en la sesión, luego índice local (solo email/teléfono);
+            # un nombre sin match en la sesión se busca en el CRM
+            state = tool_context.state if tool_context else None
+            real_db_id = resolve_from_session(state, identifier)
+            if not real_db_id and is_exact_key(identifier):
+                real_db_id = _index.resolve(seller_email, identifier)
+
+            if not real_db_id:
+                # Buscar el contacto por nombre/email/teléfono
+                real_contact, candidates = await _search_contact_internal(seller_email, identifier)
+
+                if not real_contact:
+                    return _unresolved_result(identifier, candidates)
+
+                real_db_id = real_contact.get('_id') or real_contact.get('id')
+
+        if not real_db_id:
+            return {"status": "error", "message": "Critical error: Contact is missing an ID."}
+
+        body = _build_update_body(seller_email, name, email, phone_number)
+        if _outbox:
+            return _queue_write(seller_email, "PUT", f"/contact/{real_db_id}", body, real_db_id, QUEUED_UPDATE_MESSAGE)
+
+        response = await _client.put(f"/contact/{real_db_id}", seller_email, json=body)
+        return _update_result(seller_email, real_db_id, body, response)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def list_contacts(seller_email: str, search_term: str = None, page: int = 1, limit: int = 5, tool_context: ToolContext = None) -> dict:
+    """Lists contacts."""
+    try:
+        served = _read_mirror(seller_email, search_term, page, limit)
+        if served:
+            data, age = served
+        else:
+            data = await _fetch_contacts_page(seller_email, search_term, page, limit)
+            _observe_listing(seller_email, search_term, data)
+        if tool_context:
+            # La sesión guarda los contactos completos; al modelo solo va la proyección
+            remember_contacts(tool_context.state, _extract_contacts(data))
+        result = _list_result(data, page, limit)
+        if served:
+            result["consistency_age_seconds"] = round(age, 1)
+        return result
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
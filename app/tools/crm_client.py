@@ -0,0 +1,348 @@
+"""
+Shared HTTP clients for the PyroTech CRM API.
+All CRM tools go through one pooled, keep-alive session so repeated tool
+calls reuse TCP/TLS connections instead of paying a new handshake each time.
+CRMClient backs the sync tools (scripts), AsyncCRMClient the agent tools.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..codec import dumps
+from ..deadline import remaining, timeout_for
+from .circuit_breaker import (
+    RETRYABLE_STATUS,
+    CircuitBreakerRegistry,
+    RetryPolicy,
+    is_failure_status,
+)
+from .rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Configuración del pool (override vía .env)
+CRM_POOL_CONNECTIONS = int(os.getenv("CRM_POOL_CONNECTIONS", "4"))
+CRM_POOL_MAXSIZE = int(os.getenv("CRM_POOL_MAXSIZE", "20"))
+CRM_POOL_BLOCK = os.getenv("CRM_POOL_BLOCK", "false").lower() == "true"
+CRM_TIMEOUT = float(os.getenv("CRM_TIMEOUT", "10"))
+
+
+def _retry_delay(policy: RetryPolicy, attempt: int, attempts: int) -> float | None:
+    """Backoff before the next attempt, or None if no retry is allowed (attempts, deadline, budget)."""
+    if attempt + 1 >= attempts:
+        return None
+    delay = policy.backoff(attempt)
+    left = remaining()
+    if left is not None and left <= delay:
+        return None
+    if not policy.acquire_retry():
+        return None
+    return delay
+
+
+class CRMClient:
+    """Pooled, keep-alive client bound to one CRM base URL and API token."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_token: str | None,
+        pool_connections: int = CRM_POOL_CONNECTIONS,
+        pool_maxsize: int = CRM_POOL_MAXSIZE,
+        pool_block: bool = CRM_POOL_BLOCK,
+        timeout: float = CRM_TIMEOUT,
+        breakers: CircuitBreakerRegistry | None = None,
+        retry_policy: RetryPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_token = api_token
+        self.timeout = timeout
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+        # pool_connections = hosts cacheados, pool_maxsize = conexiones por host
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+        self._base_headers = {"Content-Type": "application/json"}
+        if api_token:
+            # Sin token no se manda el header (httpx enviaría "None")
+            self._base_headers["Authorization"] = api_token
+        self._headers: dict[str, dict] = {}
+
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+        self._errors = 0
+
+    def headers_for(self, seller_email: str) -> dict:
+        """Prebuilt headers for a seller. Cached: do not mutate the result."""
+        headers = self._headers.get(seller_email)
+        if headers is None:
+            headers = {**self._base_headers, "x-user-email": seller_email}
+            self._headers[seller_email] = headers
+        return headers
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        seller_email: str,
+        json: dict | None = None,
+        timeout: float | None = None,
+        idempotent: bool = False,
+        headers: dict | None = None,
+    ) -> requests.Response:
+        """
+        Sends a request to `base_url + path` using the shared pool.
+        Fails fast with CircuitOpenError while the endpoint's circuit is open
+        and with RateLimitExceeded when no token is available in time;
+        idempotent calls are retried on transport errors and 429/5xx.
+        """
+        url = self.base_url + path
+        sender = getattr(self.session, method.lower())
+        breaker = self.breakers.get(method, path)
+        attempts = self.retry_policy.attempts if idempotent else 1
+        self.retry_policy.record_request()
+        # Serializado una sola vez (codec rápido), reutilizado en los reintentos
+        body = dumps(json) if json is not None else None
+        # Headers extra (p. ej. Idempotency-Key) sobre la copia cacheada del seller
+        request_headers = {**self.headers_for(seller_email), **headers} if headers else self.headers_for(seller_email)
+
+        for attempt in range(attempts):
+            # Token bucket por API token y por seller (espera acotada por el deadline)
+            wait = self.rate_limiter.reserve(self.api_token, seller_email, max_wait=remaining())
+            if wait:
+                time.sleep(wait)
+            # Nunca más que lo que queda del deadline del request (si hay)
+            attempt_timeout = timeout_for(timeout if timeout is not None else self.timeout)
+            breaker.before_call()
+            with self._lock:
+                self._requests_sent += 1
+            started = time.monotonic()
+            try:
+                response = sender(
+                    url,
+                    headers=request_headers,
+                    data=body,
+                    timeout=attempt_timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record(True, time.monotonic() - started)
+                with self._lock:
+                    self._errors += 1
+                delay = _retry_delay(self.retry_policy, attempt, attempts)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Cualquier otro corte (body truncado, cancelación): libera el probe de half-open
+                breaker.record(True, time.monotonic() - started)
+                with self._lock:
+                    self._errors += 1
+                raise
+
+            failed = is_failure_status(response.status_code)
+            breaker.record(failed, time.monotonic() - started)
+            if failed and response.status_code in RETRYABLE_STATUS:
+                delay = _retry_delay(self.retry_policy, attempt, attempts)
+                if delay is not None:
+                    time.sleep(delay)
+                    continue
+            return response
+
+    def post(self, path: str, seller_email: str, json: dict | None = None, timeout: float | None = None, idempotent: bool = False) -> requests.Response:
+        return self.request("POST", path, seller_email, json=json, timeout=timeout, idempotent=idempotent)
+
+    def put(self, path: str, seller_email: str, json: dict | None = None, timeout: float | None = None, idempotent: bool = False) -> requests.Response:
+        return self.request("PUT", path, seller_email, json=json, timeout=timeout, idempotent=idempotent)
+
+    def pool_stats(self) -> dict:
+        """Snapshot of the connection pool (per host) and client counters."""
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        with pools.lock:
+            items = list(pools._container.items())
+        for key, pool in items:
+            host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            hosts[host] = {
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": idle,
+                "maxsize": self.pool_maxsize,
+            }
+        with self._lock:
+            return {
+                "requests_sent": self._requests_sent,
+                "errors": self._errors,
+                "pool_connections": self.pool_connections,
+                "pool_maxsize": self.pool_maxsize,
+                "cached_headers": len(self._headers),
+                "hosts": hosts,
+            }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncCRMClient:
+    """
+    Async counterpart of CRMClient built on httpx.
+    httpx.AsyncClient is bound to the event loop it was created on, so there
+    is one per loop; a loop's client is dropped once the loop is gone.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_token: str | None,
+        max_connections: int = CRM_POOL_MAXSIZE,
+        keepalive_expiry: float = 30.0,
+        timeout: float = CRM_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+        breakers: CircuitBreakerRegistry | None = None,
+        retry_policy: RetryPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_token = api_token
+        self.timeout = timeout
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._transport = transport
+        self._base_headers = {"Content-Type": "application/json"}
+        if api_token:
+            # Sin token no se manda el header (httpx enviaría "None")
+            self._base_headers["Authorization"] = api_token
+        self._headers: dict[str, dict] = {}
+        # Un httpx.AsyncClient por event loop (las conexiones no se comparten entre loops)
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._requests_sent = 0
+        self._errors = 0
+
+    def headers_for(self, seller_email: str) -> dict:
+        """Prebuilt headers for a seller. Cached: do not mutate the result."""
+        headers = self._headers.get(seller_email)
+        if headers is None:
+            headers = {**self._base_headers, "x-user-email": seller_email}
+            self._headers[seller_email] = headers
+        return headers
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Loops cerrados: su cliente ya no puede usarse ni cerrarse con await
+            for closed in [l for l in list(self._clients.keys()) if l.is_closed()]:
+                self._clients.pop(closed, None)
+            client = self._clients[loop] = httpx.AsyncClient(
+                limits=self._limits,
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        return client
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        seller_email: str,
+        json: dict | None = None,
+        timeout: float | None = None,
+        idempotent: bool = False,
+        headers: dict | None = None,
+    ) -> httpx.Response:
+        """Sends a request on the shared async pool (same breaker/retry rules as CRMClient)."""
+        sender = getattr(self._client(), method.lower())
+        breaker = self.breakers.get(method, path)
+        attempts = self.retry_policy.attempts if idempotent else 1
+        self.retry_policy.record_request()
+        # Serializado una sola vez (codec rápido), reutilizado en los reintentos
+        body = dumps(json) if json is not None else None
+        # Headers extra (p. ej. Idempotency-Key) sobre la copia cacheada del seller
+        request_headers = {**self.headers_for(seller_email), **headers} if headers else self.headers_for(seller_email)
+
+        for attempt in range(attempts):
+            wait = self.rate_limiter.reserve(self.api_token, seller_email, max_wait=remaining())
+            if wait:
+                await asyncio.sleep(wait)
+            attempt_timeout = timeout_for(timeout if timeout is not None else self.timeout)
+            breaker.before_call()
+            self._requests_sent += 1
+            started = time.monotonic()
+            try:
+                response = await sender(
+                    self.base_url + path,
+                    headers=request_headers,
+                    content=body,
+                    timeout=attempt_timeout,
+                )
+            except httpx.TransportError:
+                breaker.record(True, time.monotonic() - started)
+                self._errors += 1
+                delay = _retry_delay(self.retry_policy, attempt, attempts)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelación por deadline, body mal codificado...: libera el probe de half-open
+                breaker.record(True, time.monotonic() - started)
+                self._errors += 1
+                raise
+
+            failed = is_failure_status(response.status_code)
+            breaker.record(failed, time.monotonic() - started)
+            if failed and response.status_code in RETRYABLE_STATUS:
+                delay = _retry_delay(self.retry_policy, attempt, attempts)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+            return response
+
+    async def post(self, path: str, seller_email: str, json: dict | None = None, timeout: float | None = None, idempotent: bool = False) -> httpx.Response:
+        return await self.request("POST", path, seller_email, json=json, timeout=timeout, idempotent=idempotent)
+
+    async def put(self, path: str, seller_email: str, json: dict | None = None, timeout: float | None = None, idempotent: bool = False) -> httpx.Response:
+        return await self.request("PUT", path, seller_email, json=json, timeout=timeout, idempotent=idempotent)
+
+    def pool_stats(self) -> dict:
+        return {
+            "requests_sent": self._requests_sent,
+            "errors": self._errors,
+            "max_connections": self._limits.max_connections,
+            "cached_headers": len(self._headers),
+            "open": sum(1 for c in list(self._clients.values()) if not c.is_closed),
+        }
+
+    async def aclose(self) -> None:
+        """Closes the client of the running loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
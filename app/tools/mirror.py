@@ -0,0 +1,284 @@
+"""
+Local mirror of large sellers' contact books.
+With CRM_MIRROR_ENABLED=true, a seller whose listing reports at least
+CRM_MIRROR_MIN_CONTACTS contacts is tracked: a background thread keeps a
+copy of all their contacts (via the /contacts pagination) and list_contacts
+is served locally while the copy is younger than CRM_MIRROR_MAX_AGE_SECONDS.
+
+Sync is incremental: the watermark is the newest updatedAt/createdAt seen
+and delta requests send it as `updatedSince`. A full reconciliation (which
+also drops deleted contacts) runs every CRM_MIRROR_FULL_SYNC_SECONDS. When
+contacts carry no timestamps, or the CRM ignores the filter (a delta brings
+contacts older than the watermark), the seller gets only the full syncs and
+the copy is served just while it is younger than the max age.
+
+Sync requests run in the "sync" rate lane, not the seller's chat bucket.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from .rate_limit import SYNC, rate_lane
+from .search_index import contact_id, contact_phone, normalize_text, phone_digits
+
+logger = logging.getLogger(__name__)
+
+CRM_MIRROR_ENABLED = os.getenv("CRM_MIRROR_ENABLED", "false").lower() in ("1", "true", "yes")
+CRM_MIRROR_MIN_CONTACTS = int(os.getenv("CRM_MIRROR_MIN_CONTACTS", "200"))
+CRM_MIRROR_SYNC_SECONDS = float(os.getenv("CRM_MIRROR_SYNC_SECONDS", "30"))
+CRM_MIRROR_FULL_SYNC_SECONDS = float(os.getenv("CRM_MIRROR_FULL_SYNC_SECONDS", "3600"))
+CRM_MIRROR_MAX_AGE_SECONDS = float(os.getenv("CRM_MIRROR_MAX_AGE_SECONDS", "120"))
+CRM_MIRROR_MAX_SELLERS = int(os.getenv("CRM_MIRROR_MAX_SELLERS", "100"))
+
+DELTA_FILTER = "updatedSince"
+
+
+def contact_timestamp(contact: dict) -> str | None:
+    """updatedAt (or createdAt) as sent by the CRM; ISO-8601 strings compare in order."""
+    value = contact.get("updatedAt") or contact.get("createdAt")
+    return str(value) if value else None
+
+
+class _SellerMirror:
+    """All contacts of one seller plus their search keys."""
+
+    def __init__(self):
+        self.contacts: dict[str, dict] = {}  # _id -> contacto, orden del CRM
+        self.keys: dict[str, tuple] = {}
+        self.watermark: str | None = None
+        self.synced_at: float | None = None
+        self.full_synced_at: float | None = None
+        self.has_timestamps = False
+
+    def upsert(self, contact: dict) -> None:
+        cid = contact_id(contact)
+        if not cid:
+            return
+        self.contacts[cid] = contact
+        self.keys[cid] = (
+            normalize_text(contact.get("name")),
+            normalize_text(contact.get("email")),
+            phone_digits(contact_phone(contact)),
+        )
+        stamp = contact_timestamp(contact)
+        if stamp:
+            self.has_timestamps = True
+            if self.watermark is None or stamp > self.watermark:
+                self.watermark = stamp
+
+    def matches(self, cid: str, term: str, digits: str) -> bool:
+        name, email, phone = self.keys[cid]
+        return term in name or term in email or (len(digits) >= 4 and digits in phone)
+
+
+class ContactMirror:
+    """
+    Per-seller contact mirror. `iterate(seller_email, filters)` must yield every
+    contact of the seller matching `filters` (pagination.iter_contacts).
+    """
+
+    def __init__(
+        self,
+        iterate,
+        min_contacts: int = CRM_MIRROR_MIN_CONTACTS,
+        sync_seconds: float = CRM_MIRROR_SYNC_SECONDS,
+        full_sync_seconds: float = CRM_MIRROR_FULL_SYNC_SECONDS,
+        max_age: float = CRM_MIRROR_MAX_AGE_SECONDS,
+        max_sellers: int = CRM_MIRROR_MAX_SELLERS,
+        clock=time.monotonic,
+    ):
+        self.iterate = iterate
+        self.min_contacts = min_contacts
+        self.sync_seconds = sync_seconds
+        self.full_sync_seconds = full_sync_seconds
+        self.max_age = max_age
+        self.max_sellers = max_sellers
+        self._clock = clock
+        self._sellers: dict[str, _SellerMirror] = {}
+        self._tracked: set = set()
+        # Sellers cuyo CRM no respeta updatedSince: solo sync completo
+        self._full_only: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.sync_errors = 0
+        self.served = 0
+        self.stale = 0
+
+    # -------------------------------------------------------------------------
+    # Seguimiento y sync
+    # -------------------------------------------------------------------------
+
+    def observe(self, seller_email: str, total_contacts: int) -> None:
+        """Starts mirroring a seller once a CRM listing shows a large enough book."""
+        if total_contacts < self.min_contacts:
+            return
+        with self._lock:
+            if seller_email in self._tracked or len(self._tracked) >= self.max_sellers:
+                return
+            self._tracked.add(seller_email)
+        self._ensure_started()
+        self._wake.set()
+
+    def sync(self, seller_email: str) -> str:
+        """Runs a delta or full sync for one seller. Returns "delta", "full" or "skipped"."""
+        with self._lock:
+            mirror = self._sellers.get(seller_email)
+            full_only = seller_email in self._full_only
+        now = self._clock()
+        with rate_lane(SYNC):
+            if mirror is None or mirror.full_synced_at is None or now - mirror.full_synced_at >= self.full_sync_seconds:
+                self._full_sync(seller_email)
+                return "full"
+            if full_only or not mirror.has_timestamps:
+                # Sin delta fiable: se espera a la próxima reconciliación
+                return "skipped"
+            self._delta_sync(seller_email, mirror)
+            return "delta"
+
+    def _full_sync(self, seller_email: str) -> None:
+        fresh = _SellerMirror()
+        started = self._clock()
+        for contact in self.iterate(seller_email, None):
+            if isinstance(contact, dict):
+                fresh.upsert(contact)
+        # La edad se mide desde que empezó la lectura, no desde que terminó
+        fresh.synced_at = fresh.full_synced_at = started
+        with self._lock:
+            self._sellers[seller_email] = fresh
+            self.full_syncs += 1
+
+    def _delta_sync(self, seller_email: str, mirror: _SellerMirror) -> None:
+        watermark = mirror.watermark
+        started = self._clock()
+        changed, honoured = [], True
+        contacts = self.iterate(seller_email, {DELTA_FILTER: watermark})
+        try:
+            for contact in contacts:
+                stamp = contact_timestamp(contact) if isinstance(contact, dict) else None
+                if not stamp or stamp < watermark:
+                    # El CRM ignoró updatedSince: el delta no garantiza ver todos los cambios
+                    honoured = False
+                    break
+                changed.append(contact)
+        finally:
+            close = getattr(contacts, "close", None)
+            if close:
+                close()
+        with self._lock:
+            for contact in changed:
+                mirror.upsert(contact)
+            if not honoured:
+                self._full_only.add(seller_email)
+                logger.warning(f"⚠️ CRM ignores {DELTA_FILTER} for {seller_email}: mirror falls back to full syncs")
+                return
+            mirror.synced_at = started
+            self.delta_syncs += 1
+
+    def sync_due(self) -> int:
+        """Syncs every tracked seller whose copy is older than sync_seconds."""
+        with self._lock:
+            due = [
+                s for s in self._tracked
+                if s not in self._sellers or self._sellers[s].synced_at is None
+                or self._clock() - self._sellers[s].synced_at >= self.sync_seconds
+            ]
+        for seller_email in due:
+            try:
+                self.sync(seller_email)
+            except Exception as e:
+                with self._lock:
+                    self.sync_errors += 1
+                logger.warning(f"⚠️ Mirror sync failed for {seller_email}: {e}")
+        return len(due)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="crm-mirror", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self.sync_due()
+            self._wake.wait(self.sync_seconds)
+            self._wake.clear()
+
+    # -------------------------------------------------------------------------
+    # Lecturas y escrituras locales
+    # -------------------------------------------------------------------------
+
+    def age(self, seller_email: str) -> float | None:
+        """Seconds since the seller's last successful sync (None if not mirrored)."""
+        with self._lock:
+            mirror = self._sellers.get(seller_email)
+            if mirror is None or mirror.synced_at is None:
+                return None
+            return self._clock() - mirror.synced_at
+
+    def list(self, seller_email: str, search_term: str | None, page: int, limit: int) -> tuple | None:
+        """
+        Serves a /contacts-shaped page from the mirror: ({"contacts", "totalContacts"}, age).
+        Returns None when the seller is not mirrored or the copy is too old.
+        """
+        with self._lock:
+            mirror = self._sellers.get(seller_email)
+            if mirror is None or mirror.synced_at is None:
+                return None
+            age = self._clock() - mirror.synced_at
+            if age > self.max_age:
+                self.stale += 1
+                return None
+            if search_term and search_term.strip():
+                term, digits = normalize_text(search_term), phone_digits(search_term)
+                ids = [cid for cid in mirror.contacts if mirror.matches(cid, term, digits)]
+            else:
+                ids = list(mirror.contacts)
+            start = (max(1, page) - 1) * limit
+            contacts = [mirror.contacts[cid] for cid in ids[start:start + limit]]
+            self.served += 1
+        return {"contacts": contacts, "totalContacts": len(ids)}, age
+
+    def upsert(self, seller_email: str, contact: dict) -> None:
+        """Applies a successful create to the mirror (read-your-writes)."""
+        with self._lock:
+            mirror = self._sellers.get(seller_email)
+            if mirror is not None and isinstance(contact, dict):
+                mirror.upsert(contact)
+
+    def merge(self, seller_email: str, cid: str, fields: dict) -> None:
+        """Applies a successful update to the mirror (no-op if unknown)."""
+        with self._lock:
+            mirror = self._sellers.get(seller_email)
+            current = mirror.contacts.get(cid) if mirror else None
+            if current is not None:
+                mirror.upsert({**current, **fields})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sellers.clear()
+            self._tracked.clear()
+            self._full_only.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            return {
+                "sellers": len(self._sellers),
+                "tracked": len(self._tracked),
+                "full_sync_only": len(self._full_only),
+                "contacts": sum(len(m.contacts) for m in self._sellers.values()),
+                "full_syncs": self.full_syncs,
+                "delta_syncs": self.delta_syncs,
+                "sync_errors": self.sync_errors,
+                "served": self.served,
+                "stale": self.stale,
+                "max_age_seconds": round(max(
+                    (now - m.synced_at for m in self._sellers.values() if m.synced_at is not None), default=0.0
+                ), 1),
+            }
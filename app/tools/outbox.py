@@ -0,0 +1,227 @@
+"""
+Durable outbox for contact writes.
+With CRM_OUTBOX_ENABLED=true, confirmed creates/updates are journaled in a
+local SQLite file and acknowledged right away; a background worker sends
+them to the CRM with retries and an Idempotency-Key header. Writes that
+touch the same contact are delivered in order: an entry is not sent while
+an older pending entry for the same contact exists. Writes still pending
+in the journal at startup (crash, restart) are resumed right away.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CRM_OUTBOX_ENABLED = os.getenv("CRM_OUTBOX_ENABLED", "false").lower() in ("1", "true", "yes")
+CRM_OUTBOX_PATH = os.getenv("CRM_OUTBOX_PATH", "crm_outbox.sqlite3")
+CRM_OUTBOX_MAX_ATTEMPTS = int(os.getenv("CRM_OUTBOX_MAX_ATTEMPTS", "8"))
+CRM_OUTBOX_BACKOFF_SECONDS = float(os.getenv("CRM_OUTBOX_BACKOFF_SECONDS", "2"))
+CRM_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("CRM_OUTBOX_BACKOFF_MAX_SECONDS", "300"))
+CRM_OUTBOX_POLL_SECONDS = float(os.getenv("CRM_OUTBOX_POLL_SECONDS", "1"))
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+
+class RetryableWriteError(Exception):
+    """Transient delivery failure (CRM down, throttled, 5xx): retried with backoff."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    seller_email TEXT NOT NULL,
+    contact_key TEXT NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS writes_due ON writes (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS writes_contact ON writes (contact_key, status, id);
+"""
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    entry = dict(row)
+    entry["body"] = json.loads(entry["body"])
+    return entry
+
+
+class Outbox:
+    """SQLite-backed journal of pending CRM writes."""
+
+    def __init__(self, path: str = CRM_OUTBOX_PATH, max_attempts: int = CRM_OUTBOX_MAX_ATTEMPTS, clock=time.time):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, seller_email: str, method: str, path: str, body: dict, contact_key: str) -> dict:
+        """
+        Journals a write and returns its entry. An identical write that is still
+        pending (e.g. the seller confirmed twice) is returned instead of duplicated.
+        """
+        encoded = json.dumps(body, sort_keys=True, ensure_ascii=False)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM writes WHERE status = ? AND seller_email = ? AND method = ? AND path = ? AND body = ?",
+                (PENDING, seller_email, method, path, encoded),
+            ).fetchone()
+            if row is not None:
+                return _row_to_dict(row)
+            cursor = self._conn.execute(
+                "INSERT INTO writes (idempotency_key, seller_email, contact_key, method, path, body, status,"
+                " next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, seller_email, contact_key, method, path, encoded, PENDING, now, now, now),
+            )
+            row = self._conn.execute("SELECT * FROM writes WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        return _row_to_dict(row)
+
+    def due(self, limit: int = 50) -> list:
+        """Pending writes ready to send, oldest first, at most one per contact."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM writes w WHERE w.status = ? AND w.next_attempt_at <= ?"
+                " AND NOT EXISTS (SELECT 1 FROM writes p WHERE p.status = ? AND p.contact_key = w.contact_key AND p.id < w.id)"
+                " ORDER BY w.id LIMIT ?",
+                (PENDING, self._clock(), PENDING, limit),
+            ).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def mark_done(self, write_id: int) -> None:
+        self._update(write_id, status=DONE, last_error=None)
+
+    def mark_failed(self, write_id: int, error: str) -> None:
+        self._update(write_id, status=FAILED, last_error=error)
+
+    def mark_retry(self, write_id: int, attempts: int, error: str, delay: float) -> None:
+        """Schedules another attempt, or marks the write failed after max_attempts."""
+        if attempts >= self.max_attempts:
+            self.mark_failed(write_id, error)
+            return
+        self._update(write_id, attempts=attempts, last_error=error, next_attempt_at=self._clock() + delay)
+
+    def _update(self, write_id: int, **fields) -> None:
+        fields["updated_at"] = self._clock()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE writes SET {assignments} WHERE id = ?", (*fields.values(), write_id))
+
+    def list(self, seller_email: str, statuses: tuple = (PENDING, FAILED), limit: int = 20) -> list:
+        """Most recent writes of a seller with the given statuses."""
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM writes WHERE seller_email = ? AND status IN ({placeholders}) ORDER BY id DESC LIMIT ?",
+                (seller_email, *statuses, limit),
+            ).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM writes GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM writes WHERE status = ?", (PENDING,)).fetchone()[0]
+        return {
+            PENDING: counts.get(PENDING, 0),
+            DONE: counts.get(DONE, 0),
+            FAILED: counts.get(FAILED, 0),
+            "oldest_pending_age_seconds": round(self._clock() - oldest, 1) if oldest is not None else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def backoff_delay(attempts: int, base: float = CRM_OUTBOX_BACKOFF_SECONDS, cap: float = CRM_OUTBOX_BACKOFF_MAX_SECONDS) -> float:
+    """Exponential backoff for the n-th failed delivery (1-based)."""
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+class OutboxWorker:
+    """
+    Background thread that flushes due writes with `send(entry)`.
+    `send` returns None on success, raises RetryableWriteError to retry later
+    and any other exception to mark the write as failed.
+    """
+
+    def __init__(self, outbox: Outbox, send, poll_seconds: float = CRM_OUTBOX_POLL_SECONDS):
+        self.outbox = outbox
+        self.send = send
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def flush_once(self) -> int:
+        """Sends every due write once. Returns how many were delivered."""
+        delivered = 0
+        for entry in self.outbox.due():
+            attempts = entry["attempts"] + 1
+            try:
+                self.send(entry)
+            except RetryableWriteError as e:
+                logger.warning(f"⚠️ Outbox write {entry['id']} failed (attempt {attempts}): {e}")
+                self.outbox.mark_retry(entry["id"], attempts, str(e), backoff_delay(attempts))
+                continue
+            except Exception as e:
+                logger.error(f"❌ Outbox write {entry['id']} rejected: {e}")
+                self.outbox.mark_failed(entry["id"], str(e))
+                continue
+            self.outbox.mark_done(entry["id"])
+            delivered += 1
+        return delivered
+
+    def resume(self) -> bool:
+        """Starts the worker if the journal still holds pending writes (e.g. after a restart)."""
+        if not self.outbox.stats()[PENDING]:
+            return False
+        logger.info("📤 Outbox has pending writes from a previous run, resuming delivery")
+        self.ensure_started()
+        return True
+
+    def ensure_started(self) -> None:
+        """Starts the worker thread once (on the first enqueued write, or on resume)."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="crm-outbox", daemon=True)
+                self._thread.start()
+
+    def notify(self) -> None:
+        """Wakes the worker so a fresh write is sent without waiting for the poll."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.flush_once()
+            except Exception as e:
+                logger.error(f"❌ Outbox flush error: {e}", exc_info=True)
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
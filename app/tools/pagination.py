@@ -0,0 +1,168 @@
+"""
+Streaming iteration over a seller's full contact set.
+Yields contacts as pages arrive and prefetches the next page(s) while the
+current one is consumed. Memory is bounded by `prefetch` pages in flight
+plus the page being consumed. Stops at `totalContacts`, on an empty page or
+on a short page. No new page is requested once the request deadline (if
+any) has run out.
+
+    for contact in iter_contacts("vendedor@inmobiliaria.com", page_size=200):
+        ...
+
+    async for contact in aiter_contacts("vendedor@inmobiliaria.com"):
+        ...
+"""
+
+import asyncio
+import contextvars
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ..codec import decode_contacts_response
+from ..deadline import DeadlineExceeded, remaining
+from . import crm, crm_async
+from .crm import _extract_contacts
+
+CRM_PAGE_SIZE = int(os.getenv("CRM_PAGE_SIZE", "100"))
+CRM_PREFETCH_PAGES = int(os.getenv("CRM_PREFETCH_PAGES", "1"))
+
+
+def _body(seller_email: str, search_term: str | None, filters: dict | None = None) -> dict:
+    body = {"userEmail": seller_email}
+    if search_term:
+        body["searchTerm"] = search_term
+    if filters:
+        body.update(filters)
+    return body
+
+
+def _parse_page(seller_email: str, data) -> tuple:
+    """Returns (contacts, totalContacts or None) and feeds the local index."""
+    contacts = _extract_contacts(data)
+    crm._index.add_many(seller_email, contacts)
+    total = data.get("totalContacts") if isinstance(data, dict) else None
+    return contacts, total
+
+
+def _fetch_page(seller_email: str, search_term: str | None, page: int, page_size: int, filters: dict | None = None) -> tuple:
+    # Sin cache: páginas grandes de exportación no deben desplazar las de la sesión
+    response = crm._client.post(
+        f"/contacts?page={page}&limit={page_size}", seller_email, json=_body(seller_email, search_term, filters), idempotent=True
+    )
+    response.raise_for_status()
+    return _parse_page(seller_email, decode_contacts_response(response))
+
+
+async def _afetch_page(seller_email: str, search_term: str | None, page: int, page_size: int, filters: dict | None = None) -> tuple:
+    response = await crm_async._client.post(
+        f"/contacts?page={page}&limit={page_size}", seller_email, json=_body(seller_email, search_term, filters), idempotent=True
+    )
+    response.raise_for_status()
+    return _parse_page(seller_email, decode_contacts_response(response))
+
+
+def _check_deadline() -> None:
+    """Raises before requesting another page once the request deadline ran out."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+
+
+def _is_last_page(contacts: list, total, yielded: int, page_size: int) -> bool:
+    if not contacts or len(contacts) < page_size:
+        return True
+    return total is not None and yielded >= total
+
+
+def iter_contacts(
+    seller_email: str,
+    search_term: str = None,
+    page_size: int = CRM_PAGE_SIZE,
+    prefetch: int = CRM_PREFETCH_PAGES,
+    max_contacts: int | None = None,
+    filters: dict | None = None,
+):
+    """Sync generator over every contact of a seller, with page read-ahead."""
+    prefetch = max(1, prefetch)
+    yielded = 0
+    next_page = 1
+    total = None
+    pending: deque = deque()
+
+    with ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="crm-prefetch") as pool:
+        def schedule():
+            nonlocal next_page
+            # No pedir páginas más allá del total conocido
+            while len(pending) < prefetch and (total is None or (next_page - 1) * page_size < total):
+                _check_deadline()
+                # Los hilos del pool no heredan contextvars: cada fetch corre con el lane/deadline del caller
+                context = contextvars.copy_context()
+                pending.append(pool.submit(context.run, _fetch_page, seller_email, search_term, next_page, page_size, filters))
+                next_page += 1
+
+        try:
+            schedule()
+            while pending:
+                contacts, page_total = pending.popleft().result()
+                if page_total is not None:
+                    total = page_total
+                # Pedir la siguiente mientras se consume esta
+                if not _is_last_page(contacts, total, yielded + len(contacts), page_size):
+                    schedule()
+                else:
+                    for future in pending:
+                        future.cancel()
+                    pending.clear()
+                for contact in contacts:
+                    if max_contacts is not None and yielded >= max_contacts:
+                        return
+                    yielded += 1
+                    yield contact
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def aiter_contacts(
+    seller_email: str,
+    search_term: str = None,
+    page_size: int = CRM_PAGE_SIZE,
+    prefetch: int = CRM_PREFETCH_PAGES,
+    max_contacts: int | None = None,
+    filters: dict | None = None,
+):
+    """Async generator over every contact of a seller, with page read-ahead."""
+    prefetch = max(1, prefetch)
+    yielded = 0
+    next_page = 1
+    total = None
+    pending: deque = deque()
+
+    def schedule():
+        nonlocal next_page
+        while len(pending) < prefetch and (total is None or (next_page - 1) * page_size < total):
+            _check_deadline()
+            pending.append(asyncio.ensure_future(_afetch_page(seller_email, search_term, next_page, page_size, filters)))
+            next_page += 1
+
+    try:
+        schedule()
+        while pending:
+            contacts, page_total = await pending.popleft()
+            if page_total is not None:
+                total = page_total
+            if not _is_last_page(contacts, total, yielded + len(contacts), page_size):
+                schedule()
+            else:
+                for task in pending:
+                    task.cancel()
+                pending.clear()
+            for contact in contacts:
+                if max_contacts is not None and yielded >= max_contacts:
+                    return
+                yielded += 1
+                yield contact
+    finally:
+        for task in pending:
+            task.cancel()
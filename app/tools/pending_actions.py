@@ -0,0 +1,118 @@
+"""
+Pending create/update proposals stored in the session state.
+Instead of writing "Confirm?" itself, the agent calls propose_contact_change
+with the data it would write. The tool validates it (same checks as
+create_contact/update_contact), stores it under STATE_KEY and returns the
+confirmation text as the turn's final answer (no extra LLM round).
+
+The next "sí"/"no" is handled by app/confirmations.py without the LLM:
+execute_pending runs the stored call through the regular async tools.
+"""
+
+import time
+
+from google.adk.tools.tool_context import ToolContext
+
+from . import crm_async
+from .crm import _validate_create, _validate_update, is_valid_mongo_id
+from .session_contacts import STATE_KEY as RECENT_CONTACTS_KEY, resolve_from_session
+
+STATE_KEY = "pending_action"
+PENDING_CONFIRMATION = "pending_confirmation"
+CREATE, UPDATE = "create", "update"
+
+_FIELD_LABELS = {"name": "Nombre", "phone_number": "Teléfono", "email": "Email"}
+
+
+def _contact_label(state, contact_id: str, fallback: str) -> str:
+    """Name of a contact from the last listing, or the identifier the user gave."""
+    for contact in (state.get(RECENT_CONTACTS_KEY) or []) if state is not None else []:
+        if contact.get("_id") == contact_id:
+            return contact.get("name") or fallback
+    return fallback
+
+
+def _field_line(label: str, new, old=None) -> str:
+    return f"• {label}: {old} → {new}" if old and old != new else f"• {label}: {new}"
+
+
+def confirmation_message(pending: dict) -> str:
+    """Summary shown to the seller before a write (with old → new values when known)."""
+    before = pending.get("before") or {}
+    fields = "\n".join(
+        _field_line(label, pending["args"][field], before.get(field))
+        for field, label in _FIELD_LABELS.items() if pending["args"].get(field)
+    )
+    if pending["action"] == CREATE:
+        header = "Voy a crear este contacto:"
+    else:
+        header = f"Voy a actualizar a {pending['label']}:"
+    return f"{header}\n{fields}\n¿Confirmas? (sí/no)"
+
+
+def propose_contact_change(
+    seller_email: str,
+    action: str,
+    identifier: str = None,
+    name: str = None,
+    phone_number: str = None,
+    email: str = None,
+    tool_context: ToolContext = None,
+) -> dict:
+    """
+    Asks the user to confirm a create or update. action is "create" (name,
+    phone_number and email required) or "update" (identifier plus the fields
+    to change). The system executes it when the user answers yes.
+    """
+    action = (action or "").strip().lower()
+    if action == CREATE:
+        error = _validate_create(seller_email, name, phone_number, email)
+        args = {"name": name.strip() if name else name, "phone_number": phone_number, "email": email}
+        label = args["name"]
+    elif action == UPDATE:
+        if not identifier:
+            return {"status": "error", "message": "identifier is required to update a contact."}
+        if not (name or phone_number or email):
+            return {"status": "error", "message": "Nothing to update: give name, phone_number or email."}
+        error = _validate_update(email, phone_number)
+        state = tool_context.state if tool_context else None
+        # Resolver ya con la sesión ("el segundo"), cuando todavía hay contexto
+        contact_id = identifier if is_valid_mongo_id(identifier) else resolve_from_session(state, identifier)
+        args = {"identifier": contact_id or identifier, "name": name, "phone_number": phone_number, "email": email}
+        label = _contact_label(state, contact_id, identifier) if contact_id else identifier
+    else:
+        return {"status": "error", "message": f"Unknown action '{action}'. Use 'create' or 'update'."}
+    if error:
+        return error
+
+    return store_pending(tool_context, new_pending(action, seller_email, args, label))
+
+
+def new_pending(action: str, seller_email: str, args: dict, label: str, before: dict | None = None) -> dict:
+    return {
+        "action": action,
+        "seller_email": seller_email,
+        "args": {k: v for k, v in args.items() if v},
+        "label": label,
+        "before": before or {},
+        "created_at": time.time(),
+    }
+
+
+def store_pending(tool_context: ToolContext, pending: dict, **extra) -> dict:
+    """Saves the proposal in the session and returns the confirmation result."""
+    if tool_context:
+        tool_context.state[STATE_KEY] = pending
+        # El texto de confirmación es la respuesta final del turno: sin otra llamada al LLM
+        tool_context.actions.skip_summarization = True
+    return {"status": PENDING_CONFIRMATION, "message": confirmation_message(pending), **extra}
+
+
+async def execute_pending(pending: dict, seller_email: str) -> dict:
+    """Runs a confirmed proposal for the session's seller through the regular async tools (same validation)."""
+    args = pending["args"]
+    if pending["action"] == CREATE:
+        return await crm_async.create_contact(seller_email, args.get("name"), args.get("phone_number"), args.get("email"))
+    return await crm_async.update_contact(
+        seller_email, args["identifier"], args.get("name"), args.get("email"), args.get("phone_number")
+    )
@@ -0,0 +1,70 @@
+"""
+Field projection for contacts returned to the model.
+Tool results end up in the conversation history and are re-sent to Gemini
+on every later turn, so the CRM tools only return the configured fields,
+with long values truncated. CRM_CONTACT_ENCODING=table additionally encodes
+listings as {"columns": [...], "rows": [[...], ...]} so field names are not
+repeated per contact.
+"""
+
+import os
+
+CRM_CONTACT_FIELDS = [
+    f.strip() for f in os.getenv("CRM_CONTACT_FIELDS", "_id,name,phoneNumber,email").split(",") if f.strip()
+]  # vacío o "*" = todos los campos
+CRM_CONTACT_ENCODING = os.getenv("CRM_CONTACT_ENCODING", "records")  # records | table
+CRM_CONTACT_MAX_CHARS = int(os.getenv("CRM_CONTACT_MAX_CHARS", "200"))  # 0 = sin recorte
+
+# Nombres alternativos con los que el CRM puede devolver un mismo campo
+_ALIASES = {
+    "_id": ("_id", "id"),
+    "phoneNumber": ("phoneNumber", "phone"),
+}
+
+
+def _trim(value, max_chars: int):
+    if max_chars and isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars - 1] + "…"
+    return value
+
+
+def _field(contact: dict, name: str):
+    for key in _ALIASES.get(name, (name,)):
+        value = contact.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def project_contact(contact, fields: list = CRM_CONTACT_FIELDS, max_chars: int = CRM_CONTACT_MAX_CHARS):
+    """Keeps only `fields` (in that order) and truncates long strings. Non-dicts pass through."""
+    if not isinstance(contact, dict):
+        return contact
+    if not fields or fields == ["*"]:
+        return {k: _trim(v, max_chars) for k, v in contact.items()}
+    projected = {}
+    for name in fields:
+        value = _field(contact, name)
+        if value is not None and value != "":
+            projected[name] = _trim(value, max_chars)
+    return projected
+
+
+def encode_contacts(
+    contacts: list,
+    fields: list = CRM_CONTACT_FIELDS,
+    encoding: str = CRM_CONTACT_ENCODING,
+    max_chars: int = CRM_CONTACT_MAX_CHARS,
+) -> dict:
+    """
+    Projects a listing. Returns {"contacts": [...]} in records mode or
+    {"columns": [...], "rows": [...]} in table mode.
+    """
+    projected = [project_contact(c, fields, max_chars) for c in contacts if isinstance(c, dict)]
+    if encoding != "table":
+        return {"contacts": projected}
+    columns = fields if fields and fields != ["*"] else list(dict.fromkeys(k for c in projected for k in c))
+    return {
+        "columns": columns,
+        "rows": [[c.get(name) for name in columns] for c in projected],
+    }
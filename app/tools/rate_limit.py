@@ -0,0 +1,186 @@
+"""
+Token-bucket rate limiting for outbound CRM traffic.
+Every request takes one token from the bucket of the API token (shared by
+all sellers) and one from the seller's own bucket, so a single seller cannot
+push the whole deployment into CRM throttling. In "wait" mode a request
+queues until both buckets have a token (bounded by max_wait and the request
+deadline); in "fail" mode it is rejected right away.
+
+Background traffic runs inside a lane (rate_lane("bulk"), rate_lane("sync")):
+instead of the seller's interactive bucket it takes from a per-seller bucket
+with the lane's own budget, so an import or a mirror sync does not starve
+the seller's chat.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CRM_RATE_TOKEN_PER_SEC = float(os.getenv("CRM_RATE_TOKEN_PER_SEC", "50"))  # 0 = sin límite
+CRM_RATE_TOKEN_BURST = float(os.getenv("CRM_RATE_TOKEN_BURST", "100"))
+CRM_RATE_SELLER_PER_SEC = float(os.getenv("CRM_RATE_SELLER_PER_SEC", "10"))
+CRM_RATE_SELLER_BURST = float(os.getenv("CRM_RATE_SELLER_BURST", "20"))
+CRM_RATE_MODE = os.getenv("CRM_RATE_MODE", "wait")  # wait | fail
+CRM_RATE_MAX_WAIT = float(os.getenv("CRM_RATE_MAX_WAIT", "5"))
+# Importaciones masivas (bulk_create_contacts / import_contacts)
+CRM_RATE_BULK_PER_SEC = float(os.getenv("CRM_RATE_BULK_PER_SEC", os.getenv("CRM_BULK_RATE_PER_SEC", "20")))
+CRM_RATE_BULK_BURST = float(os.getenv("CRM_RATE_BULK_BURST", "20"))
+# Sync en segundo plano del espejo local (mirror.py)
+CRM_RATE_SYNC_PER_SEC = float(os.getenv("CRM_RATE_SYNC_PER_SEC", "5"))
+CRM_RATE_SYNC_BURST = float(os.getenv("CRM_RATE_SYNC_BURST", "10"))
+
+BULK = "bulk"
+SYNC = "sync"
+DEFAULT_LANES = {
+    BULK: (CRM_RATE_BULK_PER_SEC, CRM_RATE_BULK_BURST),
+    SYNC: (CRM_RATE_SYNC_PER_SEC, CRM_RATE_SYNC_BURST),
+}
+
+MAX_SELLER_BUCKETS = 10000
+
+
+_lane: ContextVar[str | None] = ContextVar("crm_rate_lane", default=None)
+
+
+@contextmanager
+def rate_lane(name: str):
+    """CRM requests in this context (and tasks created inside) use the lane's budget."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot get a token within the allowed wait."""
+
+    def __init__(self, scope: str, wait: float):
+        self.scope = scope
+        self.wait = wait
+        super().__init__(f"CRM rate limit reached ({scope}); retry in {wait:.1f}s.")
+
+
+class TokenBucket:
+    """Classic token bucket. Tokens may go negative to represent queued reservations."""
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self.tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (after queued reservations)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """Per-API-token and per-seller buckets with wait metrics."""
+
+    def __init__(
+        self,
+        token_rate: float = CRM_RATE_TOKEN_PER_SEC,
+        token_burst: float = CRM_RATE_TOKEN_BURST,
+        seller_rate: float = CRM_RATE_SELLER_PER_SEC,
+        seller_burst: float = CRM_RATE_SELLER_BURST,
+        mode: str = CRM_RATE_MODE,
+        max_wait: float = CRM_RATE_MAX_WAIT,
+        lanes: dict | None = None,
+        clock=time.monotonic,
+    ):
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.seller_rate = seller_rate
+        self.seller_burst = seller_burst
+        self.mode = mode
+        self.max_wait = max_wait
+        # lane -> (rate, burst) por seller
+        self.lanes = DEFAULT_LANES if lanes is None else lanes
+        self._clock = clock
+        self._token_buckets: dict[str, TokenBucket] = {}
+        self._seller_buckets: dict[str, TokenBucket] = {}
+        self._lane_buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.rejected = 0
+
+    def _bucket(self, table: dict, key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = table.get(key)
+        if bucket is None:
+            if len(table) >= MAX_SELLER_BUCKETS:
+                # Los buckets llenos no guardan estado útil
+                for idle in [k for k, b in table.items() if b.is_full()]:
+                    del table[idle]
+            bucket = table[key] = TokenBucket(rate, burst, self._clock)
+        return bucket
+
+    def reserve(self, api_token: str | None, seller_email: str, max_wait: float | None = None) -> float:
+        """
+        Reserves one request slot. Returns how long the caller must wait
+        before sending, or raises RateLimitExceeded (nothing is consumed).
+        Inside a known rate_lane the seller's lane bucket is used instead of
+        the interactive one.
+        """
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        lane = _lane.get()
+        with self._lock:
+            token_bucket = self._bucket(self._token_buckets, api_token or "", self.token_rate, self.token_burst)
+            if lane in self.lanes:
+                rate, burst = self.lanes[lane]
+                seller_bucket = self._bucket(self._lane_buckets, f"{lane}:{seller_email}", rate, burst)
+                scope = lane
+            else:
+                seller_bucket = self._bucket(self._seller_buckets, seller_email, self.seller_rate, self.seller_burst)
+                scope = "seller"
+            token_wait, seller_wait = token_bucket.wait_time(), seller_bucket.wait_time()
+            wait = max(token_wait, seller_wait)
+
+            if wait > 0 and (self.mode == "fail" or wait > limit):
+                self.rejected += 1
+                raise RateLimitExceeded(scope if seller_wait >= token_wait else "api token", wait)
+
+            token_bucket.take()
+            seller_bucket.take()
+            self.acquired += 1
+            if wait > 0:
+                self.waited += 1
+                self.wait_seconds_total += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "rejected": self.rejected,
+                "wait_seconds_total": round(self.wait_seconds_total, 3),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.waited, 3) if self.waited else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 3),
+                "seller_buckets": len(self._seller_buckets),
+                "lane_buckets": len(self._lane_buckets),
+            }
@@ -0,0 +1,260 @@
+"""
+Local per-seller index of contacts already seen by the CRM tools.
+Resolves a name / email / phone identifier to a contact `_id` without a
+network round trip, using exact keys (email, phone digits) plus a token and
+trigram index over names for ranked fuzzy matching.
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+CRM_INDEX_MIN_SCORE = float(os.getenv("CRM_INDEX_MIN_SCORE", "0.6"))
+CRM_INDEX_MAX_PER_SELLER = int(os.getenv("CRM_INDEX_MAX_PER_SELLER", "5000"))
+
+# Dos candidatos con scores más cercanos que esto se consideran ambiguos
+AMBIGUITY_MARGIN = 0.05
+PHONE_SUFFIX_DIGITS = 7
+
+
+# =============================================================================
+# Normalización y scoring
+# =============================================================================
+
+def normalize_text(value: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w@.+ ]", " ", value.lower()).split())
+
+
+def phone_digits(value: str) -> str:
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def trigrams(value: str) -> set:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def contact_id(contact: dict) -> str | None:
+    return contact.get("_id") or contact.get("id")
+
+
+def contact_phone(contact: dict) -> str:
+    return contact.get("phoneNumber") or contact.get("phone") or ""
+
+
+def _looks_like_phone(identifier: str) -> bool:
+    digits = phone_digits(identifier)
+    return len(digits) >= PHONE_SUFFIX_DIGITS and len(digits) >= len(identifier.replace(" ", "")) * 0.6
+
+
+def score_contact(identifier: str, contact: dict) -> float:
+    """Similarity in [0, 1] between an identifier and a contact."""
+    query = normalize_text(identifier)
+    if not query:
+        return 0.0
+
+    if "@" in query:
+        return 1.0 if query == normalize_text(contact.get("email")) else 0.0
+
+    if _looks_like_phone(identifier):
+        query_digits = phone_digits(identifier)
+        digits = phone_digits(contact_phone(contact))
+        if not digits:
+            return 0.0
+        if query_digits == digits:
+            return 1.0
+        if digits.endswith(query_digits[-PHONE_SUFFIX_DIGITS:]) or query_digits.endswith(digits[-PHONE_SUFFIX_DIGITS:]):
+            return 0.95
+        return 0.0
+
+    name = normalize_text(contact.get("name"))
+    if not name:
+        return 0.0
+    if query == name:
+        return 1.0
+
+    query_tokens, name_tokens = set(query.split()), set(name.split())
+    # Todos los tokens buscados presentes ("pedro" en "pedro lopez")
+    if query_tokens <= name_tokens:
+        return 0.8 + 0.2 * len(query_tokens) / len(name_tokens)
+
+    query_grams, name_grams = trigrams(query), trigrams(name)
+    dice = 2 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+    return 0.8 * dice
+
+
+def is_exact_key(identifier: str) -> bool:
+    """Email or phone: keys that identify one contact (names can repeat)."""
+    return "@" in str(identifier or "") or _looks_like_phone(str(identifier or ""))
+
+
+def rank_contacts(identifier: str, contacts: list) -> list:
+    """Returns [(score, contact)] sorted best-first, dropping zero scores."""
+    scored = [(score_contact(identifier, c), c) for c in contacts if isinstance(c, dict)]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
+
+
+def best_match(identifier: str, contacts: list, min_score: float = CRM_INDEX_MIN_SCORE) -> dict | None:
+    """Best unambiguous match above min_score, or None."""
+    ranked = rank_contacts(identifier, contacts)
+    if not ranked or ranked[0][0] < min_score:
+        return None
+    if len(ranked) > 1 and ranked[0][0] < 1.0 and ranked[0][0] - ranked[1][0] < AMBIGUITY_MARGIN:
+        return None
+    return ranked[0][1]
+
+
+# =============================================================================
+# Índice
+# =============================================================================
+
+class _SellerIndex:
+    """Inverted indexes for one seller. Not thread-safe on its own."""
+
+    def __init__(self, max_contacts: int):
+        self.max_contacts = max_contacts
+        self.contacts: OrderedDict = OrderedDict()  # _id -> contact
+        self.by_email: dict[str, str] = {}
+        self.by_phone_suffix: dict[str, set] = {}
+        self.by_token: dict[str, set] = {}
+        self.by_trigram: dict[str, set] = {}
+
+    def _keys(self, contact: dict):
+        email = normalize_text(contact.get("email"))
+        digits = phone_digits(contact_phone(contact))
+        name = normalize_text(contact.get("name"))
+        return email, digits[-PHONE_SUFFIX_DIGITS:] if digits else "", name
+
+    def add(self, contact: dict) -> None:
+        cid = contact_id(contact)
+        if not cid:
+            return
+        if cid in self.contacts:
+            self.remove(cid)
+        self.contacts[cid] = contact
+        email, suffix, name = self._keys(contact)
+        if email:
+            self.by_email[email] = cid
+        if suffix:
+            self.by_phone_suffix.setdefault(suffix, set()).add(cid)
+        for token in name.split():
+            self.by_token.setdefault(token, set()).add(cid)
+        for gram in trigrams(name) if name else ():
+            self.by_trigram.setdefault(gram, set()).add(cid)
+        while len(self.contacts) > self.max_contacts:
+            self.remove(next(iter(self.contacts)))
+
+    def remove(self, cid: str) -> None:
+        contact = self.contacts.pop(cid, None)
+        if contact is None:
+            return
+        email, suffix, name = self._keys(contact)
+        if self.by_email.get(email) == cid:
+            del self.by_email[email]
+        for table, keys in (
+            (self.by_phone_suffix, [suffix] if suffix else []),
+            (self.by_token, name.split()),
+            (self.by_trigram, trigrams(name) if name else []),
+        ):
+            for key in keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(cid)
+                    if not ids:
+                        del table[key]
+
+    def candidates(self, identifier: str) -> list:
+        query = normalize_text(identifier)
+        if "@" in query:
+            cid = self.by_email.get(query)
+            return [self.contacts[cid]] if cid else []
+        if _looks_like_phone(identifier):
+            suffix = phone_digits(identifier)[-PHONE_SUFFIX_DIGITS:]
+            return [self.contacts[cid] for cid in self.by_phone_suffix.get(suffix, ())]
+        ids = set()
+        for token in query.split():
+            ids |= self.by_token.get(token, set())
+        for gram in trigrams(query):
+            ids |= self.by_trigram.get(gram, set())
+        return [self.contacts[cid] for cid in ids]
+
+
+class SearchIndex:
+    """Thread-safe registry of per-seller contact indexes."""
+
+    def __init__(self, min_score: float = CRM_INDEX_MIN_SCORE, max_per_seller: int = CRM_INDEX_MAX_PER_SELLER):
+        self.min_score = min_score
+        self.max_per_seller = max_per_seller
+        self._sellers: dict[str, _SellerIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _seller(self, seller_email: str) -> _SellerIndex:
+        index = self._sellers.get(seller_email)
+        if index is None:
+            index = self._sellers[seller_email] = _SellerIndex(self.max_per_seller)
+        return index
+
+    def add_many(self, seller_email: str, contacts: list) -> None:
+        if not isinstance(contacts, list):
+            return
+        with self._lock:
+            index = self._seller(seller_email)
+            for contact in contacts:
+                if isinstance(contact, dict):
+                    index.add(contact)
+
+    def add(self, seller_email: str, contact: dict) -> None:
+        self.add_many(seller_email, [contact])
+
+    def merge(self, seller_email: str, cid: str, fields: dict) -> None:
+        """Applies updated fields to an indexed contact (no-op if unknown)."""
+        with self._lock:
+            index = self._seller(seller_email)
+            current = index.contacts.get(cid)
+            if current is not None:
+                index.add({**current, **fields})
+
+    def search(self, seller_email: str, identifier: str) -> list:
+        """Ranked [(score, contact)] among this seller's indexed contacts."""
+        with self._lock:
+            index = self._sellers.get(seller_email)
+            candidates = index.candidates(identifier) if index else []
+        return rank_contacts(identifier, candidates)
+
+    def resolve(self, seller_email: str, identifier: str) -> str | None:
+        """Returns the `_id` of the best unambiguous match, or None on a miss."""
+        with self._lock:
+            index = self._sellers.get(seller_email)
+            candidates = index.candidates(identifier) if index else []
+        match = best_match(identifier, candidates, self.min_score)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return contact_id(match)
+
+    def clear(self, seller_email: str | None = None) -> None:
+        with self._lock:
+            if seller_email is None:
+                self._sellers.clear()
+            else:
+                self._sellers.pop(seller_email, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sellers": len(self._sellers),
+                "contacts": sum(len(i.contacts) for i in self._sellers.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,94 @@
+"""
+Session-scoped memory of the contacts last shown to the seller.
+list_contacts stores a compact copy of its results in the session state so
+update_contact can resolve "Pedro", "pedro@test.com" or "the second one"
+to an `_id` without another CRM search.
+"""
+
+import re
+
+from .search_index import best_match, contact_id, contact_phone, normalize_text
+
+STATE_KEY = "recent_contacts"
+MAX_RECENT_CONTACTS = 20
+
+_ORDINALS = {
+    # Español
+    "primero": 1, "primer": 1, "primera": 1,
+    "segundo": 2, "segunda": 2,
+    "tercero": 3, "tercer": 3, "tercera": 3,
+    "cuarto": 4, "cuarta": 4,
+    "quinto": 5, "quinta": 5,
+    "sexto": 6, "sexta": 6,
+    "septimo": 7, "septima": 7,
+    "octavo": 8, "octava": 8,
+    "noveno": 9, "novena": 9,
+    "decimo": 10, "decima": 10,
+    "ultimo": -1, "ultima": -1,
+    # English
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+    "last": -1,
+}
+_FILLER_WORDS = {"el", "la", "lo", "the", "one", "uno", "una", "contacto", "contact", "de", "del", "of", "list", "lista"}
+
+# Texto ya normalizado: "#2" -> "2", "2º" -> "2o", "número 2" -> "numero 2"
+_NUMBER_REFERENCE = re.compile(r"^(?:(?:el|la|the)\s+)?(?:n|numero|number|contacto|contact)?\s*(\d{1,2})(?:o|a|ro|do|to|vo|no|st|nd|rd|th)?$")
+
+
+def compact_contact(contact: dict) -> dict | None:
+    """Keeps only what is needed to resolve a contact later."""
+    cid = contact_id(contact)
+    if not cid:
+        return None
+    return {
+        "_id": cid,
+        "name": contact.get("name") or "",
+        "email": contact.get("email") or "",
+        "phoneNumber": contact_phone(contact),
+    }
+
+
+def remember_contacts(state, contacts: list) -> None:
+    """Stores the latest listing (in display order) in the session state."""
+    if state is None or not isinstance(contacts, list):
+        return
+    compact = [c for c in (compact_contact(x) for x in contacts if isinstance(x, dict)) if c]
+    if compact:
+        state[STATE_KEY] = compact[:MAX_RECENT_CONTACTS]
+
+
+def parse_ordinal(identifier: str) -> int | None:
+    """Returns a 1-based position (-1 = last) for references like "el segundo"."""
+    text = normalize_text(identifier)
+    if not text or len(text.split()) > 4:
+        return None
+    match = _NUMBER_REFERENCE.match(text)
+    if match:
+        return int(match.group(1)) or None
+    words = text.split()
+    ordinals = [w for w in words if w in _ORDINALS]
+    # "Segundo Pérez" es un nombre, no una posición
+    if len(ordinals) != 1 or any(w not in _ORDINALS and w not in _FILLER_WORDS for w in words):
+        return None
+    return _ORDINALS[ordinals[0]]
+
+
+def resolve_from_session(state, identifier: str) -> str | None:
+    """Resolves an identifier against the last listing. None if not found."""
+    if state is None:
+        return None
+    recent = state.get(STATE_KEY) or []
+    if not recent:
+        return None
+
+    position = parse_ordinal(identifier)
+    if position is not None:
+        if position == -1:
+            return recent[-1]["_id"]
+        if 1 <= position <= len(recent):
+            return recent[position - 1]["_id"]
+        return None
+
+    match = best_match(identifier, recent)
+    return match["_id"] if match else None
@@ -0,0 +1,93 @@
+"""
+Request coalescing ("single-flight") for CRM reads.
+Concurrent calls with the same key share one in-flight execution and its
+result (or exception). Nothing is kept once the call finishes, so unlike
+the cache this never serves stale data.
+"""
+
+import asyncio
+import threading
+
+
+class _Counters:
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+        }
+
+
+class SingleFlight(_Counters):
+    """Thread-based single-flight for the sync tools."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._in_flight: dict = {}  # key -> [event, result, error]
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = [threading.Event(), None, None]
+                self.executions += 1
+            else:
+                self.collapsed += 1
+
+        event = call[0]
+        if not leader:
+            event.wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = fn()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**super().stats(), "in_flight": len(self._in_flight)}
+
+
+class AsyncSingleFlight(_Counters):
+    """asyncio single-flight for the async tools (one shared future per key and loop)."""
+
+    def __init__(self):
+        super().__init__()
+        self._in_flight: dict = {}  # (loop, key) -> future
+
+    async def do(self, key, coro_fn):
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        self.calls += 1
+
+        future = self._in_flight.get(flight_key)
+        if future is not None:
+            self.collapsed += 1
+            # shield: si un caller se cancela, no cancela la request compartida
+            return await asyncio.shield(future)
+
+        self.executions += 1
+        future = loop.create_task(coro_fn())
+        self._in_flight[flight_key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "in_flight": len(self._in_flight)}
@@ -13,6 +13,18 @@ from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 from app.agent import root_agent
+from app.tools import crm
+from app.tools.pending_actions import PENDING_CONFIRMATION
+
+
+@pytest.fixture(autouse=True)
+def clear_contact_state():
+    """Cada eval parte sin cache ni índice local del CRM (los mocks cambian por test)."""
+    crm._cache.clear()
+    crm._index.clear()
+    yield
+    crm._cache.clear()
+    crm._index.clear()
 
 
 # =============================================================================
@@ -126,6 +138,9 @@ def send_message(agent_session: dict, message_text: str) -> dict:
             for part in event.content.parts:
                 if hasattr(part, 'text') and part.text:
                     response_text += part.text
+                # propose_contact_change responde con su texto de confirmación (sin otra llamada al LLM)
+                elif part.function_response and (part.function_response.response or {}).get("status") == PENDING_CONFIRMATION:
+                    response_text += part.function_response.response.get("message", "")
 
         # Capturar tool calls (llamadas a herramientas)
         if hasattr(event, 'tool_calls') and event.tool_calls:
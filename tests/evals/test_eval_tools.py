@@ -10,8 +10,10 @@ NOTA: Estas evals usan mocks para simular las respuestas del CRM
 y poder inspeccionar qué parámetros se enviaron.
 """
 
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch
+from app.codec import loads
 from .conftest import send_message, response_contains_any
 
 
@@ -24,7 +26,7 @@ class TestCreateContactToolCall:
     Evalúa si create_contact se llama correctamente.
     """
 
-    @patch('app.tools.crm.requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_create_uses_correct_seller_email(self, mock_post, agent_session_with_seller):
         """
         GIVEN: Usuario quiere crear un contacto y confirma
@@ -34,9 +36,9 @@ class TestCreateContactToolCall:
         Este es un test CRÍTICO de seguridad multi-tenant.
         """
         # Configurar el mock para simular respuesta exitosa del CRM
-        mock_post.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {"id": "123", "name": "Test"}
+        mock_post.return_value = httpx.Response(
+            200,
+            json={"id": "123", "name": "Test"}
         )
 
         # Paso 1: Dar datos completos
@@ -59,18 +61,18 @@ class TestCreateContactToolCall:
                     f"seller_email incorrecto en headers: {headers.get('x-user-email')}"
 
                 # Verificar el body
-                body = call_args.kwargs.get('json', {})
+                body = loads(call_args.kwargs.get('content') or b'{}')
                 assert body.get('userEmail') == "vendedor_eval@inmobiliaria.com", \
                     f"seller_email incorrecto en body: {body.get('userEmail')}"
 
-    @patch('app.tools.crm.requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_create_validates_required_fields(self, mock_post, agent_session_with_seller):
         """
         GIVEN: Usuario da datos incompletos (falta email)
         WHEN: El agente procesa
         THEN: NO debe llamar create_contact, debe pedir el dato faltante
         """
-        mock_post.return_value = MagicMock(status_code=200)
+        mock_post.return_value = httpx.Response(200, json={})
 
         # Dar datos incompletos (sin email)
         response = send_message(
@@ -94,7 +96,7 @@ class TestListContactsToolCall:
     Evalúa si list_contacts se llama correctamente.
     """
 
-    @patch('app.tools.crm.requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_list_uses_correct_seller_email(self, mock_post, agent_session_with_seller):
         """
         GIVEN: Usuario pide ver sus contactos
@@ -102,9 +104,9 @@ class TestListContactsToolCall:
         THEN: Debe filtrar por el seller_email del state
         """
         # Simular respuesta del CRM
-        mock_post.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {
+        mock_post.return_value = httpx.Response(
+            200,
+            json={
                 "contacts": [
                     {"name": "Contact 1", "email": "c1@test.com"},
                     {"name": "Contact 2", "email": "c2@test.com"}
@@ -124,16 +126,16 @@ class TestListContactsToolCall:
             assert headers.get('x-user-email') == "vendedor_eval@inmobiliaria.com", \
                 "list_contacts no usó el seller_email correcto"
 
-    @patch('app.tools.crm.requests.post')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
     def test_list_with_search_term(self, mock_post, agent_session_with_seller):
         """
         GIVEN: Usuario busca un contacto específico
         WHEN: El agente ejecuta list_contacts
         THEN: Debe incluir el searchTerm en el body
         """
-        mock_post.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {"contacts": [], "totalContacts": 0}
+        mock_post.return_value = httpx.Response(
+            200,
+            json={"contacts": [], "totalContacts": 0}
         )
 
         response = send_message(
@@ -143,7 +145,7 @@ class TestListContactsToolCall:
 
         # Verificar que se incluyó el término de búsqueda
         if mock_post.called:
-            body = mock_post.call_args.kwargs.get('json', {})
+            body = loads(mock_post.call_args.kwargs.get('content') or b'{}')
             # El searchTerm debería contener "María" o "García"
             search_term = body.get('searchTerm', '')
             assert 'María' in search_term or 'García' in search_term or 'maria' in search_term.lower(), \
@@ -162,8 +164,8 @@ class TestUpdateContactToolCall:
     3. Luego actualizar
     """
 
-    @patch('app.tools.crm.requests.post')
-    @patch('app.tools.crm.requests.put')
+    @patch('httpx.AsyncClient.post', new_callable=AsyncMock)
+    @patch('httpx.AsyncClient.put', new_callable=AsyncMock)
     def test_update_searches_before_updating(self, mock_put, mock_post, agent_session_with_seller):
         """
         GIVEN: Usuario quiere actualizar un contacto por nombre
@@ -171,9 +173,9 @@ class TestUpdateContactToolCall:
         THEN: Debe buscar primero para obtener el ID real
         """
         # Mock de búsqueda (devuelve el contacto encontrado)
-        mock_post.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {
+        mock_post.return_value = httpx.Response(
+            200,
+            json={
                 "contacts": [
                     {"_id": "abc123", "name": "Pedro López", "phone": "111-1111"}
                 ]
@@ -181,9 +183,9 @@ class TestUpdateContactToolCall:
         )
 
         # Mock de actualización
-        mock_put.return_value = MagicMock(
-            status_code=200,
-            json=lambda: {"_id": "abc123", "name": "Pedro López", "phone": "999-9999"}
+        mock_put.return_value = httpx.Response(
+            200,
+            json={"_id": "abc123", "name": "Pedro López", "phone": "999-9999"}
         )
 
         # Pedir actualización
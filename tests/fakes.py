@@ -0,0 +1,16 @@
+"""
+Test doubles shared by the unit tests and the evals.
+"""
+
+import json
+
+import requests
+
+
+def json_response(body, status_code: int = 200) -> requests.Response:
+    """A real requests.Response with a JSON body (what the sync CRM client returns)."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    return response
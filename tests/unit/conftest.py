@@ -0,0 +1,10 @@
+"""
+Shared setup for unit tests.
+
+Importing `app.tools` loads the `app` package, which builds the agent and
+requires GOOGLE_API_KEY. Unit tests never call Gemini, so a dummy key is enough.
+"""
+
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "unit-test-key")
@@ -0,0 +1,133 @@
+"""
+Unit tests for bulk contact import (tool, core and CLI).
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from click.testing import CliRunner
+
+from app.app_utils.import_contacts import main as import_cli
+from app.deadline import deadline_scope
+from app.tools import bulk, crm_async
+from app.tools.crm_client import AsyncCRMClient
+from app.tools.rate_limit import BULK, RateLimiter
+
+SELLER = "seller@test.com"
+
+ROWS = [
+    {"name": "Ana", "phone": "555-111111", "email": "ana@test.com"},
+    {"nombre": "Luis", "telefono": "555-222222", "correo": "luis@test.com"},
+    {"name": "Sin teléfono", "email": "x@test.com"},
+    {"name": "Ana bis", "phone": "555-333333", "email": "ANA@test.com"},
+]
+
+
+def test_validate_rows_up_front():
+    valid, invalid = bulk.validate_rows(SELLER, ROWS)
+
+    assert [n for n, _ in valid] == [1, 2]
+    assert valid[1][1] == {"name": "Luis", "phone_number": "555-222222", "email": "luis@test.com"}
+    assert [r["row"] for r in invalid] == [3, 4]
+    assert "Duplicate email" in invalid[1]["message"]
+
+
+@pytest.mark.asyncio
+async def test_import_respects_concurrency_and_reports_rows():
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        body = json.loads(request.content)
+        if body["name"] == "Luis":
+            return httpx.Response(409, text="duplicate")
+        return httpx.Response(201, json={"_id": body["email"]})
+
+    rows = [{"name": f"C{i}", "phone": f"555-{i:06d}", "email": f"c{i}@test.com"} for i in range(20)]
+    rows.append(ROWS[1])
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+
+    with patch.object(crm_async, "_client", client):
+        report = await bulk.import_contacts(SELLER, rows, concurrency=4)
+
+    assert peak <= 4
+    assert (report["created"], report["failed"], report["invalid"]) == (20, 1, 0)
+    assert report["results"][0] == {"row": 1, "status": "success", "name": "C0", "id": "c0@test.com"}
+    assert report["results"][-1]["message"] == "Error API: duplicate"
+
+
+@pytest.mark.asyncio
+async def test_bulk_tool_returns_only_problem_rows():
+    def handler(request):
+        return httpx.Response(201, json={"_id": "1"})
+
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+    with patch.object(crm_async, "_client", client):
+        report = await bulk.bulk_create_contacts(SELLER, ROWS)
+
+    assert report["created"] == 2
+    assert [r["row"] for r in report["results"]] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_rows_queued_in_the_outbox_count_as_accepted():
+    queued = {"status": "queued", "message": "Guardado, se enviará al CRM.", "write_id": "w1"}
+
+    with patch.object(crm_async, "create_contact", AsyncMock(return_value=queued)):
+        report = await bulk.bulk_create_contacts(SELLER, ROWS)
+
+    assert report["status"] == "success"
+    assert (report["created"], report["queued"], report["failed"]) == (0, 2, 0)
+    assert [r["row"] for r in report["results"]] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_import_too_slow_for_the_deadline_runs_in_background():
+    created = []
+
+    def handler(request):
+        created.append(json.loads(request.content)["email"])
+        return httpx.Response(201, json={"_id": "1"})
+
+    rows = [{"name": f"C{i}", "phone": f"555-{i:06d}", "email": f"c{i}@test.com"} for i in range(30)]
+    unlimited = RateLimiter(token_rate=0, seller_rate=0, lanes={BULK: (0, 1)})
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler), rate_limiter=unlimited)
+    with patch.object(crm_async, "_client", client), patch.object(bulk, "CRM_RATE_BULK_PER_SEC", 20):
+        with deadline_scope(1):
+            report = await bulk.bulk_create_contacts(SELLER, rows)
+        assert report["status"] == "queued" and report["queued"] == 30
+        await asyncio.gather(*bulk._background_imports)
+
+    assert len(created) == 30
+
+
+def test_cli_imports_without_a_google_api_key():
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_API_KEY"}
+
+    result = subprocess.run(
+        [sys.executable, "-m", "app.app_utils.import_contacts", "--help"], env=env, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_cli_dry_run_reads_csv(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,phone,email\nAna,555-111111,ana@test.com\nBad,1,bad\n")
+
+    result = CliRunner().invoke(import_cli, [str(path), "--seller-email", SELLER, "--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert [r["status"] for r in rows] == ["valid", "invalid"]
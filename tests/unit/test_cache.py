@@ -0,0 +1,109 @@
+"""
+Unit tests for the contact read cache.
+"""
+
+import threading
+from unittest.mock import patch
+
+from app.tools import crm
+from app.tools.cache import ContactCache
+from tests.fakes import json_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    cache = ContactCache(ttl=10, max_entries=10)
+    key = cache.make_key("s@test.com", " Ana ", 1, 5)
+
+    assert cache.get(key) is None
+    cache.set(key, {"contacts": []})
+    assert cache.get(cache.make_key("s@test.com", "Ana", 1, 5)) == {"contacts": []}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ContactCache(ttl=10, max_entries=10, clock=clock)
+    key = cache.make_key("s@test.com", None, 1, 5)
+    cache.set(key, "page")
+
+    clock.now = 9.9
+    assert cache.get(key) == "page"
+    clock.now = 10.0
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ContactCache(ttl=10, max_entries=2)
+    a, b, c = (cache.make_key("s@test.com", t, 1, 5) for t in "abc")
+    cache.set(a, 1)
+    cache.set(b, 2)
+    cache.get(a)
+    cache.set(c, 3)
+
+    assert cache.get(b) is None
+    assert cache.get(a) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_seller_only_drops_that_seller():
+    cache = ContactCache(ttl=10, max_entries=10)
+    mine = cache.make_key("me@test.com", None, 1, 5)
+    other = cache.make_key("other@test.com", None, 1, 5)
+    cache.set(mine, 1)
+    cache.set(other, 2)
+
+    assert cache.invalidate_seller("me@test.com") == 1
+    assert cache.get(mine) is None
+    assert cache.get(other) == 2
+
+
+def test_zero_ttl_disables_cache():
+    cache = ContactCache(ttl=0)
+    key = cache.make_key("s@test.com", None, 1, 5)
+    cache.set(key, 1)
+    assert cache.get(key) is None
+
+
+def test_set_with_an_old_generation_is_skipped():
+    cache = ContactCache(ttl=10, max_entries=10)
+    key = cache.make_key("s@test.com", None, 1, 5)
+    generation = cache.generation("s@test.com")
+
+    cache.invalidate_seller("s@test.com")
+    cache.set(key, "before the write", generation)
+
+    assert cache.get(key) is None
+    assert cache.stats()["stale_sets"] == 1
+
+
+def test_slow_read_that_overlaps_a_write_is_not_cached():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_post(url, **kwargs):
+        started.set()
+        release.wait(5)
+        return json_response({"contacts": [{"_id": "a" * 24, "name": "Ana"}], "totalContacts": 1})
+
+    crm._cache.clear()
+    with patch.object(crm._client.session, "post", side_effect=slow_post):
+        reader = threading.Thread(target=crm._fetch_contacts_page, args=("s@test.com", None, 1, 5))
+        reader.start()
+        started.wait(5)
+        crm._record_created("s@test.com", {"_id": "b" * 24, "name": "Beto"})
+        release.set()
+        reader.join(5)
+
+    assert crm._cache.get(crm._cache.make_key("s@test.com", None, 1, 5)) is None
+    crm._cache.clear()
+    crm._index.clear()
@@ -0,0 +1,47 @@
+"""
+Unit tests for the system instruction rendering in before_model_callback.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+
+from app.callbacks import before_model_callback, current_time_label, render_instruction, render_static_instruction
+from app.config import AGENT_NAME, COMPANY
+
+
+def test_instruction_is_memoized_per_seller():
+    first = render_instruction("a@x.com", COMPANY, AGENT_NAME)
+
+    assert render_instruction("a@x.com", COMPANY, AGENT_NAME) is first
+    assert render_instruction("b@x.com", COMPANY, AGENT_NAME) is not first
+
+
+def test_static_prefix_is_shared_by_all_sellers():
+    static = render_static_instruction(AGENT_NAME, COMPANY)
+
+    assert "{" not in static
+    assert render_instruction("a@x.com").startswith(static)
+    assert render_instruction("b@x.com").startswith(static)
+    assert "a@x.com" not in static
+
+
+def test_time_granularity():
+    now = datetime(2025, 3, 4, 10, 47)
+
+    assert current_time_label(now, 1) == "04/03/2025 10:47"
+    assert current_time_label(now, 15) == "04/03/2025 10:45"
+    assert current_time_label(now, 1440) == "04/03/2025"
+    assert current_time_label(now, 0) == ""
+
+
+def test_callback_sets_instruction_with_dynamic_suffix():
+    context = SimpleNamespace(state={"seller_email": "v@x.com"})
+    request = LlmRequest()
+
+    before_model_callback(context, request)
+
+    instruction = request.config.system_instruction
+    assert instruction.startswith(render_instruction("v@x.com"))
+    assert "Current Time:" in instruction.splitlines()[-1]
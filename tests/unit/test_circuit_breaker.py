@@ -0,0 +1,189 @@
+"""
+Unit tests for the CRM circuit breaker and retry policy.
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.tools import crm, crm_async
+from app.tools.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    RetryPolicy,
+    endpoint_key,
+)
+from app.tools.crm_client import AsyncCRMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_endpoint_key_groups_ids_and_queries():
+    assert endpoint_key("post", "/contacts?page=2&limit=5") == "POST /contacts"
+    assert endpoint_key("PUT", "/contact/" + "a" * 24) == "PUT /contact/{id}"
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    clock = FakeClock()
+    breaker = CircuitBreaker("POST /contacts", window=4, min_calls=4, error_rate=0.5, open_seconds=30, clock=clock)
+    for failed in (False, True, False, True):
+        breaker.before_call()
+        breaker.record(failed, 0.1)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker("x", window=3, min_calls=3, slow_call_seconds=1, slow_call_rate=0.6)
+    for latency in (2, 2, 0.1):
+        breaker.record(False, latency)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker("x", window=2, min_calls=2, open_seconds=10, half_open_probes=1, clock=clock)
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+
+    clock.now = 10
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # solo un probe a la vez
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_retry_budget_limits_retries():
+    policy = RetryPolicy(budget_ratio=0.1, min_budget=1)
+    for _ in range(10):
+        policy.record_request()
+    assert policy.acquire_retry()
+    assert not policy.acquire_retry()
+    assert policy.stats()["budget_exhausted"] == 1
+
+
+def _client(handler, min_calls=2):
+    return AsyncCRMClient(
+        "http://crm.local",
+        "token",
+        transport=httpx.MockTransport(handler),
+        breakers=CircuitBreakerRegistry(window=4, min_calls=min_calls, open_seconds=60),
+        retry_policy=RetryPolicy(attempts=3, base_seconds=0, max_seconds=0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_idempotent_reads_retry_writes_do_not():
+    attempts = {"POST": 0, "PUT": 0}
+
+    def handler(request):
+        attempts[request.method] += 1
+        if attempts[request.method] < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={})
+
+    client = _client(handler, min_calls=10)
+    response = await client.post("/contacts", "s@test.com", json={}, idempotent=True)
+    assert response.status_code == 200
+    assert attempts["POST"] == 3
+
+    response = await client.put("/contact/" + "a" * 24, "s@test.com", json={})
+    assert response.status_code == 503
+    assert attempts["PUT"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tools_fail_fast_when_circuit_open():
+    calls = 0
+
+    def handler(request):
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("down")
+
+    crm._cache.clear()
+    client = _client(handler)
+    with patch.object(crm_async, "_client", client):
+        first = await crm_async.list_contacts("s@test.com", "uno")
+        second = await crm_async.update_contact("s@test.com", "Nadie", name="X")
+    crm._cache.clear()
+
+    assert first["status"] == "error"
+    assert calls == 2  # se abre tras 2 fallos; el resto falla rápido sin red
+    assert second["status"] == "error"
+    assert "temporarily unavailable" in second["message"]
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_is_released_on_any_exception():
+    clock = FakeClock()
+    outcomes = [httpx.ConnectError("down"), httpx.ConnectError("down"), httpx.DecodingError("bad gzip"), None]
+
+    def handler(request):
+        outcome = outcomes.pop(0)
+        if outcome:
+            raise outcome
+        return httpx.Response(200, json={})
+
+    client = AsyncCRMClient(
+        "http://crm.local", "token", transport=httpx.MockTransport(handler),
+        breakers=CircuitBreakerRegistry(window=4, min_calls=2, open_seconds=60, clock=clock),
+        retry_policy=RetryPolicy(attempts=1),
+    )
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await client.post("/contacts", "s@test.com", json={})
+    breaker = client.breakers.get("POST", "/contacts")
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    with pytest.raises(httpx.DecodingError):
+        await client.post("/contacts", "s@test.com", json={})
+    # El probe fallido vuelve a abrir el circuito en vez de dejarlo half-open para siempre
+    assert breaker.state == OPEN
+
+    clock.now = 120
+    assert (await client.post("/contacts", "s@test.com", json={})).status_code == 200
+    assert breaker.state == CLOSED
+
+
+def test_sync_probe_is_released_on_chunked_encoding_error():
+    import requests
+
+    from app.tools.crm_client import CRMClient
+
+    clock = FakeClock()
+    client = CRMClient(
+        "http://crm.local", "token", breakers=CircuitBreakerRegistry(window=2, min_calls=1, open_seconds=10, clock=clock),
+        retry_policy=RetryPolicy(attempts=1),
+    )
+    breaker = client.breakers.get("POST", "/contacts")
+    breaker.record(True, 0.1)
+    clock.now = 10
+
+    with patch.object(client.session, "post", side_effect=requests.exceptions.ChunkedEncodingError("cut")):
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            client.post("/contacts", "s@test.com", json={})
+    assert breaker.state == OPEN and breaker._probes_in_flight == 0
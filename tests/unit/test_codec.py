@@ -0,0 +1,70 @@
+import json
+
+import httpx
+import pytest
+
+from app import codec
+from tests.fakes import json_response
+
+
+def test_dumps_is_compact_utf8():
+    data = codec.dumps({"name": "Peña", "tags": [1, 2]})
+
+    assert isinstance(data, bytes)
+    assert json.loads(data) == {"name": "Peña", "tags": [1, 2]}
+    assert b" " not in data
+
+
+def test_roundtrip_from_bytes_and_str():
+    body = {"userEmail": "v@x.com", "searchTerm": "José"}
+
+    assert codec.loads(codec.dumps(body)) == body
+    assert codec.loads(codec.dumps(body).decode("utf-8")) == body
+
+
+def test_webhook_payload_is_plain_dict():
+    payload = codec.decode_webhook_payload(b'{"phone": "52155", "message": "hola", "userEmail": "v@x.com"}')
+
+    assert isinstance(payload, dict)
+    assert payload["message"] == "hola"
+    assert payload.get("pyrotechToken") is None
+
+
+def test_webhook_payload_must_be_object():
+    with pytest.raises(ValueError):
+        codec.decode_webhook_payload(b"[1, 2]")
+
+
+def test_contacts_page_accepts_object_or_list():
+    assert codec.decode_contacts_page(b'{"contacts": [{"name": "Ana"}], "totalContacts": 1}')["totalContacts"] == 1
+    assert codec.decode_contacts_page(b'[{"name": "Ana"}]') == [{"name": "Ana"}]
+
+
+def test_decode_response_reads_the_body_of_sync_and_async_responses():
+    assert codec.decode_response(json_response({"ok": True})) == {"ok": True}
+    assert codec.decode_contacts_response(httpx.Response(200, json={"contacts": None})) == {"contacts": []}
+
+
+@pytest.fixture(params=["msgspec", "orjson", "json"])
+def backend(request):
+    if codec._use_backend(request.param) != request.param:
+        codec._use_backend(codec.JSON_CODEC)
+        pytest.skip(f"{request.param} is not installed")
+    yield request.param
+    codec._use_backend(codec.JSON_CODEC)
+
+
+def test_every_backend_accepts_the_same_odd_payloads(backend):
+    payload = codec.decode_webhook_payload(b'{"phone": 5215512345678, "message": "hola"}')
+    page = codec.decode_contacts_page(b'{"contacts": null, "totalContacts": "12"}')
+    broken_total = codec.decode_contacts_page(b'{"contacts": [{"name": "Ana"}], "totalContacts": "muchos"}')
+
+    assert payload["phone"] == "5215512345678"
+    assert page == {"contacts": [], "totalContacts": 12}
+    assert broken_total == {"contacts": [{"name": "Ana"}]}
+
+
+def test_unknown_backend_falls_back_to_stdlib():
+    name, lib = codec._load_backend("json")
+
+    assert name == "json" and lib is json
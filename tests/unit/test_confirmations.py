@@ -0,0 +1,180 @@
+"""
+Unit tests for pending create/update proposals and the yes/no confirmation router.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from google.adk.agents import Agent
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.app_utils.fake_model import FakeGemini
+from app.confirmations import NO, YES, ConfirmationRouter, classify_confirmation
+from app.tools import crm, crm_async
+from app.tools.pending_actions import PENDING_CONFIRMATION, STATE_KEY, propose_contact_change
+
+SELLER = "v@x.com"
+PROPOSAL = {"seller_email": SELLER, "action": "create", "name": "Ana Pérez", "phone_number": "5512345678", "email": "ana@x.com"}
+
+
+@pytest.mark.parametrize("message, answer", [
+    ("sí", YES),
+    ("Si, confirmo!", YES),
+    ("dale", YES),
+    ("ok por favor", YES),
+    ("👍", YES),
+    ("no", NO),
+    ("mejor no", NO),
+    ("cancela", NO),
+    ("sí, pero cambia el email a ana2@x.com", None),
+    ("no sé", None),
+    ("hola", None),
+])
+def test_classify_confirmation(message, answer):
+    assert classify_confirmation(message) == answer
+
+
+def test_invalid_proposal_is_rejected_without_storing_it():
+    context = MagicMock(state={})
+
+    result = propose_contact_change(**{**PROPOSAL, "email": "ana-sin-arroba"}, tool_context=context)
+
+    assert result["status"] == "error"
+    assert STATE_KEY not in context.state
+
+
+def _model_reply(contents, config):
+    """El modelo propone el contacto en cuanto recibe los datos."""
+    return types.FunctionCall(name="propose_contact_change", args=PROPOSAL)
+
+
+def _session_with_proposal():
+    """Runs one agent turn that ends in a pending proposal. Returns (sessions, agent, model)."""
+    sessions = InMemorySessionService()
+    model = FakeGemini(model="gemini-2.5-flash", reply=_model_reply)
+    agent = Agent(name="root_agent", model=model, instruction="", tools=[propose_contact_change])
+
+    async def run():
+        await sessions.create_session(app_name="t", user_id="u", session_id="u", state={"seller_email": SELLER})
+        runner = Runner(agent=agent, app_name="t", session_service=sessions)
+        finals = []
+        async for event in runner.run_async(
+            user_id="u", session_id="u",
+            new_message=types.Content(role="user", parts=[types.Part(text="agrega a Ana Pérez 5512345678 ana@x.com")]),
+        ):
+            if event.is_final_response():
+                finals.append(event)
+        return finals
+
+    finals = asyncio.run(run())
+    return sessions, agent, model, finals
+
+
+def _state(sessions):
+    return asyncio.run(sessions.get_session(app_name="t", user_id="u", session_id="u"))
+
+
+def test_proposal_ends_the_turn_without_a_second_llm_call():
+    sessions, _, model, finals = _session_with_proposal()
+
+    assert len(model.api_client.models.requests) == 1
+    response = finals[-1].content.parts[0].function_response.response
+    assert response["status"] == PENDING_CONFIRMATION and "¿Confirmas?" in response["message"]
+    assert _state(sessions).state[STATE_KEY]["args"]["email"] == "ana@x.com"
+
+
+def test_yes_executes_the_stored_call_through_the_crm_tool():
+    sessions, agent, model, _ = _session_with_proposal()
+    router = ConfirmationRouter()
+    response = httpx.Response(201, json={"_id": "a" * 24, "name": "Ana Pérez", "email": "ana@x.com", "__v": 0})
+
+    with patch.object(crm_async._client, "post", AsyncMock(return_value=response)) as post:
+        reply = asyncio.run(router.handle(sessions, "t", "u", "u", "sí", agent.name))
+    crm._cache.clear()
+    crm._index.clear()
+
+    assert "Ana Pérez" in reply and reply.startswith("✅")
+    assert post.call_args.kwargs["json"]["userEmail"] == SELLER
+    assert len(model.api_client.models.requests) == 1
+    session = _state(sessions)
+    assert session.state[STATE_KEY] is None
+    function_response = session.events[-2].content.parts[0].function_response
+    assert function_response.name == "create_contact" and function_response.response["status"] == "success"
+    assert router.stats()["confirmed"] == 1
+
+
+def test_proposal_for_another_seller_is_never_executed():
+    sessions, agent, _, _ = _session_with_proposal()
+    session = _state(sessions)
+    forged = {**session.state[STATE_KEY], "seller_email": "otro@x.com"}
+    asyncio.run(sessions.append_event(
+        session, Event(invocation_id=Event.new_id(), author=agent.name, actions=EventActions(state_delta={STATE_KEY: forged}))
+    ))
+    router = ConfirmationRouter()
+
+    with patch.object(crm_async._client, "post", AsyncMock()) as post:
+        reply = asyncio.run(router.handle(sessions, "t", "u", "u", "sí", agent.name))
+
+    assert reply is None
+    post.assert_not_called()
+    assert _state(sessions).state[STATE_KEY] is None
+    assert router.stats()["rejected"] == 1
+
+
+def test_repeated_yes_runs_the_write_once():
+    sessions, agent, _, _ = _session_with_proposal()
+    router = ConfirmationRouter()
+
+    async def slow_post(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return httpx.Response(201, json={"_id": "a" * 24, "name": "Ana Pérez"})
+
+    async def both():
+        return await asyncio.gather(
+            router.handle(sessions, "t", "u", "u", "sí", agent.name),
+            router.handle(sessions, "t", "u", "u", "sí", agent.name),
+        )
+
+    with patch.object(crm_async._client, "post", AsyncMock(side_effect=slow_post)) as post:
+        replies = asyncio.run(both())
+    crm._cache.clear()
+    crm._index.clear()
+
+    assert post.call_count == 1
+    assert sum(1 for r in replies if r and r.startswith("✅")) == 1
+
+
+def test_no_discards_the_proposal():
+    sessions, agent, _, _ = _session_with_proposal()
+    router = ConfirmationRouter()
+
+    with patch.object(crm_async._client, "post", AsyncMock()) as post:
+        reply = asyncio.run(router.handle(sessions, "t", "u", "u", "no", agent.name))
+
+    assert reply == "Entendido, no hice ningún cambio."
+    post.assert_not_called()
+    assert _state(sessions).state[STATE_KEY] is None
+
+
+def test_other_message_drops_the_proposal_and_goes_to_the_agent():
+    sessions, agent, _, _ = _session_with_proposal()
+    router = ConfirmationRouter()
+
+    reply = asyncio.run(router.handle(sessions, "t", "u", "u", "sí, pero con email ana2@x.com", agent.name))
+
+    assert reply is None
+    assert _state(sessions).state[STATE_KEY] is None
+    assert router.stats()["abandoned"] == 1
+
+
+def test_expired_proposal_is_not_executed():
+    sessions, agent, _, _ = _session_with_proposal()
+    router = ConfirmationRouter(ttl_seconds=60, clock=lambda: 10**12)
+
+    assert asyncio.run(router.handle(sessions, "t", "u", "u", "sí", agent.name)) is None
+    assert router.stats()["expired"] == 1
@@ -0,0 +1,118 @@
+"""
+Unit tests for update_contact_by_reference (ranked candidates + diff, commit by token).
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.tools import crm, crm_async
+from app.tools.contact_update import CANDIDATES_KEY, contact_diff, update_contact_by_reference
+from app.tools.pending_actions import PENDING_CONFIRMATION, STATE_KEY as PENDING_KEY
+from app.tools.session_contacts import remember_contacts
+
+SELLER = "v@x.com"
+PEDROS = [
+    {"_id": "a" * 24, "name": "Pedro López", "email": "pedro@x.com", "phoneNumber": "5511111111"},
+    {"_id": "b" * 24, "name": "Pedro Díaz", "email": "pdiaz@x.com", "phoneNumber": "5522222222"},
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    crm._cache.clear()
+    crm._index.clear()
+    yield
+    crm._cache.clear()
+    crm._index.clear()
+
+
+def _context(state=None):
+    return SimpleNamespace(state=state if state is not None else {}, actions=SimpleNamespace(skip_summarization=False))
+
+
+def _response(body, status=200):
+    return httpx.Response(status, json=body)
+
+
+def test_diff_lists_only_changed_fields():
+    assert contact_diff(PEDROS[0], {"email": "nuevo@x.com", "name": "Pedro López"}) == {
+        "email": {"from": "pedro@x.com", "to": "nuevo@x.com"}
+    }
+
+
+def test_session_reference_gives_one_candidate_and_a_pending_action_without_crm_calls():
+    context = _context()
+    remember_contacts(context.state, PEDROS)
+
+    with patch.object(crm_async._client, "post", AsyncMock()) as post:
+        result = asyncio.run(update_contact_by_reference(SELLER, "el segundo", email="nuevo@x.com", tool_context=context))
+
+    post.assert_not_called()
+    assert result["status"] == PENDING_CONFIRMATION
+    assert "pdiaz@x.com → nuevo@x.com" in result["message"]
+    assert result["candidates"][0]["token"] == "c1"
+    assert context.state[PENDING_KEY]["args"] == {"identifier": "b" * 24, "email": "nuevo@x.com"}
+    assert context.actions.skip_summarization is True
+
+
+def test_ambiguous_name_returns_ranked_candidates_then_commits_by_token():
+    context = _context()
+    search = _response({"contacts": PEDROS, "totalContacts": 2})
+
+    with patch.object(crm_async._client, "post", AsyncMock(return_value=search)):
+        result = asyncio.run(update_contact_by_reference(SELLER, "Pedro", phone_number="5599999999", tool_context=context))
+
+    assert result["status"] == "candidates"
+    assert [c["token"] for c in result["candidates"]] == ["c1", "c2"]
+    assert all(c["diff"]["phone_number"]["to"] == "5599999999" for c in result["candidates"])
+    assert PENDING_KEY not in context.state
+
+    target = result["candidates"][1]["contact"]["_id"]
+    updated = _response({**PEDROS[1], "phoneNumber": "5599999999"})
+    with patch.object(crm_async._client, "put", AsyncMock(return_value=updated)) as put:
+        committed = asyncio.run(update_contact_by_reference(SELLER, candidate_token="c2", tool_context=context))
+
+    assert committed["status"] == "success"
+    assert put.call_args.args[0] == f"/contact/{target}"
+    assert put.call_args.kwargs["json"]["phoneNumber"] == "5599999999"
+    assert context.state[CANDIDATES_KEY] is None
+
+
+def test_unknown_token_is_an_error():
+    result = asyncio.run(update_contact_by_reference(SELLER, candidate_token="c9", tool_context=_context()))
+
+    assert result["status"] == "error"
+
+
+def test_no_match_is_not_found():
+    with patch.object(crm_async._client, "post", AsyncMock(return_value=_response({"contacts": [], "totalContacts": 0}))):
+        result = asyncio.run(update_contact_by_reference(SELLER, "Juana", email="j@x.com", tool_context=_context()))
+
+    assert result["status"] == "not_found"
+
+
+def test_index_match_by_name_is_checked_against_the_crm():
+    crm._index.add(SELLER, PEDROS[0])
+    search = _response({"contacts": PEDROS, "totalContacts": 2})
+
+    with patch.object(crm_async._client, "post", AsyncMock(return_value=search)) as post:
+        result = asyncio.run(update_contact_by_reference(SELLER, "Pedro", email="nuevo@x.com", tool_context=_context()))
+
+    post.assert_called_once()
+    assert result["status"] == "candidates"
+    assert len(result["candidates"]) == 2
+
+
+def test_single_fuzzy_crm_hit_is_not_a_pending_action():
+    context = _context()
+    fuzzy = {"_id": "c" * 24, "name": "Ana Pérez", "email": "ana@x.com", "phoneNumber": "5533333333"}
+
+    with patch.object(crm_async._client, "post", AsyncMock(return_value=_response({"contacts": [fuzzy], "totalContacts": 1}))):
+        result = asyncio.run(update_contact_by_reference(SELLER, "Anita", email="nuevo@x.com", tool_context=context))
+
+    assert result["status"] == "candidates"
+    assert PENDING_KEY not in context.state
@@ -0,0 +1,131 @@
+"""
+Unit tests for Gemini explicit context caching, against the offline fake model.
+"""
+
+import asyncio
+
+import pytest
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.app_utils.fake_model import FakeGemini
+from app.callbacks import before_model_callback
+from app.context_cache import DYNAMIC_CONTEXT_HEADER, StaticContextCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def list_contacts(seller_email: str, search_term: str = None) -> dict:
+    """Lists contacts."""
+    return {"status": "success", "contacts": []}
+
+
+def _agent(min_cache_tokens=10, clock=None, enabled=True):
+    model = FakeGemini(model="gemini-2.5-flash", reply="Hola", min_cache_tokens=min_cache_tokens)
+    if clock:
+        model.api_client.caches._clock = clock
+    cache = StaticContextCache(
+        client_factory=lambda: model.api_client, ttl_seconds=600, refresh_margin=60,
+        enabled=enabled, clock=clock or FakeClock(),
+    )
+    agent = Agent(
+        name="root_agent",
+        model=model,
+        instruction="",
+        tools=[list_contacts],
+        before_model_callback=[before_model_callback, cache.before_model_callback],
+        after_model_callback=cache.after_model_callback,
+        on_model_error_callback=cache.on_model_error_callback,
+    )
+    return agent, model.api_client, cache
+
+
+async def _turn(agent, seller: str, text: str, session_id: str = "s1") -> str:
+    sessions = InMemorySessionService()
+    await sessions.create_session(app_name="t", user_id=session_id, session_id=session_id, state={"seller_email": seller})
+    runner = Runner(agent=agent, app_name="t", session_service=sessions)
+    reply = ""
+    async for event in runner.run_async(
+        user_id=session_id, session_id=session_id, new_message=types.Content(role="user", parts=[types.Part(text=text)])
+    ):
+        if event.is_final_response() and event.content:
+            reply += "".join(p.text or "" for p in event.content.parts)
+    return reply
+
+
+def test_requests_use_shared_cache_with_dynamic_first_turn():
+    agent, client, cache = _agent()
+
+    async def run():
+        await _turn(agent, "a@x.com", "hola", "s1")
+        await _turn(agent, "b@x.com", "hola", "s2")
+
+    asyncio.run(run())
+
+    first, second = client.models.requests
+    assert first["config"].cached_content == second["config"].cached_content
+    assert first["config"].system_instruction is None and first["config"].tools is None
+    assert first["contents"][0].parts[0].text.startswith(DYNAMIC_CONTEXT_HEADER)
+    assert "b@x.com" in second["contents"][0].parts[0].text
+    stats = cache.stats()
+    assert stats["created"] == 1 and stats["cached_requests"] == 2
+    assert stats["cached_tokens"] > 0
+
+
+def test_falls_back_when_cache_cannot_be_created():
+    agent, client, cache = _agent(min_cache_tokens=10**9)
+
+    reply = asyncio.run(_turn(agent, "a@x.com", "hola"))
+
+    assert reply == "Hola"
+    request = client.models.requests[0]
+    assert request["config"].cached_content is None
+    assert "a@x.com" in request["config"].system_instruction
+    assert cache.stats()["create_errors"] == 1 and cache.stats()["uncached_requests"] == 1
+
+
+def test_handle_is_refreshed_before_expiry():
+    clock = FakeClock()
+    agent, client, cache = _agent(clock=clock)
+    asyncio.run(_turn(agent, "a@x.com", "hola", "s1"))
+    name = cache.stats()["cache_name"]
+
+    clock.now += 570  # dentro del margen de refresco (600 - 60)
+    asyncio.run(_turn(agent, "a@x.com", "hola", "s2"))
+
+    assert cache.stats()["cache_name"] == name
+    assert cache.stats()["refreshed"] == 1
+    assert client.caches.live(name)["expires_at"] == clock.now + 600
+
+
+def test_cached_request_error_is_retried_without_cache():
+    agent, client, cache = _agent()
+    asyncio.run(_turn(agent, "a@x.com", "hola", "s1"))
+
+    # El cache desaparece del lado del servidor
+    client.caches.entries.clear()
+    reply = asyncio.run(_turn(agent, "a@x.com", "hola", "s2"))
+
+    assert reply == "Hola"
+    retried = client.models.requests[-1]["config"]
+    assert retried.cached_content is None
+    assert "a@x.com" in retried.system_instruction
+    assert cache.stats()["fallbacks"] == 1
+
+
+@pytest.mark.parametrize("enabled", [False])
+def test_disabled_leaves_request_untouched(enabled):
+    agent, client, cache = _agent(enabled=enabled)
+
+    asyncio.run(_turn(agent, "a@x.com", "hola"))
+
+    assert client.models.requests[0]["config"].cached_content is None
+    assert cache.stats()["created"] == 0
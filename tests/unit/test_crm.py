@@ -0,0 +1,313 @@
+"""
+Unit tests for the CRM tools and their HTTP client layer.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.tools import crm, crm_async
+from app.tools.crm_client import AsyncCRMClient, CRMClient
+from tests.fakes import json_response
+
+
+class _FakeCRMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({"contacts": [], "totalContacts": 0}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear_contact_state():
+    crm._cache.clear()
+    crm._index.clear()
+    yield
+    crm._cache.clear()
+    crm._index.clear()
+
+
+@pytest.fixture
+def local_crm():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeCRMHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+# =============================================================================
+# CRMClient: pool de conexiones
+# =============================================================================
+
+def test_client_reuses_connection(local_crm):
+    client = CRMClient(local_crm, "token", pool_maxsize=2)
+    for _ in range(5):
+        assert client.post("/contacts", "seller@test.com", json={}).status_code == 200
+
+    stats = client.pool_stats()
+    host = next(iter(stats["hosts"].values()))
+    assert stats["requests_sent"] == 5
+    assert host["requests"] == 5
+    assert host["connections_created"] == 1
+    client.close()
+
+
+def test_client_prebuilds_headers_per_seller():
+    client = CRMClient("http://crm.local", "token")
+    first = client.headers_for("a@test.com")
+    assert first is client.headers_for("a@test.com")
+    assert first == {
+        "Authorization": "token",
+        "Content-Type": "application/json",
+        "x-user-email": "a@test.com",
+    }
+    assert client.headers_for("b@test.com")["x-user-email"] == "b@test.com"
+
+
+def test_async_client_without_token_sends_no_authorization_header():
+    import asyncio
+
+    seen = []
+
+    def handler(request):
+        seen.append(dict(request.headers))
+        return httpx.Response(200, json={})
+
+    client = AsyncCRMClient("http://crm.local", None, transport=httpx.MockTransport(handler))
+    asyncio.run(client.post("/contacts", "seller@test.com", json={}))
+
+    assert "authorization" not in seen[0]
+    assert seen[0]["x-user-email"] == "seller@test.com"
+    assert "Authorization" not in CRMClient("http://crm.local", None).headers_for("seller@test.com")
+
+
+def test_async_client_keeps_one_http_client_per_loop():
+    import asyncio
+
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+
+    async def use():
+        first = client._client()
+        assert client._client() is first
+        await client.post("/contacts", "seller@test.com", json={})
+        return first, client.pool_stats()["open"]
+
+    first, _ = asyncio.run(use())
+    second, open_clients = asyncio.run(use())
+
+    # El cliente del loop anterior (ya cerrado) no se acumula
+    assert second is not first and open_clients == 1
+
+
+# =============================================================================
+# Tools: usan el cliente compartido
+# =============================================================================
+
+@patch("app.tools.crm._client.session.post")
+def test_create_contact_uses_shared_client(mock_post):
+    mock_post.return_value = json_response({"_id": "1"}, 201)
+
+    result = crm.create_contact("seller@test.com", "Ana", "555-123456", "ana@test.com")
+
+    assert result["status"] == "success"
+    url = mock_post.call_args.args[0]
+    assert url == crm.API_BASE_URL + "/contact"
+    assert mock_post.call_args.kwargs["headers"]["x-user-email"] == "seller@test.com"
+
+
+@patch("app.tools.crm._client.session.post")
+@patch("app.tools.crm._client.session.put")
+def test_update_contact_searches_then_puts(mock_put, mock_post):
+    mock_post.return_value = json_response({"contacts": [{"_id": "a" * 24, "name": "Ana"}]})
+    mock_put.return_value = json_response({"_id": "a" * 24})
+
+    result = crm.update_contact("seller@test.com", "Ana", phone_number="555-999999")
+
+    assert result["status"] == "success"
+    assert mock_put.call_args.args[0].endswith("/contact/" + "a" * 24)
+
+
+# =============================================================================
+# Tools async (registradas en root_agent)
+# =============================================================================
+
+def _mock_async_client(handler):
+    return AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_async_update_contact_searches_then_puts():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path, request.headers["x-user-email"]))
+        if request.method == "POST":
+            return httpx.Response(200, json={"contacts": [{"_id": "b" * 24, "name": "Luis"}]})
+        return httpx.Response(200, json={"_id": "b" * 24, "name": "Luis Gómez"})
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        result = await crm_async.update_contact("seller@test.com", "Luis", name="Luis Gómez")
+
+    assert result["status"] == "success"
+    assert calls == [
+        ("POST", "/contacts", "seller@test.com"),
+        ("PUT", "/contact/" + "b" * 24, "seller@test.com"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_tools_validate_before_io():
+    def handler(request):
+        raise AssertionError("no request expected")
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        result = await crm_async.create_contact("seller@test.com", "Ana", "12", "ana@test.com")
+
+    assert result == {"status": "error", "message": "Invalid phone number: 12"}
+
+
+@pytest.mark.asyncio
+async def test_async_list_contacts_shapes_result():
+    def handler(request):
+        return httpx.Response(200, json={"contacts": [{"name": "A"}], "totalContacts": 7})
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        result = await crm_async.list_contacts("seller@test.com", page=2, limit=1)
+
+    assert result == {
+        "status": "success",
+        "contacts": [{"name": "A"}],
+        "total": 7,
+        "page": 2,
+        "limit": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_list_is_cached_until_write():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "POST" and request.url.path == "/contacts":
+            return httpx.Response(200, json={"contacts": [{"name": "A"}], "totalContacts": 1})
+        return httpx.Response(201, json={"_id": "c" * 24})
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        await crm_async.list_contacts("seller@test.com")
+        await crm_async.list_contacts("seller@test.com")
+        assert calls == ["POST"]
+
+        await crm_async.create_contact("seller@test.com", "Ana", "555-123456", "ana@test.com")
+        await crm_async.list_contacts("seller@test.com")
+
+    assert calls == ["POST", "POST", "POST"]
+
+
+@pytest.mark.asyncio
+async def test_async_update_resolves_from_local_index():
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.method == "POST":
+            return httpx.Response(200, json={"contacts": [
+                {"_id": "d" * 24, "name": "María García", "email": "maria@test.com"},
+                {"_id": "e" * 24, "name": "Mario Gil", "email": "mario@test.com"},
+            ]})
+        return httpx.Response(200, json={"_id": "e" * 24})
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        await crm_async.list_contacts("seller@test.com")
+        result = await crm_async.update_contact("seller@test.com", "mario@test.com", phone_number="555-000000")
+        # Un nombre no se resuelve solo con el índice parcial: se busca en el CRM
+        by_name = await crm_async.update_contact("seller@test.com", "mario gil", phone_number="555-000001")
+
+    assert result["status"] == "success" and by_name["status"] == "success"
+    assert calls == [
+        ("POST", "/contacts"), ("PUT", "/contact/" + "e" * 24), ("POST", "/contacts"), ("PUT", "/contact/" + "e" * 24),
+    ]
+
+
+@patch("app.tools.crm._client.session.post")
+def test_search_picks_best_ranked_match(mock_post):
+    mock_post.return_value = json_response({"contacts": [
+        {"_id": "1", "name": "Pedro Pérez López"},
+        {"_id": "2", "name": "Pedro López"},
+    ]})
+
+    match, _ = crm._search_contact_internal("seller@test.com", "Pedro López")
+    assert match["_id"] == "2"
+
+
+@patch("app.tools.crm._client.session.post")
+@patch("app.tools.crm._client.session.put")
+def test_update_with_ambiguous_name_returns_candidates(mock_put, mock_post):
+    mock_post.return_value = json_response({"contacts": [
+        {"_id": "1" * 24, "name": "Pedro López", "email": "p1@test.com"},
+        {"_id": "2" * 24, "name": "Pedro Ruiz", "email": "p2@test.com"},
+    ]})
+
+    result = crm.update_contact("seller@test.com", "Pedro", phone_number="555-999999")
+
+    mock_put.assert_not_called()
+    assert result["status"] == "ambiguous"
+    assert [c["email"] for c in result["candidates"]] == ["p1@test.com", "p2@test.com"]
+
+
+@pytest.mark.asyncio
+async def test_async_failed_put_returns_error_and_keeps_index():
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(200, json={"contacts": [{"_id": "9" * 24, "name": "Eva Díaz", "email": "eva@test.com"}]})
+        return httpx.Response(422, json={"message": "phoneNumber invalid"})
+
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        await crm_async.list_contacts("seller@test.com")
+        result = await crm_async.update_contact("seller@test.com", "eva@test.com", name="Eva Cambiada")
+
+    assert result["status"] == "error" and "phoneNumber invalid" in result["message"]
+    # El índice conserva lo que el CRM tiene guardado
+    assert crm._index.resolve("seller@test.com", "eva díaz") == "9" * 24
+
+
+@pytest.mark.asyncio
+async def test_async_update_uses_session_listing_without_search():
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.method == "POST":
+            return httpx.Response(200, json={"contacts": [
+                {"_id": "f" * 24, "name": "Ana Ruiz"},
+                {"_id": "0" * 24, "name": "Luis Soto"},
+            ]})
+        return httpx.Response(200, json={"_id": "0" * 24})
+
+    tool_context = SimpleNamespace(state={})
+    with patch.object(crm_async, "_client", _mock_async_client(handler)):
+        await crm_async.list_contacts("seller@test.com", tool_context=tool_context)
+        crm._index.clear()  # solo queda la sesión para resolver
+        result = await crm_async.update_contact(
+            "seller@test.com", "el segundo", name="Luis Soto B", tool_context=tool_context
+        )
+
+    assert result["status"] == "success"
+    assert calls == [("POST", "/contacts"), ("PUT", "/contact/" + "0" * 24)]
@@ -0,0 +1,90 @@
+"""
+Unit tests for the per-request deadline budget.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from google.adk.models import LlmRequest
+
+import webhook
+from app.callbacks import deadline_before_model_callback
+from app.config import STILL_WORKING_MESSAGE
+from app.deadline import Deadline, DeadlineExceeded, deadline_scope, remaining, timeout_for
+from app.tools.crm_client import AsyncCRMClient
+
+
+def test_timeout_for_without_deadline_keeps_cap():
+    assert remaining() is None
+    assert timeout_for(10) == 10
+
+
+def test_timeout_for_clamps_to_remaining_budget():
+    with deadline_scope(2):
+        assert timeout_for(10) <= 2
+        assert timeout_for(1) == 1
+        with pytest.raises(DeadlineExceeded):
+            timeout_for(10, reserve=5)
+    assert remaining() is None
+
+
+def test_deadline_extend():
+    now = [0.0]
+    deadline = Deadline(5, clock=lambda: now[0])
+    now[0] = 6
+    assert deadline.expired()
+    deadline.extend(10)
+    assert deadline.remaining() == 10
+
+
+@pytest.mark.asyncio
+async def test_crm_client_uses_remaining_budget():
+    seen = {}
+
+    def handler(request):
+        seen["timeout"] = request.extensions["timeout"]["read"]
+        return httpx.Response(200, json={})
+
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+    with deadline_scope(1.5):
+        await client.post("/contacts", "s@test.com", json={})
+    assert seen["timeout"] <= 1.5
+
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            await client.post("/contacts", "s@test.com", json={})
+
+
+def test_llm_callback_sets_timeout_or_short_circuits():
+    request = LlmRequest()
+    with deadline_scope(10):
+        assert deadline_before_model_callback(SimpleNamespace(state={}), request) is None
+    assert 0 < request.config.http_options.timeout <= 10_000
+
+    with deadline_scope(0.5):
+        response = deadline_before_model_callback(SimpleNamespace(state={}), LlmRequest())
+    assert response.content.parts[0].text == STILL_WORKING_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_webhook_replies_still_working_and_finishes_in_background():
+    release = asyncio.Event()
+
+    async def slow_agent(user_id, message):
+        await release.wait()
+        return "Listo ✅"
+
+    send = AsyncMock()
+    with patch.object(webhook, "run_agent", slow_agent), patch.object(webhook, "send_whatsapp_response", send), \
+            patch.object(webhook, "WHATSAPP_SEND_RESERVE_SECONDS", 0):
+        with deadline_scope(0.05) as deadline:
+            response, finished = await webhook.run_agent_with_deadline("+56", "hola", "token", deadline)
+
+        assert (response, finished) == (STILL_WORKING_MESSAGE, False)
+        release.set()
+        await asyncio.gather(*webhook._background_tasks)
+
+    send.assert_awaited_once_with("+56", "Listo ✅", "token")
@@ -0,0 +1,132 @@
+"""
+Unit tests for the local fake PyroTech CRM.
+"""
+
+import asyncio
+import json
+import random
+from unittest.mock import patch
+
+import pytest
+
+from app.app_utils.fake_crm import FAKE_BASE_URL, FakeCRM, LatencyModel, seller_email
+from app.tools import crm, crm_async
+from app.tools.circuit_breaker import CircuitBreakerRegistry
+from app.tools.crm_client import AsyncCRMClient, CRMClient
+
+
+@pytest.fixture(autouse=True)
+def clear_contact_state():
+    crm._cache.clear()
+    crm._index.clear()
+    yield
+    crm._cache.clear()
+    crm._index.clear()
+
+
+def _call(fake, method, path, body, headers=None):
+    status, payload, _ = fake.handle(method, FAKE_BASE_URL + path, headers or {}, json.dumps(body).encode())
+    return status, payload
+
+
+def test_seeded_dataset_is_deterministic_and_spread_over_sellers():
+    first = FakeCRM.seeded(contacts=200, sellers=4, seed=7)
+    second = FakeCRM.seeded(contacts=200, sellers=4, seed=7)
+
+    assert first.stats()["sellers"] == 4
+    assert len(first.contacts_of(seller_email(0))) == 50
+    assert first.contacts_of(seller_email(1)) == second.contacts_of(seller_email(1))
+
+
+def test_list_paginates_and_reports_total():
+    fake = FakeCRM.seeded(contacts=30, sellers=1)
+
+    status, page2 = _call(fake, "POST", "/contacts?page=2&limit=20", {"userEmail": seller_email(0)})
+
+    assert status == 200
+    assert page2["totalContacts"] == 30
+    assert len(page2["contacts"]) == 10
+
+
+def test_search_ignores_accents_and_matches_phone_digits():
+    fake = FakeCRM()
+    ana = fake.add_contact("v@x.com", {"name": "Ana Pérez", "email": "ana@x.com", "phoneNumber": "+52 55 1234 5678"})
+    fake.add_contact("v@x.com", {"name": "Luis Díaz", "email": "luis@x.com", "phoneNumber": "+52 55 9999 0000"})
+
+    _, by_name = _call(fake, "POST", "/contacts", {"userEmail": "v@x.com", "searchTerm": "perez"})
+    _, by_phone = _call(fake, "POST", "/contacts", {"userEmail": "v@x.com", "searchTerm": "1234-5678"})
+
+    assert [c["_id"] for c in by_name["contacts"]] == [ana["_id"]]
+    assert [c["_id"] for c in by_phone["contacts"]] == [ana["_id"]]
+
+
+def test_create_honors_idempotency_key_and_rejects_duplicates():
+    fake = FakeCRM()
+    body = {"userEmail": "v@x.com", "name": "Ana", "phoneNumber": "5512345678", "email": "ana@x.com"}
+
+    first = _call(fake, "POST", "/contact", body, {"Idempotency-Key": "k1"})
+    replay = _call(fake, "POST", "/contact", body, {"Idempotency-Key": "k1"})
+    duplicate = _call(fake, "POST", "/contact", body)
+
+    assert first[0] == 201 and replay == first
+    assert duplicate[0] == 409
+    assert len(fake.contacts_of("v@x.com")) == 1
+
+
+def test_update_is_scoped_to_seller():
+    fake = FakeCRM()
+    contact = fake.add_contact("v@x.com", {"name": "Ana", "email": "ana@x.com", "phoneNumber": "5512345678"})
+
+    status, updated = _call(fake, "PUT", f"/contact/{contact['_id']}", {"userEmail": "v@x.com", "name": "Ana María"})
+    other_status, _ = _call(fake, "PUT", f"/contact/{contact['_id']}", {"userEmail": "otro@x.com", "name": "X"})
+
+    assert status == 200 and updated["name"] == "Ana María"
+    assert other_status == 404
+
+
+def test_error_injection_and_throttling():
+    failing = FakeCRM(error_rate=1.0, error_status=502)
+    assert _call(failing, "POST", "/contacts", {"userEmail": "v@x.com"})[0] == 502
+
+    throttled = FakeCRM(throttle_rps=2, clock=lambda: 100.0)
+    statuses = [_call(throttled, "POST", "/contacts", {"userEmail": "v@x.com"})[0] for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert throttled.stats()["throttled"] == 1
+
+
+def test_latency_model_matches_median():
+    model = LatencyModel(median_ms=50, p99_ms=500)
+    rng = random.Random(1)
+    samples = sorted(model.sample(rng) for _ in range(2001))
+
+    assert 0.04 < samples[1000] < 0.06
+    assert samples[-1] > 0.1
+
+
+def test_sync_tools_against_http_server():
+    fake = FakeCRM.seeded(contacts=100, sellers=2)
+    with fake.serve() as base_url:
+        client = CRMClient(base_url, "token", breakers=CircuitBreakerRegistry())
+        with patch.object(crm, "_client", client):
+            listed = crm.list_contacts(seller_email(1), page=1, limit=5)
+            created = crm.create_contact(seller_email(1), "Nuevo Cliente", "5511112222", "nuevo@x.com")
+        client.close()
+
+    assert listed["total"] == 50 and len(listed["contacts"]) == 5
+    assert created["status"] == "success"
+    assert fake.stats()["requests"] == {"POST /contacts": 1, "POST /contact": 1}
+
+
+def test_async_tools_in_process():
+    fake = FakeCRM.seeded(contacts=100, sellers=2)
+    target = fake.contacts_of(seller_email(0))[3]
+    client = AsyncCRMClient(FAKE_BASE_URL, "token", transport=fake.async_transport(), breakers=CircuitBreakerRegistry())
+
+    async def run():
+        with patch.object(crm_async, "_client", client):
+            return await crm_async.update_contact(seller_email(0), target["email"], name="Cambiado")
+
+    result = asyncio.run(run())
+
+    assert result["status"] == "success"
+    assert result["contact"]["name"] == "Cambiado"
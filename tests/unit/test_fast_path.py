@@ -0,0 +1,75 @@
+"""
+Unit tests for the deterministic fast path (greeting/name/thanks without the LLM).
+"""
+
+import asyncio
+
+import pytest
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+import webhook
+from app.app_utils.fake_model import FakeGemini
+from app.fast_path import GREETING, NAME, THANKS, FastPathRouter
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Hola", GREETING),
+    ("holaaa!! 👋", GREETING),
+    ("Buenos días, Denisse", GREETING),
+    ("¿Cómo te llamas?", NAME),
+    ("hola, ¿cuál es tu nombre?", NAME),
+    ("Muchas gracias!", THANKS),
+    ("ok", None),
+    ("sí", None),
+    ("no, gracias", None),
+    ("hola, agrega a Ana Pérez 5512345678", None),
+    ("lista mis contactos", None),
+])
+def test_classify(message, intent):
+    assert FastPathRouter(agent_name="Denisse").classify(message) == intent
+
+
+def test_reply_uses_agent_name_and_company():
+    router = FastPathRouter(agent_name="Denisse", company="Inmobiliaria ABC")
+
+    assert "Denisse" in router.reply(NAME) and "Inmobiliaria ABC" in router.reply(NAME)
+
+
+def test_turn_is_appended_and_seen_by_the_agent_next_turn():
+    router = FastPathRouter(agent_name="Denisse", company="ACME")
+    sessions = InMemorySessionService()
+    model = FakeGemini(model="gemini-2.5-flash", reply="Listo")
+    agent = Agent(name="root_agent", model=model, instruction="")
+
+    async def run():
+        await sessions.create_session(app_name="t", user_id="u", session_id="u")
+        reply = await router.handle(sessions, "t", "u", "u", "hola", agent.name)
+        runner = Runner(agent=agent, app_name="t", session_service=sessions)
+        async for _ in runner.run_async(
+            user_id="u", session_id="u", new_message=types.Content(role="user", parts=[types.Part(text="lista mis contactos")])
+        ):
+            pass
+        return reply
+
+    reply = asyncio.run(run())
+
+    assert reply == router.reply(GREETING)
+    contents = model.api_client.models.requests[0]["contents"]
+    assert [c.parts[0].text for c in contents] == ["hola", reply, "lista mis contactos"]
+    assert router.stats()["fast_path"] == 1 and router.stats()["by_intent"][GREETING] == 1
+
+
+def test_run_agent_answers_greeting_without_runner(monkeypatch):
+    router = FastPathRouter()
+    monkeypatch.setattr(webhook, "fast_path", router)
+    monkeypatch.setattr(webhook, "Runner", None)  # cualquier uso del runner fallaría
+
+    async def run():
+        await webhook.get_or_create_session("+56900000001", "v@x.com")
+        return await webhook.run_agent("+56900000001", "gracias!")
+
+    assert asyncio.run(run()) == router.reply(THANKS)
+    assert router.stats()["fast_path_rate"] == 1.0
@@ -0,0 +1,136 @@
+"""
+Unit tests for the per-turn flight recorder and its offline analyzer.
+"""
+
+import asyncio
+import json
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.app_utils.fake_model import FakeGemini
+from app.app_utils.flight_report import percentile, stage_samples, summarize
+from app.flight_recorder import FlightRecorder, current_turn, stage
+
+
+def list_contacts(seller_email: str) -> dict:
+    """Lists contacts."""
+    return {"status": "success", "contacts": [{"name": "Ana"}]}
+
+
+def _read(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+def test_records_model_and_tool_calls(tmp_path):
+    path = tmp_path / "flight.jsonl"
+    recorder = FlightRecorder(path=str(path), enabled=True)
+
+    def reply(contents, config):
+        if any(p.function_response for c in contents for p in c.parts or []):
+            return "Tienes 1 contacto"
+        return types.FunctionCall(name="list_contacts", args={"seller_email": "v@x.com"})
+
+    agent = Agent(
+        name="root_agent", model=FakeGemini(model="gemini-2.5-flash", reply=reply), instruction="", tools=[list_contacts],
+        before_model_callback=recorder.before_model_callback,
+        after_model_callback=recorder.after_model_callback,
+        before_tool_callback=recorder.before_tool_callback,
+        after_tool_callback=recorder.after_tool_callback,
+    )
+    sessions = InMemorySessionService()
+
+    async def run():
+        await sessions.create_session(app_name="t", user_id="u", session_id="u")
+        runner = Runner(agent=agent, app_name="t", session_service=sessions)
+        with recorder.turn("v@x.com", "+56") as turn:
+            async for _ in runner.run_async(
+                user_id="u", session_id="u", new_message=types.Content(role="user", parts=[types.Part(text="lista")])
+            ):
+                pass
+            with stage("whatsapp_send"):
+                pass
+        return turn
+
+    asyncio.run(run())
+    recorder.close()
+
+    [record] = _read(path)
+    assert (record["seller_email"], record["session_id"], record["path"]) == ("v@x.com", "+56", "agent")
+    assert record["llm_rounds"] == 2 and [c["model"] for c in record["model_calls"]] == ["gemini-2.5-flash"] * 2
+    assert record["prompt_tokens"] > 0 and record["output_tokens"] > 0
+    [tool] = record["tool_calls"]
+    assert tool["name"] == "list_contacts" and tool["status"] == "success" and tool["payload_bytes"] > 0
+    assert "whatsapp_send" in record["stages"] and record["wall_ms"] >= 0
+    assert current_turn() is None
+
+
+def test_deferred_turn_is_written_on_finish(tmp_path):
+    path = tmp_path / "flight.jsonl"
+    recorder = FlightRecorder(path=str(path), enabled=True)
+
+    with recorder.turn("v@x.com", "+56") as turn:
+        recorder.defer(turn)
+    assert recorder.stats()["recorded"] == 0
+
+    recorder.finish(turn)
+    recorder.finish(turn)
+    recorder.close()
+    [record] = _read(path)
+    assert record["finished"] is False and recorder.stats()["recorded"] == 1
+
+
+def test_disabled_recorder_writes_nothing(tmp_path):
+    recorder = FlightRecorder(path=str(tmp_path / "flight.jsonl"), enabled=False)
+    with recorder.turn("v@x.com", "+56") as turn:
+        assert turn is None and current_turn() is None
+    assert not (tmp_path / "flight.jsonl").exists()
+
+
+def test_files_rotate(tmp_path):
+    path = tmp_path / "flight.jsonl"
+    recorder = FlightRecorder(path=str(path), enabled=True, max_bytes=600, backups=2)
+    for _ in range(10):
+        with recorder.turn("v@x.com", "+56"):
+            pass
+    recorder.close()
+    assert (tmp_path / "flight.jsonl.1").exists() and not (tmp_path / "flight.jsonl.3").exists()
+
+
+def test_report_percentiles_per_stage():
+    records = [
+        {
+            "wall_ms": ms, "llm_rounds": 1, "prompt_tokens": 100, "stages": {"whatsapp_send": 50},
+            "model_calls": [{"model": "m", "latency_ms": ms / 2}],
+            "tool_calls": [{"name": "list_contacts", "latency_ms": 10}],
+        }
+        for ms in range(1, 101)
+    ]
+    rows = {r["stage"]: r for r in summarize(stage_samples(records))}
+
+    assert (rows["total"]["p50"], rows["total"]["p95"], rows["total"]["p99"]) == (50, 95, 99)
+    assert rows["llm call: m"]["p99"] == 49.5
+    assert rows["tool: list_contacts"]["n"] == 100 and rows["whatsapp_send"]["max"] == 50
+    assert rows["llm_rounds"]["p50"] == 1
+    assert percentile([3, 1, 2], 100) == 3
+
+
+def test_webhook_tags_fast_path_turns(tmp_path, monkeypatch):
+    import webhook
+    from app.fast_path import FastPathRouter
+
+    path = tmp_path / "flight.jsonl"
+    recorder = FlightRecorder(path=str(path), enabled=True)
+    monkeypatch.setattr(webhook, "fast_path", FastPathRouter())
+
+    async def run():
+        await webhook.get_or_create_session("+56900000002", "v@x.com")
+        with recorder.turn("v@x.com", "+56900000002"):
+            await webhook.run_agent("+56900000002", "hola")
+
+    asyncio.run(run())
+    recorder.close()
+    [record] = _read(path)
+    assert record["path"] == "fast_path" and record["llm_rounds"] == 0
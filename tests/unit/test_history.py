@@ -0,0 +1,104 @@
+"""
+Unit tests for the conversation history compaction before each LLM call.
+"""
+
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app.history import SUMMARY_HEADER, HistoryCompactor, estimate_tokens, split_turns
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _listing_turn(n, contacts=30):
+    """User asks, model calls list_contacts, tool answers, model replies."""
+    response = {"status": "success", "contacts": [{"_id": f"{i:024d}", "name": f"Contacto {i}"} for i in range(contacts)]}
+    return [
+        _user(f"lista mis contactos {n}"),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=f"call-{n}", name="list_contacts", args={"seller_email": "v@x.com"}
+        ))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"call-{n}", name="list_contacts", response=response
+        ))]),
+        _model(f"Tienes {contacts} contactos ({n})."),
+    ]
+
+
+def _history(turns):
+    return [content for n in range(turns) for content in _listing_turn(n)]
+
+
+def _compact(compactor, contents):
+    request = LlmRequest(contents=list(contents))
+    compactor.before_model_callback(SimpleNamespace(state={}), request)
+    return request.contents
+
+
+def test_turns_start_at_user_messages_not_tool_responses():
+    turns = split_turns(_history(3))
+
+    assert len(turns) == 3 and all(len(turn) == 4 for turn in turns)
+
+
+def test_short_history_is_sent_unchanged():
+    contents = _history(2)
+
+    assert _compact(HistoryCompactor(keep_turns=4), contents) == contents
+
+
+def test_old_turns_become_a_summary_and_recent_ones_stay_verbatim():
+    contents = _history(8)
+
+    compacted = _compact(HistoryCompactor(keep_turns=3, tool_keep_turns=3, token_budget=10**6), contents)
+
+    summary = compacted[0].parts[0].text
+    assert summary.startswith(SUMMARY_HEADER)
+    assert "- User: lista mis contactos 0" in summary
+    assert "→ list_contacts: success, contacts=30" in summary
+    assert compacted[1:] == contents[-12:]
+
+
+def test_stale_tool_payloads_are_stubbed_but_keep_call_ids():
+    contents = _history(3)
+
+    compacted = _compact(HistoryCompactor(keep_turns=3, tool_keep_turns=1, token_budget=10**6), contents)
+
+    responses = [p.function_response for c in compacted for p in c.parts if p.function_response]
+    assert [r.id for r in responses] == ["call-0", "call-1", "call-2"]
+    assert responses[0].response == {"status": "success", "contacts_count": 30, "omitted": "stale tool result"}
+    assert len(responses[2].response["contacts"]) == 30
+    # La sesión no se modifica
+    assert len(contents[2].parts[0].function_response.response["contacts"]) == 30
+
+
+def test_token_budget_drops_turns_down_to_the_current_one():
+    contents = _history(6)
+    compactor = HistoryCompactor(keep_turns=6, tool_keep_turns=6, token_budget=900)
+
+    compacted = _compact(compactor, contents)
+
+    assert estimate_tokens(compacted) <= 900
+    assert compacted[0].parts[0].text.startswith(SUMMARY_HEADER)
+    assert compacted[-4:] == contents[-4:]
+    assert len(compacted) < len(contents)
+    stats = compactor.stats()
+    assert stats["compacted"] == 1 and stats["tokens_after"] < stats["tokens_before"]
+
+
+def test_summary_is_bounded_keeping_the_newest_lines():
+    compactor = HistoryCompactor(keep_turns=1, summary_max_chars=300, token_budget=10**6)
+
+    summary = _compact(compactor, _history(20))[0].parts[0].text
+
+    assert len(summary) <= len(SUMMARY_HEADER) + 310
+    assert "Tienes 30 contactos (18)" in summary
+    assert "lista mis contactos 0" not in summary
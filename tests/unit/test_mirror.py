@@ -0,0 +1,161 @@
+"""
+Unit tests for the incremental contact mirror.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from app.tools import crm, rate_limit
+from app.tools.mirror import DELTA_FILTER, ContactMirror
+from tests.fakes import json_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _contact(n: int, stamp: str, name: str | None = None) -> dict:
+    return {"_id": f"{n:024x}", "name": name or f"Cliente {n}", "email": f"c{n}@x.com",
+            "phoneNumber": f"55{n:08d}", "updatedAt": stamp}
+
+
+class FakeBook:
+    """Contacts of one seller in CRM order, honoring the delta filter unless told otherwise."""
+
+    def __init__(self, contacts, honours_filter: bool = True):
+        self.contacts = contacts
+        self.honours_filter = honours_filter
+        self.calls = []
+        self.lanes = []
+
+    def __call__(self, seller_email, filters):
+        self.calls.append(filters)
+        self.lanes.append(rate_limit._lane.get())
+        since = (filters or {}).get(DELTA_FILTER) if self.honours_filter else None
+        return iter([c for c in self.contacts if since is None or c["updatedAt"] >= since])
+
+
+def _mirror(book, clock, **kwargs):
+    return ContactMirror(book, clock=clock, max_age=60, full_sync_seconds=1000, **kwargs)
+
+
+def test_first_sync_is_full_then_delta_from_watermark():
+    clock = FakeClock()
+    book = FakeBook([_contact(i, f"2025-01-0{i}T00:00:00Z") for i in range(1, 6)])
+    mirror = _mirror(book, clock)
+
+    assert mirror.sync("v@x.com") == "full"
+    book.contacts.append(_contact(9, "2025-02-01T00:00:00Z", name="Nuevo"))
+    assert mirror.sync("v@x.com") == "delta"
+
+    assert book.calls == [None, {DELTA_FILTER: "2025-01-05T00:00:00Z"}]
+    assert book.lanes == [rate_limit.SYNC, rate_limit.SYNC]
+    data, _ = mirror.list("v@x.com", "nuevo", 1, 5)
+    assert [c["name"] for c in data["contacts"]] == ["Nuevo"]
+    assert mirror.stats()["contacts"] == 6
+
+
+def test_full_reconciliation_drops_deleted_contacts():
+    clock = FakeClock()
+    book = FakeBook([_contact(i, f"2025-01-0{i}T00:00:00Z") for i in range(1, 4)])
+    mirror = _mirror(book, clock)
+    mirror.sync("v@x.com")
+
+    book.contacts.pop(0)
+    clock.now = 1000
+    assert mirror.sync("v@x.com") == "full"
+    assert mirror.list("v@x.com", None, 1, 10)[0]["totalContacts"] == 2
+
+
+def test_contacts_without_timestamps_full_sync_only_at_reconciliation():
+    clock = FakeClock()
+    book = FakeBook([{"_id": "a" * 24, "name": "Ana", "updatedAt": ""}])
+    mirror = _mirror(book, clock)
+    mirror.sync("v@x.com")
+
+    clock.now = 30
+    assert mirror.sync("v@x.com") == "skipped"
+    clock.now = 1000
+    assert mirror.sync("v@x.com") == "full"
+    assert len(book.calls) == 2
+
+
+def test_ignored_delta_filter_falls_back_to_full_syncs():
+    clock = FakeClock()
+    book = FakeBook([_contact(i, f"2025-01-0{i}T00:00:00Z") for i in range(1, 4)], honours_filter=False)
+    mirror = _mirror(book, clock)
+    mirror.sync("v@x.com")
+    book.contacts.append(_contact(9, "2025-02-01T00:00:00Z"))
+
+    clock.now = 30
+    assert mirror.sync("v@x.com") == "delta"
+    clock.now = 61
+    assert mirror.sync("v@x.com") == "skipped"
+    # El delta que trajo contactos viejos no cuenta como copia fresca
+    assert mirror.list("v@x.com", None, 1, 10) is None
+    assert mirror.stats()["full_sync_only"] == 1
+
+    clock.now = 1000
+    assert mirror.sync("v@x.com") == "full"
+    assert mirror.list("v@x.com", None, 1, 10)[0]["totalContacts"] == 4
+    assert mirror.sync("v@x.com") == "skipped"
+
+
+def test_stale_copy_is_not_served():
+    clock = FakeClock()
+    mirror = _mirror(FakeBook([_contact(1, "2025-01-01T00:00:00Z")]), clock)
+    mirror.sync("v@x.com")
+
+    clock.now = 30
+    assert mirror.list("v@x.com", None, 1, 5)[1] == 30
+    clock.now = 61
+    assert mirror.list("v@x.com", None, 1, 5) is None
+    assert mirror.stats()["stale"] == 1
+
+
+def test_observe_tracks_only_large_books():
+    mirror = _mirror(FakeBook([]), FakeClock(), min_contacts=100)
+    mirror._ensure_started = MagicMock()
+
+    mirror.observe("small@x.com", 10)
+    mirror.observe("big@x.com", 500)
+
+    assert mirror.stats()["tracked"] == 1
+
+
+def test_list_contacts_served_from_mirror_with_age():
+    clock = FakeClock()
+    mirror = _mirror(FakeBook([_contact(1, "2025-01-01T00:00:00Z", name="Ana Pérez")]), clock)
+    mirror.sync("v@x.com")
+    clock.now = 12
+
+    with patch.object(crm, "_mirror", mirror), patch.object(crm._client, "post") as mock_post:
+        result = crm.list_contacts("v@x.com", search_term="perez")
+        crm._record_updated("v@x.com", f"{1:024x}", {"userEmail": "v@x.com", "name": "Ana P. Gómez"})
+        updated = crm.list_contacts("v@x.com", search_term="gomez")
+
+    mock_post.assert_not_called()
+    assert result["consistency_age_seconds"] == 12
+    assert result["contacts"][0]["name"] == "Ana Pérez"
+    assert updated["total"] == 1
+    crm._index.clear()
+
+
+@patch("app.tools.crm._client.session.put")
+def test_failed_update_leaves_the_mirror_untouched(mock_put):
+    clock = FakeClock()
+    mirror = _mirror(FakeBook([_contact(1, "2025-01-01T00:00:00Z", name="Ana Pérez")]), clock)
+    mirror.sync("v@x.com")
+    mock_put.return_value = json_response({"error": "invalid"}, 422)
+
+    with patch.object(crm, "_mirror", mirror):
+        result = crm.update_contact("v@x.com", f"{1:024x}", name="Ana P. Gómez")
+
+    assert result["status"] == "error"
+    data, age = mirror.list("v@x.com", None, 1, 5)
+    assert data["contacts"][0]["name"] == "Ana Pérez"
+    assert age == 0
+    crm._index.clear()
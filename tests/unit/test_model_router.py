@@ -0,0 +1,172 @@
+"""
+Unit tests for per-request model tiering and escalation.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.agents import Agent
+from google.adk.models import LlmRequest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.app_utils.fake_model import FakeGemini
+from app.flight_recorder import FlightRecorder
+from app.history import HistoryCompactor
+from app.model_router import ESCALATION_KEY, LIGHT, MODEL_INFLIGHT_MAX_AGE_SECONDS, STRONG, ModelRouter, choose_tier
+from app.tools.pending_actions import STATE_KEY as PENDING_KEY
+
+STRONG_MODEL, LIGHT_MODEL = "gemini-2.5-flash", "gemini-2.5-flash-lite"
+
+
+def _request(*contents):
+    return LlmRequest(contents=list(contents))
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _tool_result(name):
+    return types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(name=name, response={}))])
+
+
+def test_rules():
+    assert choose_tier(_request(_user("lista mis contactos")), {}) == (LIGHT, "simple_turn")
+    assert choose_tier(_request(_user("agrega a Ana")), {}) == (STRONG, "write_intent")
+    assert choose_tier(_request(_user("es ana@x.com")), {}) == (STRONG, "write_intent")
+    assert choose_tier(_request(_tool_result("list_contacts")), {}) == (LIGHT, "read_result")
+    assert choose_tier(_request(_tool_result("create_contact")), {}) == (STRONG, "write_result")
+    assert choose_tier(_request(*[_user("hola")] * 13), {}, max_turns=12) == (STRONG, "long_history")
+    assert choose_tier(_request(_user("hola " * 400)), {}, max_tokens=100) == (STRONG, "long_history")
+    assert choose_tier(_request(_user("hola")), {PENDING_KEY: {"action": "create"}})[0] == STRONG
+    assert choose_tier(_request(_user("hola")), {ESCALATION_KEY: 2}) == (STRONG, "escalated")
+
+
+def test_long_session_with_a_short_compacted_request_stays_light():
+    contents = []
+    for _ in range(50):
+        contents += [_user("hola"), types.Content(role="model", parts=[types.Part(text="Aquí tienes tus contactos. " * 20)])]
+    contents.append(_user("hola"))
+    request = _request(*contents)
+    assert choose_tier(request, {}) == (STRONG, "long_history")
+
+    HistoryCompactor(enabled=True).before_model_callback(None, request)
+
+    assert choose_tier(request, {}) == (LIGHT, "simple_turn")
+
+
+def list_contacts(seller_email: str) -> dict:
+    """Lists contacts."""
+    return {"status": "success", "contacts": []}
+
+
+def _run(reply_for, *messages):
+    """Runs the messages; reply_for(model_name) gives the fake reply for each request."""
+    model = FakeGemini(model=STRONG_MODEL, reply=lambda contents, config: reply_for(model.api_client.models.requests[-1]["model"]))
+    router = ModelRouter(client_factory=lambda: model.api_client, strong_model=STRONG_MODEL, light_model=LIGHT_MODEL, enabled=True)
+    agent = Agent(
+        name="root_agent", model=model, instruction="", tools=[list_contacts],
+        before_model_callback=router.before_model_callback,
+        after_model_callback=router.after_model_callback,
+        on_model_error_callback=router.on_model_error_callback,
+    )
+    sessions = InMemorySessionService()
+
+    async def run():
+        await sessions.create_session(app_name="t", user_id="u", session_id="u", state={"seller_email": "v@x.com"})
+        runner = Runner(agent=agent, app_name="t", session_service=sessions)
+        texts = []
+        for message in messages:
+            async for event in runner.run_async(
+                user_id="u", session_id="u", new_message=types.Content(role="user", parts=[types.Part(text=message)])
+            ):
+                if event.is_final_response() and event.content:
+                    texts.append("".join(p.text or "" for p in event.content.parts))
+        session = await sessions.get_session(app_name="t", user_id="u", session_id="u")
+        return texts, session
+
+    texts, session = asyncio.run(run())
+    return texts, model.api_client.models.requests, router, session
+
+
+def test_simple_turn_goes_light_and_write_goes_strong():
+    _, requests, router, _ = _run(lambda model: "Listo", "lista mis contactos", "crea a Ana Pérez")
+
+    assert [r["model"] for r in requests] == [LIGHT_MODEL, STRONG_MODEL]
+    tiers = router.stats()["tiers"]
+    assert tiers[LIGHT]["requests"] == 1 and tiers[STRONG]["requests"] == 1
+    assert tiers[LIGHT]["prompt_tokens"] > 0
+
+
+def test_malformed_light_call_is_escalated_and_sticks():
+    def reply_for(model):
+        if model == LIGHT_MODEL:
+            return types.FunctionCall(name="no_such_tool", args={})
+        return "Hola desde el fuerte"
+
+    texts, requests, router, session = _run(reply_for, "hola", "lista mis contactos")
+
+    assert texts[0] == "Hola desde el fuerte"
+    # El segundo turno sigue en el modelo fuerte (escalamiento pegajoso)
+    assert [r["model"] for r in requests] == [LIGHT_MODEL, STRONG_MODEL, STRONG_MODEL]
+    assert router.stats()["escalations"] == 1
+    assert router.stats()["reasons"]["escalated"] == 1
+    assert session.state[ESCALATION_KEY] == router.sticky_requests - 1
+
+
+def test_light_model_error_is_retried_on_strong():
+    def reply_for(model):
+        if model == LIGHT_MODEL:
+            raise RuntimeError("light model unavailable")
+        return "OK fuerte"
+
+    texts, requests, router, _ = _run(reply_for, "hola")
+
+    assert texts[-1] == "OK fuerte"
+    assert [r["model"] for r in requests] == [LIGHT_MODEL, STRONG_MODEL]
+    stats = router.stats()
+    assert stats["tiers"][LIGHT]["errors"] == 1 and stats["escalations"] == 1
+
+
+def test_escalation_is_its_own_flight_recorder_call(tmp_path):
+    model = FakeGemini(model=STRONG_MODEL, reply=lambda contents, config: "OK fuerte")
+    router = ModelRouter(client_factory=lambda: model.api_client, strong_model=STRONG_MODEL, light_model=LIGHT_MODEL, enabled=True)
+    recorder = FlightRecorder(path=str(tmp_path / "flight.jsonl"), enabled=True)
+    context = SimpleNamespace(state={}, invocation_id="i1", session=None)
+    request = _request(_user("hola"))
+    error = RuntimeError("light model unavailable")
+
+    async def run():
+        with recorder.turn("v@x.com", "u") as turn:
+            router.before_model_callback(context, request)
+            recorder.before_model_callback(context, request)
+            recorder.on_model_error_callback(context, request, error)
+            await router.on_model_error_callback(context, request, error)
+        return turn
+
+    turn = asyncio.run(run())
+    recorder.close()
+
+    assert [(c["model"], c["status"]) for c in turn.model_calls] == [(LIGHT_MODEL, "RuntimeError"), (STRONG_MODEL, "ok")]
+    assert router._inflight == {}
+
+
+def test_requests_that_never_finish_do_not_stay_inflight():
+    clock = SimpleNamespace(now=0.0)
+    router = ModelRouter(client_factory=None, strong_model=STRONG_MODEL, light_model=LIGHT_MODEL, enabled=True,
+                         clock=lambda: clock.now)
+    router.before_model_callback(SimpleNamespace(state={}, invocation_id="cancelled", session=None), _request(_user("hola")))
+
+    clock.now = MODEL_INFLIGHT_MAX_AGE_SECONDS + 1
+    router.before_model_callback(SimpleNamespace(state={}, invocation_id="next", session=None), _request(_user("hola")))
+
+    assert list(router._inflight) == ["next"]
+
+
+def test_router_error_callback_runs_before_the_context_cache():
+    from app.agent import model_router, root_agent, static_context_cache
+
+    callbacks = root_agent.on_model_error_callback
+    assert callbacks.index(model_router.on_model_error_callback) < callbacks.index(static_context_cache.on_model_error_callback)
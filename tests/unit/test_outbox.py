@@ -0,0 +1,186 @@
+"""
+Unit tests for the durable write outbox.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from app.tools import crm, crm_async
+from app.tools.outbox import DONE, FAILED, PENDING, Outbox, OutboxWorker, RetryableWriteError, backoff_delay
+
+CONTACT_ID = "a" * 24
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def outbox():
+    box = Outbox(":memory:", max_attempts=3, clock=FakeClock())
+    yield box
+    box.close()
+
+
+@pytest.fixture
+def queued_mode(outbox):
+    worker = MagicMock()
+    with patch.object(crm, "_outbox", outbox), patch.object(crm, "_outbox_worker", worker), \
+            patch.object(crm_async, "_outbox", outbox):
+        yield outbox, worker
+
+
+# =============================================================================
+# Outbox: journal, dedupe y orden por contacto
+# =============================================================================
+
+def test_enqueue_deduplicates_identical_pending_write(outbox):
+    first = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Ana"}, "new:ana@x.com")
+    second = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Ana"}, "new:ana@x.com")
+
+    assert first["id"] == second["id"]
+    assert first["idempotency_key"] == second["idempotency_key"]
+    assert outbox.stats()[PENDING] == 1
+
+
+def test_due_returns_one_write_per_contact_in_order(outbox):
+    first = outbox.enqueue("v@x.com", "PUT", f"/contact/{CONTACT_ID}", {"name": "A"}, CONTACT_ID)
+    outbox.enqueue("v@x.com", "PUT", f"/contact/{CONTACT_ID}", {"name": "B"}, CONTACT_ID)
+    other = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "C"}, "new:c@x.com")
+
+    assert [e["id"] for e in outbox.due()] == [first["id"], other["id"]]
+
+
+def test_later_write_waits_while_earlier_one_is_backing_off(outbox):
+    first = outbox.enqueue("v@x.com", "PUT", f"/contact/{CONTACT_ID}", {"name": "A"}, CONTACT_ID)
+    outbox.enqueue("v@x.com", "PUT", f"/contact/{CONTACT_ID}", {"name": "B"}, CONTACT_ID)
+    outbox.mark_retry(first["id"], 1, "HTTP 503", delay=10)
+
+    assert outbox.due() == []
+
+    outbox._clock.now += 10
+    assert [e["body"]["name"] for e in outbox.due()] == ["A"]
+
+
+def test_retry_marks_failed_after_max_attempts(outbox):
+    entry = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Ana"}, "new:ana@x.com")
+    outbox.mark_retry(entry["id"], 3, "HTTP 503", delay=1)
+
+    assert outbox.stats()[FAILED] == 1
+    assert outbox.list("v@x.com")[0]["last_error"] == "HTTP 503"
+
+
+def test_backoff_grows_and_is_capped():
+    assert backoff_delay(1, base=2, cap=30) == 2
+    assert backoff_delay(3, base=2, cap=30) == 8
+    assert backoff_delay(10, base=2, cap=30) == 30
+
+
+# =============================================================================
+# OutboxWorker
+# =============================================================================
+
+def test_worker_flush_marks_results(outbox):
+    ok = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Ok"}, "new:ok@x.com")
+    transient = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Later"}, "new:later@x.com")
+    rejected = outbox.enqueue("v@x.com", "POST", "/contact", {"name": "Bad"}, "new:bad@x.com")
+
+    def send(entry):
+        if entry["id"] == transient["id"]:
+            raise RetryableWriteError("HTTP 503")
+        if entry["id"] == rejected["id"]:
+            raise ValueError("Error API: duplicated email")
+
+    assert OutboxWorker(outbox, send).flush_once() == 1
+
+    statuses = {e["id"]: e["status"] for e in outbox.list("v@x.com", statuses=(PENDING, DONE, FAILED))}
+    assert statuses == {ok["id"]: DONE, transient["id"]: PENDING, rejected["id"]: FAILED}
+
+
+# =============================================================================
+# Tools en modo outbox
+# =============================================================================
+
+def test_fresh_worker_resumes_writes_left_in_the_journal(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    previous = Outbox(path)
+    previous.enqueue("v@x.com", "POST", "/contact", {"name": "Ana"}, "new:ana@x.com")
+    previous.close()
+
+    journal = Outbox(path)
+    sent = []
+    worker = OutboxWorker(journal, sent.append, poll_seconds=0.01)
+    try:
+        assert worker.resume() is True
+        for _ in range(200):
+            if journal.stats()[DONE]:
+                break
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+
+    assert [e["body"] for e in sent] == [{"name": "Ana"}]
+    assert journal.stats()[PENDING] == 0
+    assert OutboxWorker(journal, sent.append).resume() is False
+    journal.close()
+
+
+def test_create_contact_is_queued_without_calling_crm(queued_mode):
+    outbox, worker = queued_mode
+    with patch.object(crm._client, "post") as mock_post:
+        result = crm.create_contact("v@x.com", "Ana", "5512345678", "ana@x.com")
+
+    assert result["status"] == "queued"
+    assert result["contact"] == {"name": "Ana", "phoneNumber": "5512345678", "email": "ana@x.com"}
+    mock_post.assert_not_called()
+    worker.ensure_started.assert_called_once()
+    assert outbox.due()[0]["contact_key"] == "new:ana@x.com"
+
+
+def test_async_update_contact_is_queued(queued_mode):
+    outbox, _ = queued_mode
+    result = asyncio.run(crm_async.update_contact("v@x.com", CONTACT_ID, name="Ana María"))
+
+    assert result["status"] == "queued"
+    entry = outbox.due()[0]
+    assert entry["path"] == f"/contact/{CONTACT_ID}"
+    assert entry["contact_key"] == CONTACT_ID
+
+
+def test_list_pending_writes(queued_mode):
+    crm.create_contact("v@x.com", "Ana", "5512345678", "ana@x.com")
+
+    result = crm.list_pending_writes("v@x.com")
+
+    assert result["total"] == 1
+    assert result["writes"][0]["action"] == "create"
+    assert "userEmail" not in result["writes"][0]["contact"]
+
+
+def test_deliver_write_sends_idempotency_key_and_classifies_errors(outbox):
+    entry = outbox.enqueue("v@x.com", "PUT", f"/contact/{CONTACT_ID}", {"userEmail": "v@x.com", "name": "Ana"}, CONTACT_ID)
+
+    with patch.object(crm._client, "request", return_value=SimpleNamespace(status_code=200, content=b"{}")) as mock_request:
+        crm._deliver_write(entry)
+    assert mock_request.call_args.kwargs["headers"] == {"Idempotency-Key": entry["idempotency_key"]}
+
+    with patch.object(crm._client, "request", return_value=SimpleNamespace(status_code=503, text="")):
+        with pytest.raises(RetryableWriteError):
+            crm._deliver_write(entry)
+
+    with patch.object(crm._client, "request", side_effect=requests.ConnectionError("down")):
+        with pytest.raises(RetryableWriteError):
+            crm._deliver_write(entry)
+
+    with patch.object(crm._client, "request", return_value=SimpleNamespace(status_code=400, text="bad")):
+        with pytest.raises(ValueError):
+            crm._deliver_write(entry)
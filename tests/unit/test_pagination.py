@@ -0,0 +1,124 @@
+"""
+Unit tests for the streaming contact iterators.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+
+from app.deadline import DeadlineExceeded, current_deadline, deadline_scope
+from app.tools import crm, crm_async, pagination, rate_limit
+from app.tools.crm_client import AsyncCRMClient
+from app.tools.rate_limit import SYNC, RateLimiter, rate_lane
+from tests.fakes import json_response
+
+SELLER = "seller@test.com"
+BOOK = [{"_id": f"{i:024d}", "name": f"Contacto {i}"} for i in range(23)]
+
+
+def _page(url: str) -> dict:
+    query = parse_qs(urlparse(str(url)).query)
+    page, limit = int(query["page"][0]), int(query["limit"][0])
+    return {"contacts": BOOK[(page - 1) * limit: page * limit], "totalContacts": len(BOOK)}
+
+
+@pytest.fixture(autouse=True)
+def clear_index():
+    crm._index.clear()
+    yield
+    crm._index.clear()
+
+
+@patch("app.tools.crm._client.session.post")
+def test_iter_contacts_walks_all_pages_and_stops_at_total(mock_post):
+    requested = []
+
+    def fake_post(url, **kwargs):
+        requested.append(url)
+        return json_response(_page(url))
+
+    mock_post.side_effect = fake_post
+
+    contacts = list(pagination.iter_contacts(SELLER, page_size=10, prefetch=2))
+
+    assert [c["_id"] for c in contacts] == [c["_id"] for c in BOOK]
+    assert len(requested) == 3  # 10 + 10 + 3, sin pedir una página vacía extra
+
+
+@patch("app.tools.crm._client.session.post")
+def test_iter_contacts_max_contacts(mock_post):
+    mock_post.side_effect = lambda url, **kwargs: json_response(_page(url))
+    assert len(list(pagination.iter_contacts(SELLER, page_size=5, max_contacts=7))) == 7
+
+
+@patch("app.tools.crm._client.session.post")
+def test_iter_contacts_prefetch_threads_keep_the_callers_lane(mock_post):
+    lanes = []
+
+    def fake_post(url, **kwargs):
+        lanes.append(rate_limit._lane.get())
+        return json_response(_page(url))
+
+    mock_post.side_effect = fake_post
+    limiter = RateLimiter(token_rate=0, seller_rate=100, seller_burst=100, lanes={SYNC: (100, 100)})
+
+    with patch.object(crm._client, "rate_limiter", limiter), rate_lane(SYNC):
+        contacts = list(pagination.iter_contacts(SELLER, page_size=10, prefetch=2))
+
+    assert len(contacts) == len(BOOK)
+    assert lanes == [SYNC, SYNC, SYNC]
+    assert limiter.stats()["lane_buckets"] == 1
+    assert limiter.stats()["seller_buckets"] == 0
+
+
+@patch("app.tools.crm._client.session.post")
+def test_iter_contacts_stops_requesting_pages_when_the_deadline_runs_out(mock_post):
+    def fake_post(url, **kwargs):
+        # El deadline del caller llega al hilo de prefetch y se agota durante la página 1
+        current_deadline().expires_at = 0
+        return json_response(_page(url))
+
+    mock_post.side_effect = fake_post
+
+    with patch.object(pagination, "_fetch_page", wraps=pagination._fetch_page) as fetch, deadline_scope(30):
+        with pytest.raises(DeadlineExceeded):
+            list(pagination.iter_contacts(SELLER, page_size=10, prefetch=1))
+
+    assert fetch.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_aiter_contacts_prefetches_next_page():
+    requested = []
+
+    def handler(request):
+        requested.append(int(parse_qs(request.url.query.decode())["page"][0]))
+        assert json.loads(request.content)["userEmail"] == SELLER
+        return httpx.Response(200, json=_page(request.url))
+
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+    with patch.object(crm_async, "_client", client):
+        stream = pagination.aiter_contacts(SELLER, page_size=10)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.01)
+        assert first["_id"] == BOOK[0]["_id"]
+        assert requested == [1, 2]  # página 2 pedida mientras se consume la 1
+
+        rest = [c async for c in stream]
+
+    assert len(rest) == len(BOOK) - 1
+    assert requested == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_aiter_contacts_raises_on_crm_error():
+    client = AsyncCRMClient(
+        "http://crm.local", "token", transport=httpx.MockTransport(lambda r: httpx.Response(500))
+    )
+    with patch.object(crm_async, "_client", client):
+        with pytest.raises(httpx.HTTPStatusError):
+            [c async for c in pagination.aiter_contacts(SELLER)]
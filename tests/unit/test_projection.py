@@ -0,0 +1,53 @@
+"""
+Unit tests for the contact field projection applied to tool results.
+"""
+
+from unittest.mock import patch
+
+from app.tools import crm
+from app.tools.projection import encode_contacts, project_contact
+from tests.fakes import json_response
+
+RAW = {
+    "_id": "a" * 24,
+    "name": "Ana Pérez",
+    "phone": "5512345678",
+    "email": "ana@x.com",
+    "userEmail": "v@x.com",
+    "notes": "x" * 500,
+    "createdAt": "2025-01-01T00:00:00Z",
+    "__v": 0,
+}
+
+
+def test_project_keeps_configured_fields_in_order_with_aliases():
+    projected = project_contact(RAW, ["_id", "name", "phoneNumber", "email"])
+
+    assert list(projected) == ["_id", "name", "phoneNumber", "email"]
+    assert projected["phoneNumber"] == "5512345678"
+
+
+def test_project_all_fields_truncates_long_values():
+    projected = project_contact(RAW, ["*"], max_chars=50)
+
+    assert set(projected) == set(RAW)
+    assert len(projected["notes"]) == 50 and projected["notes"].endswith("…")
+
+
+def test_table_encoding_uses_columns_and_rows():
+    encoded = encode_contacts([RAW, {"_id": "b" * 24, "name": "Luis"}], ["_id", "name", "email"], "table")
+
+    assert encoded["columns"] == ["_id", "name", "email"]
+    assert encoded["rows"] == [["a" * 24, "Ana Pérez", "ana@x.com"], ["b" * 24, "Luis", None]]
+
+
+def test_list_contacts_returns_projected_contacts():
+    response = json_response({"contacts": [RAW], "totalContacts": 1})
+    crm._cache.clear()
+
+    with patch.object(crm._client, "post", return_value=response):
+        result = crm.list_contacts("v@x.com", search_term="ana-projection")
+
+    assert result["contacts"] == [{"_id": "a" * 24, "name": "Ana Pérez", "phoneNumber": "5512345678", "email": "ana@x.com"}]
+    crm._cache.clear()
+    crm._index.clear()
@@ -0,0 +1,88 @@
+"""
+Unit tests for the outbound CRM rate limiter.
+"""
+
+import httpx
+import pytest
+
+from app.tools.crm_client import AsyncCRMClient
+from app.tools.rate_limit import RateLimiter, RateLimitExceeded, TokenBucket, rate_lane
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time() == 0.5
+    clock.now = 0.5
+    assert bucket.wait_time() == 0
+
+
+def test_wait_mode_queues_reservations():
+    clock = FakeClock()
+    limiter = RateLimiter(token_rate=0, seller_rate=1, seller_burst=1, mode="wait", max_wait=5, clock=clock)
+
+    waits = [limiter.reserve("tok", "a@test.com") for _ in range(3)]
+
+    assert waits == [0, 1, 2]
+    stats = limiter.stats()
+    assert (stats["waited"], stats["wait_seconds_max"]) == (2, 2)
+
+
+def test_sellers_have_independent_buckets_but_share_the_token():
+    clock = FakeClock()
+    limiter = RateLimiter(token_rate=1, token_burst=2, seller_rate=1, seller_burst=1, mode="fail", clock=clock)
+
+    assert limiter.reserve("tok", "a@test.com") == 0
+    assert limiter.reserve("tok", "b@test.com") == 0
+    with pytest.raises(RateLimitExceeded) as seller_limited:
+        limiter.reserve("tok", "a@test.com")
+    assert seller_limited.value.scope == "seller"
+    with pytest.raises(RateLimitExceeded) as token_limited:
+        limiter.reserve("tok", "c@test.com")
+    assert token_limited.value.scope == "api token"
+    assert limiter.stats()["rejected"] == 2
+
+
+def test_wait_beyond_max_wait_is_rejected_without_consuming():
+    clock = FakeClock()
+    limiter = RateLimiter(token_rate=0, seller_rate=1, seller_burst=1, mode="wait", max_wait=5, clock=clock)
+    limiter.reserve("tok", "a@test.com")
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.reserve("tok", "a@test.com", max_wait=0.5)
+    assert limiter.reserve("tok", "a@test.com") == 1
+
+
+def test_lane_has_its_own_budget_per_seller():
+    limiter = RateLimiter(token_rate=0, seller_rate=1, seller_burst=1, mode="fail", lanes={"bulk": (1, 1)}, clock=FakeClock())
+
+    with rate_lane("bulk"):
+        limiter.reserve("tok", "a@test.com")
+        with pytest.raises(RateLimitExceeded) as lane_limited:
+            limiter.reserve("tok", "a@test.com")
+    # La importación agotó su lane, no el bucket interactivo del seller
+    assert limiter.reserve("tok", "a@test.com") == 0
+    assert lane_limited.value.scope == "bulk"
+    assert limiter.stats()["lane_buckets"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_fail_fast_mode():
+    limiter = RateLimiter(token_rate=0, seller_rate=0.01, seller_burst=1, mode="fail")
+    client = AsyncCRMClient(
+        "http://crm.local", "tok", transport=httpx.MockTransport(lambda r: httpx.Response(200, json={})),
+        rate_limiter=limiter,
+    )
+    await client.post("/contacts", "a@test.com", json={})
+    with pytest.raises(RateLimitExceeded):
+        await client.post("/contacts", "a@test.com", json={})
@@ -0,0 +1,69 @@
+"""
+Unit tests for the after-tool result shaping (size budget, metadata, error codes).
+"""
+
+from types import SimpleNamespace
+
+from app.codec import dumps
+from app.result_shaping import ToolResultShaper, error_code, fit_budget, shape_error, strip_metadata
+
+TOOL = SimpleNamespace(name="list_contacts")
+
+
+def _contacts(n):
+    return [{"_id": f"{i:024d}", "name": f"Contacto {i}", "email": f"c{i}@x.com"} for i in range(n)]
+
+
+def test_api_error_body_becomes_code_and_crm_message():
+    result = {"status": "error", "message": 'Error API: {"statusCode":409,"message":"Contact already exists","stack":"' + "x" * 2000 + '"}'}
+
+    assert shape_error(result) == {"status": "error", "code": "duplicate_contact", "message": "Contact already exists"}
+
+
+def test_error_codes():
+    assert error_code("Invalid email: foo") == "invalid_input"
+    assert error_code("CRM temporarily unavailable (POST /contact); retry in 20s.") == "crm_unavailable"
+    assert error_code("CRM rate limit reached (seller); retry in 1.0s.") == "crm_rate_limited"
+    assert error_code("Request deadline exceeded.") == "timeout"
+    assert error_code("Error API: <html>Bad Gateway</html>") == "crm_rejected"
+    assert error_code("Critical error: Contact is missing an ID.") == "internal_error"
+
+
+def test_metadata_is_stripped_at_any_depth():
+    result = {"status": "success", "contact": {"_id": "1", "name": "Ana", "__v": 0, "userEmail": "v@x.com"}}
+
+    assert strip_metadata(result) == {"status": "success", "contact": {"_id": "1", "name": "Ana"}}
+
+
+def test_large_listing_keeps_first_rows_and_total():
+    result = {"status": "success", "contacts": _contacts(100), "total": 100}
+
+    shaped = fit_budget(result, max_bytes=2000, max_rows=10)
+
+    assert len(dumps(shaped)) <= 2000
+    assert shaped["contacts"] == result["contacts"][: len(shaped["contacts"])]
+    assert shaped["contacts_total"] == 100 and shaped["truncated"] is True
+
+
+def test_small_result_is_untouched():
+    result = {"status": "success", "contacts": _contacts(2)}
+
+    assert fit_budget(result, max_bytes=4000) is result
+
+
+def test_callback_uses_per_tool_budget_and_records_stats():
+    shaper = ToolResultShaper(max_bytes=100_000, budgets={"list_contacts": 1500}, max_rows=10)
+
+    shaped = shaper.after_tool_callback(TOOL, {}, None, {"status": "success", "contacts": _contacts(50)})
+
+    assert len(dumps(shaped)) <= 1500 and shaped["contacts_total"] == 50
+    stats = shaper.stats()["tools"]["list_contacts"]
+    assert stats["calls"] == 1 and stats["shaped"] == 1 and stats["bytes_out"] < stats["bytes_in"]
+
+
+def test_not_found_gets_a_code():
+    shaper = ToolResultShaper()
+
+    shaped = shaper.after_tool_callback(TOOL, {}, None, {"status": "not_found", "message": "Contact not found 'x' to update."})
+
+    assert shaped["code"] == "not_found"
@@ -0,0 +1,58 @@
+"""
+Unit tests for the local per-seller contact search index.
+"""
+
+from app.tools.search_index import SearchIndex, best_match, score_contact
+
+CONTACTS = [
+    {"_id": "1", "name": "María García", "email": "Maria@Test.com", "phoneNumber": "+56 9 5555 1234"},
+    {"_id": "2", "name": "Pedro López", "email": "pedro@test.com", "phone": "111-2222"},
+    {"_id": "3", "name": "Pedro Pérez", "email": "pperez@test.com", "phoneNumber": "333-4444"},
+]
+
+
+def _index():
+    index = SearchIndex(min_score=0.6)
+    index.add_many("seller@test.com", CONTACTS)
+    return index
+
+
+def test_resolves_by_email_phone_and_name():
+    index = _index()
+    assert index.resolve("seller@test.com", "maria@test.com") == "1"
+    assert index.resolve("seller@test.com", "95555-1234") == "1"
+    assert index.resolve("seller@test.com", "111 2222") == "2"
+    assert index.resolve("seller@test.com", "maria garcia") == "1"
+
+
+def test_fuzzy_name_match_tolerates_typos():
+    assert _index().resolve("seller@test.com", "Maria Garsia") == "1"
+
+
+def test_ambiguous_name_is_a_miss():
+    index = _index()
+    assert index.resolve("seller@test.com", "Pedro") is None
+    assert index.stats()["misses"] == 1
+
+
+def test_index_is_per_seller():
+    assert _index().resolve("other@test.com", "maria@test.com") is None
+
+
+def test_merge_reindexes_updated_fields():
+    index = _index()
+    index.merge("seller@test.com", "2", {"email": "nuevo@test.com"})
+    assert index.resolve("seller@test.com", "pedro@test.com") is None
+    assert index.resolve("seller@test.com", "nuevo@test.com") == "2"
+
+
+def test_max_per_seller_drops_oldest():
+    index = SearchIndex(max_per_seller=2)
+    index.add_many("seller@test.com", CONTACTS)
+    assert index.stats()["contacts"] == 2
+    assert index.resolve("seller@test.com", "maria@test.com") is None
+
+
+def test_best_match_prefers_exact_name():
+    assert best_match("Pedro Pérez", CONTACTS)["_id"] == "3"
+    assert score_contact("pedro perez", CONTACTS[2]) == 1.0
@@ -0,0 +1,54 @@
+"""
+Unit tests for session-scoped contact resolution.
+"""
+
+from app.tools.session_contacts import (
+    STATE_KEY,
+    parse_ordinal,
+    remember_contacts,
+    resolve_from_session,
+)
+
+LISTING = [
+    {"_id": "1", "name": "María García", "email": "maria@test.com", "phoneNumber": "555-1111", "createdAt": "x"},
+    {"_id": "2", "name": "Pedro López", "email": "pedro@test.com", "phone": "555-2222"},
+    {"_id": "3", "name": "Segundo Pérez", "email": "segundo@test.com", "phoneNumber": "555-3333"},
+]
+
+
+def _state():
+    state = {}
+    remember_contacts(state, LISTING)
+    return state
+
+
+def test_remember_keeps_compact_records_in_order():
+    state = _state()
+    assert [c["_id"] for c in state[STATE_KEY]] == ["1", "2", "3"]
+    assert set(state[STATE_KEY][0]) == {"_id", "name", "email", "phoneNumber"}
+    assert state[STATE_KEY][1]["phoneNumber"] == "555-2222"
+
+
+def test_parse_ordinal():
+    assert parse_ordinal("el segundo") == 2
+    assert parse_ordinal("the second one") == 2
+    assert parse_ordinal("#3") == 3
+    assert parse_ordinal("la última") == -1
+    assert parse_ordinal("Segundo Pérez") is None
+    assert parse_ordinal("5551234") is None
+
+
+def test_resolves_ordinals_and_identifiers():
+    state = _state()
+    assert resolve_from_session(state, "el segundo") == "2"
+    assert resolve_from_session(state, "el último") == "3"
+    assert resolve_from_session(state, "Pedro") == "2"
+    assert resolve_from_session(state, "maria@test.com") == "1"
+    assert resolve_from_session(state, "Segundo Pérez") == "3"
+
+
+def test_unknown_identifier_or_out_of_range_is_a_miss():
+    state = _state()
+    assert resolve_from_session(state, "Juana") is None
+    assert resolve_from_session(state, "el décimo") is None
+    assert resolve_from_session({}, "el primero") is None
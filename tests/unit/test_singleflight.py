@@ -0,0 +1,80 @@
+"""
+Unit tests for request coalescing.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.tools import crm, crm_async
+from app.tools.crm_client import AsyncCRMClient
+from app.tools.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_sync_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    def slow():
+        executions.append(1)
+        time.sleep(0.05)
+        return {"contacts": []}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(executions) == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "collapsed": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_async_errors_are_shared_and_not_remembered():
+    flight = AsyncSingleFlight()
+    attempts = 0
+
+    async def failing():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("CRM down")
+
+    outcomes = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+    assert attempts == 1
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+    with pytest.raises(RuntimeError):
+        await flight.do("k", failing)
+    assert attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_identical_list_calls_collapse_into_one_request():
+    requests_seen = 0
+
+    async def handler(request):
+        nonlocal requests_seen
+        requests_seen += 1
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"contacts": [{"name": "A"}], "totalContacts": 1})
+
+    crm._cache.clear()
+    client = AsyncCRMClient("http://crm.local", "token", transport=httpx.MockTransport(handler))
+    with patch.object(crm_async, "_client", client), patch.object(crm_async, "_flight", AsyncSingleFlight()):
+        results = await asyncio.gather(
+            *(crm_async.list_contacts("seller@test.com", "Ana") for _ in range(4))
+        )
+        stats = crm_async.get_singleflight_stats()
+    crm._cache.clear()
+
+    assert requests_seen == 1
+    assert all(r["status"] == "success" for r in results)
+    assert stats["collapsed"] == 3
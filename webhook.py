@@ -1,4 +1,5 @@
 import os
+import asyncio
 import httpx
 from fastapi import FastAPI, Request
 from dotenv import load_dotenv
@@ -7,7 +8,15 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
 
-from app.agent import root_agent
+from app.agent import flight_recorder, model_router, root_agent
+from app.codec import decode_webhook_payload, dumps
+from app.config import STILL_WORKING_MESSAGE
+from app.confirmations import ConfirmationRouter
+from app.deadline import DeadlineExceeded, deadline_scope, timeout_for
+from app.fast_path import FastPathRouter
+from app.flight_recorder import current_turn, stage
+from app.tools.crm import get_outbox_stats
+from app.tools.pending_actions import PENDING_CONFIRMATION
 
 load_dotenv()
 
@@ -19,8 +28,24 @@ PYROTECH_API_URL = os.getenv(
 TEST_SELLER_EMAIL = os.getenv("TEST_SELLER_EMAIL", "vendedor@inmobiliaria.com")
 APP_NAME = "sales_assistant"
 
+# Presupuesto de tiempo por mensaje (webhook -> LLM -> CRM -> WhatsApp)
+WEBHOOK_DEADLINE_SECONDS = float(os.getenv("WEBHOOK_DEADLINE_SECONDS", "25"))
+WHATSAPP_SEND_RESERVE_SECONDS = float(os.getenv("WHATSAPP_SEND_RESERVE_SECONDS", "3"))
+WHATSAPP_SEND_TIMEOUT = float(os.getenv("WHATSAPP_SEND_TIMEOUT", "30"))
+# Si se agota el presupuesto, el agente termina en segundo plano con este tope
+BACKGROUND_COMPLETION_SECONDS = float(os.getenv("BACKGROUND_COMPLETION_SECONDS", "60"))
+
+# Referencias a tareas en segundo plano (evita que el GC las cancele)
+_background_tasks: set = set()
+
 session_service = InMemorySessionService()
 
+# Saludos, "¿cómo te llamas?" y gracias se responden sin llamar a Gemini
+fast_path = FastPathRouter()
+
+# "sí"/"no" a una propuesta pendiente de create/update se resuelve sin llamar a Gemini
+confirmations = ConfirmationRouter()
+
 webhook_app = FastAPI(title="Sales Assistant Webhook")
 
 
@@ -34,8 +59,8 @@ async def send_whatsapp_response(phone: str, message: str, pyrotech_token: str):
                     "Authorization": pyrotech_token,
                     "Content-Type": "application/json"
                 },
-                json={"phone": phone, "message": message},
-                timeout=30
+                content=dumps({"phone": phone, "message": message}),
+                timeout=timeout_for(WHATSAPP_SEND_TIMEOUT)
             )
             print(f"📤 WhatsApp enviado: {response.status_code}")
             return response
@@ -72,7 +97,15 @@ async def get_or_create_session(user_id: str, seller_email: str):
 
 
 async def run_agent(user_id: str, message: str) -> str:
-    """Ejecuta el agente con callback."""
+    """Ejecuta el agente con callback (o responde sin LLM si es una confirmación o un turno trivial)."""
+    for router, path in ((confirmations, "confirmation"), (fast_path, "fast_path")):
+        reply = await router.handle(session_service, APP_NAME, user_id, user_id, message, root_agent.name)
+        if reply:
+            turn = current_turn()
+            if turn:
+                turn.path = path
+            return reply
+
     runner = Runner(
         agent=root_agent,
         app_name=APP_NAME,
@@ -91,15 +124,57 @@ async def run_agent(user_id: str, message: str) -> str:
             for part in event.content.parts:
                 if hasattr(part, 'text') and part.text:
                     response_text += part.text
+                # propose_contact_change termina el turno con su propio texto de confirmación
+                elif part.function_response and (part.function_response.response or {}).get("status") == PENDING_CONFIRMATION:
+                    response_text += part.function_response.response.get("message", "")
 
     return response_text or "Lo siento, no pude procesar tu mensaje."
 
 
+async def finish_in_background(agent_task: asyncio.Task, phone: str, pyrotech_token: str):
+    """Espera a que el agente termine y envía la respuesta final."""
+    try:
+        response = await asyncio.wait_for(agent_task, timeout=BACKGROUND_COMPLETION_SECONDS)
+        print(f"🤖 Respuesta (segundo plano): {response}")
+        with stage("whatsapp_send"):
+            await send_whatsapp_response(phone, response, pyrotech_token)
+    except Exception as e:
+        print(f"❌ Error terminando en segundo plano: {e}")
+        turn = current_turn()
+        if turn:
+            turn.error = type(e).__name__
+    finally:
+        # El turno quedó diferido en run_agent_with_deadline: se escribe al terminar
+        flight_recorder.finish(current_turn())
+
+
+async def run_agent_with_deadline(user_id: str, message: str, pyrotech_token: str, deadline) -> tuple:
+    """
+    Ejecuta el agente dentro del presupuesto restante (reservando tiempo para el envío).
+    Si no alcanza, devuelve STILL_WORKING_MESSAGE y deja al agente terminar en segundo plano.
+    Retorna (respuesta, terminado).
+    """
+    agent_task = asyncio.create_task(run_agent(user_id=user_id, message=message))
+    try:
+        budget = deadline.timeout(reserve=WHATSAPP_SEND_RESERVE_SECONDS)
+        response = await asyncio.wait_for(asyncio.shield(agent_task), timeout=budget)
+        return response, True
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        print("⏱️ Presupuesto agotado, respondiendo 'sigo trabajando'")
+        # La tarea comparte este Deadline: extenderlo le da tiempo al resto del turno
+        deadline.extend(BACKGROUND_COMPLETION_SECONDS)
+        flight_recorder.defer(current_turn())
+        task = asyncio.create_task(finish_in_background(agent_task, user_id, pyrotech_token))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return STILL_WORKING_MESSAGE, False
+
+
 @webhook_app.post("/webhook")
 async def webhook_handler(request: Request):
     """Maneja mensajes de WhatsApp via PyroTech."""
     try:
-        payload = await request.json()
+        payload = decode_webhook_payload(await request.body())
         print(f"📥 Webhook: {payload}")
 
         phone = payload.get("phone", "")
@@ -121,16 +196,19 @@ async def webhook_handler(request: Request):
         print(f"Message: {message}")
         print(f"Seller: {seller_email}")
 
-        # Crear sesión con seller_email (el callback lo leerá)
-        await get_or_create_session(user_id=phone, seller_email=seller_email)
+        # El turno (LLM, tools, envío) queda en el flight recorder con el seller y la sesión
+        with deadline_scope(WEBHOOK_DEADLINE_SECONDS) as deadline, flight_recorder.turn(seller_email, phone):
+            # Crear sesión con seller_email (el callback lo leerá)
+            await get_or_create_session(user_id=phone, seller_email=seller_email)
 
-        # Ejecutar agente
-        response = await run_agent(user_id=phone, message=message)
-        print(f"🤖 Respuesta: {response}")
+            # Ejecutar agente (LLM y tools heredan el deadline vía contextvars)
+            response, finished = await run_agent_with_deadline(phone, message, pyrotech_token, deadline)
+            print(f"🤖 Respuesta: {response}")
 
-        await send_whatsapp_response(phone, response, pyrotech_token)
+            with stage("whatsapp_send"):
+                await send_whatsapp_response(phone, response, pyrotech_token)
 
-        return {"status": "success", "response": response}
+        return {"status": "success" if finished else "pending", "response": response}
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -142,6 +220,36 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@webhook_app.get("/outbox")
+async def outbox_status():
+    """Totales del outbox de escrituras (sin datos de contactos: el endpoint no tiene auth)."""
+    return get_outbox_stats()
+
+
+@webhook_app.get("/fast-path")
+async def fast_path_status():
+    """Cuántos mensajes se respondieron sin LLM (total y por intención)."""
+    return fast_path.stats()
+
+
+@webhook_app.get("/confirmations")
+async def confirmations_status():
+    """Propuestas de create/update confirmadas, canceladas o abandonadas sin LLM."""
+    return confirmations.stats()
+
+
+@webhook_app.get("/models")
+async def model_tiers_status():
+    """Requests, latencia y tokens por tier de modelo, con motivos y escalamientos."""
+    return model_router.stats()
+
+
+@webhook_app.get("/flight-recorder")
+async def flight_recorder_status():
+    """Turnos registrados y descartados por el flight recorder."""
+    return flight_recorder.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(webhook_app, host="0.0.0.0", port=8080)
\ No newline at end of file